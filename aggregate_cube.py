@@ -0,0 +1,147 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from columnar import as_columns, group_index
+
+# Dimensions of the cube; every report breakdown is a rollup of these
+CUBE_DIMENSIONS = ('cohort', 'calendarYear', 'teachingPeriod',
+                   'itemGroupCode', 'itemSubGroupCode', 'studentId')
+
+# Fields the cube is built from: its dimensions and the subgroup names
+CUBE_FIELDS = CUBE_DIMENSIONS + ('itemSubGroupName',)
+
+
+@dataclass
+class AggregateCube:
+    """Sum and count of responseValue per cube cell.
+
+    A cell is a distinct combination of CUBE_DIMENSIONS present in the
+    responses; empty combinations are not stored. Every breakdown the
+    reports need is a rollup of the cells, so the responses are scanned
+    once, when the cube is built.
+
+    Attributes:
+        codes (Dict[str, np.ndarray]): Code of each dimension per cell
+        categories (Dict[str, List[Any]]): Values of each dimension, indexed
+            by code, in order of first appearance
+        sums (np.ndarray): Sum of responseValue per cell
+        counts (np.ndarray): Number of responses per cell
+        subgroup_names (Dict[Any, Any]): itemSubGroupName of each
+            itemSubGroupCode
+    """
+    codes: Dict[str, np.ndarray]
+    categories: Dict[str, List[Any]]
+    sums: np.ndarray
+    counts: np.ndarray
+    subgroup_names: Dict[Any, Any]
+
+    def __len__(self) -> int:
+        return len(self.sums)
+
+    def code(self, dimension: str, value: Any) -> Optional[int]:
+        """Return the code of a dimension value, or None if not present."""
+        try:
+            return self.categories[dimension].index(value)
+        except ValueError:
+            return None
+
+    def rollup(
+        self, dimensions: Sequence[str] = (), **where: Any
+    ) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+        """Total the cells over every dimension not kept.
+
+        Args:
+            dimensions (Sequence[str]): Dimensions to keep, in key order
+            **where (Any): Only include cells with these dimension values,
+                e.g. ``cohort='2020'``
+
+        Returns:
+            Tuple: Codes of each kept dimension per group, and the sum and
+                count per group, with groups in code order
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for dimension, value in where.items():
+            code = self.code(dimension, value)
+            if code is None:
+                selected[:] = False
+                break
+            selected &= self.codes[dimension] == code
+
+        key = np.zeros(int(selected.sum()), dtype=np.int64)
+        for dimension in dimensions:
+            key = (key * len(self.categories[dimension])
+                   + self.codes[dimension][selected])
+        unique_keys, inverse = np.unique(key, return_inverse=True)
+
+        def total(values: np.ndarray) -> np.ndarray:
+            return np.bincount(inverse, weights=values[selected],
+                               minlength=len(unique_keys))
+
+        sums = total(self.sums)
+        counts = total(self.counts).astype(np.int64)
+
+        group_codes = {}
+        for dimension in reversed(dimensions):
+            n_categories = len(self.categories[dimension])
+            group_codes[dimension] = unique_keys % n_categories
+            unique_keys = unique_keys // n_categories
+        return group_codes, sums, counts
+
+    def decode(self, dimension: str, codes: np.ndarray) -> List[Any]:
+        """Map codes of a dimension back to its values."""
+        categories = self.categories[dimension]
+        return [categories[code] for code in codes]
+
+
+def build_cube(data: Any) -> AggregateCube:
+    """Aggregate responses into a cube in one group-by.
+
+    Args:
+        data (Any): ResponseColumns or raw data from JSON file
+
+    Returns:
+        AggregateCube: The cube
+    """
+    columns = as_columns(data, CUBE_FIELDS)
+    codes, inverse = group_index(columns, CUBE_DIMENSIONS)
+    n_cells = len(codes[CUBE_DIMENSIONS[0]])
+    sums = np.bincount(inverse, weights=columns.response_value,
+                       minlength=n_cells)
+    counts = columns.counts(inverse, minlength=n_cells)
+
+    # Subgroup codes are reported by name; take each code's first name.
+    # Assigning rows in reverse leaves the first row of every code.
+    subgroup_codes = columns.codes['itemSubGroupCode']
+    first_rows = np.full(len(columns.categories['itemSubGroupCode']), -1)
+    first_rows[subgroup_codes[::-1]] = np.arange(len(columns))[::-1]
+    subgroup_names = {
+        columns.categories['itemSubGroupCode'][code]:
+            columns.categories['itemSubGroupName'][
+                columns.codes['itemSubGroupName'][row]
+            ]
+        for code, row in enumerate(first_rows) if row >= 0
+    }
+
+    return AggregateCube(
+        codes=codes,
+        categories={dimension: list(columns.categories[dimension])
+                    for dimension in CUBE_DIMENSIONS},
+        sums=sums,
+        counts=counts,
+        subgroup_names=subgroup_names
+    )
+
+
+def as_cube(data: Any) -> AggregateCube:
+    """Accept a cube, encoded columns or a list of response dicts.
+
+    Args:
+        data (Any): AggregateCube, ResponseColumns or raw data from JSON file
+
+    Returns:
+        AggregateCube: The cube
+    """
+    if isinstance(data, AggregateCube):
+        return data
+    return build_cube(data)
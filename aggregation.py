@@ -0,0 +1,244 @@
+import bisect
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Any, Sequence, Union
+
+from aggregate_cube import AggregateCube
+from columnar import ResponseColumns, as_columns, group_by
+
+# AUGMS pass-mark in percent
+PASS_MARK = 35.5
+
+# Fields the per-student totals are grouped by
+STUDENT_GROUP_FIELDS = ('studentId', 'itemGroupCode')
+
+
+class UnknownStudent(ValueError):
+    """Raised when a student has no responses in the cohort."""
+
+
+def student_key(student_id: Any) -> int:
+    """Return the numeric key a student's responses are stored under.
+
+    Raises:
+        UnknownStudent: If the ID is not a number, so no student has it
+    """
+    try:
+        return int(student_id)
+    except (TypeError, ValueError):
+        raise UnknownStudent(f"No data found for student {student_id}") from None
+
+
+@dataclass
+class CohortAggregate:
+    """Per-student and per-group score totals for a whole cohort.
+
+    Rows are students (sorted by ID) and columns are item groups (in order of
+    first appearance in the raw data).
+
+    Attributes:
+        student_ids (np.ndarray): Sorted unique student IDs
+        group_codes (List[str]): Item group codes
+        group_sums (np.ndarray): Sum of responseValue per student and group
+        group_counts (np.ndarray): Number of responses per student and group
+        group_stats (List[Dict[str, float]]): Cohort statistics per group
+        overall_stats (Dict[str, float]): Cohort statistics of overall scores
+        overall_scores (np.ndarray): Overall percentage score per student
+        ranked_scores (np.ndarray): The same scores sorted ascending, the
+            index used to rank students
+    """
+    student_ids: np.ndarray
+    group_codes: List[str]
+    group_sums: np.ndarray
+    group_counts: np.ndarray
+    group_stats: List[Dict[str, float]]
+    overall_stats: Dict[str, float]
+    overall_scores: np.ndarray
+    ranked_scores: np.ndarray
+
+
+def _score_statistics(scores: np.ndarray) -> Dict[str, float]:
+    """Summarise a set of percentage scores.
+
+    Args:
+        scores (np.ndarray): Percentage scores, one per student
+
+    Returns:
+        Dict[str, float]: min, max, mean and population standard deviation
+    """
+    if scores.size == 0:
+        return {"min": 0.0, "max": 0.0, "mean": 0.0, "stdev": 0.0}
+    return {
+        "min": float(scores.min()),
+        "max": float(scores.max()),
+        "mean": float(scores.mean()),
+        "stdev": float(scores.std()) if scores.size > 1 else 0.0
+    }
+
+
+def classify_outcome(overall_score: float) -> str:
+    """Map an overall percentage mark onto its AUGMS descriptor.
+
+    Args:
+        overall_score (float): Overall percentage mark
+
+    Returns:
+        str: The outcome descriptor
+    """
+    if overall_score >= 69.50:
+        return "Excellent Pass"
+    elif overall_score >= 59.50:
+        return "Very Good Pass"
+    elif overall_score >= 49.50:
+        return "Good Pass"
+    elif overall_score >= 44.50:
+        return "Pass"
+    elif overall_score >= 39.50:
+        return "Borderline Pass"
+    return "NOT Pass"
+
+
+def rank_score(ranked_scores: Sequence[float], score: float) -> Dict[str, Any]:
+    """Place a score within a cohort by binary search.
+
+    Students with equal scores share a place: the rank counts the students
+    who scored strictly higher, and the percentile the students who scored
+    the same or lower. Decile d means fewer than d * 10% of the cohort
+    scored strictly higher, so the top score is always in decile 1.
+
+    Args:
+        ranked_scores (Sequence[float]): Cohort overall scores, sorted
+            ascending
+        score (float): The score to place, usually one of ranked_scores
+
+    Returns:
+        Dict[str, Any]: rank (1 is best), cohort_size, percentile and decile
+    """
+    cohort_size = len(ranked_scores)
+    at_or_below = bisect.bisect_right(ranked_scores, score)
+    rank = cohort_size - at_or_below + 1
+    return {
+        "rank": rank,
+        "cohort_size": cohort_size,
+        "percentile": at_or_below / cohort_size * 100,
+        "decile": (rank - 1) * 10 // cohort_size + 1
+    }
+
+
+def aggregate_cohort(
+    raw_data: Union[List[Dict[str, Any]], ResponseColumns, AggregateCube]
+) -> CohortAggregate:
+    """Aggregate raw responses into per-student, per-group totals.
+
+    Responses are grouped by student and item group in one pass, encoding
+    only those two fields. A cube that was already built for other reports
+    is rolled up instead, so no response is scanned again.
+
+    Args:
+        raw_data (Union[List[Dict[str, Any]], ResponseColumns, AggregateCube]):
+            Raw data from JSON file, the same data encoded as columns, or its
+            cube
+
+    Returns:
+        CohortAggregate: Totals and cohort statistics for every group
+    """
+    if not len(raw_data):
+        raise ValueError("No responses provided")
+
+    # Every (student, group) cell is one group of the result
+    if isinstance(raw_data, AggregateCube):
+        categories = raw_data.categories
+        codes, sums, counts = raw_data.rollup(STUDENT_GROUP_FIELDS)
+    else:
+        columns = as_columns(raw_data, STUDENT_GROUP_FIELDS)
+        categories = columns.categories
+        codes, sums, counts = group_by(columns, STUDENT_GROUP_FIELDS)
+
+    # Rows of the result are students in ID order
+    student_ids, student_rows = np.unique(
+        np.array([int(sid) for sid in categories['studentId']],
+                 dtype=np.int64),
+        return_inverse=True
+    )
+    group_index = categories['itemGroupCode']
+
+    n_students, n_groups = len(student_ids), len(group_index)
+    rows = student_rows[codes['studentId']]
+    # IDs such as 190053983 and "190053983" are one student; their
+    # groups land in the same cell and are added, not overwritten
+    cells = (rows, codes['itemGroupCode'])
+    group_sums = np.zeros((n_students, n_groups))
+    np.add.at(group_sums, cells, sums)
+    group_counts = np.zeros((n_students, n_groups), dtype=np.int64)
+    np.add.at(group_counts, cells, counts)
+
+    # Cohort statistics per group, over students who answered that group
+    group_stats = []
+    for column in range(n_groups):
+        answered = group_counts[:, column] > 0
+        scores = group_sums[answered, column] / group_counts[answered, column] * 100
+        group_stats.append(_score_statistics(scores))
+
+    # Cohort statistics of overall scores
+    overall_scores = group_sums.sum(axis=1) / group_counts.sum(axis=1) * 100
+
+    return CohortAggregate(
+        student_ids=student_ids,
+        group_codes=list(group_index),
+        group_sums=group_sums,
+        group_counts=group_counts,
+        group_stats=group_stats,
+        overall_stats=_score_statistics(overall_scores),
+        overall_scores=overall_scores,
+        ranked_scores=np.sort(overall_scores)
+    )
+
+
+def summarise_student(aggregate: CohortAggregate, student_id: str) -> Dict[str, Any]:
+    """Build the report data for one student from a cohort aggregate.
+
+    Args:
+        aggregate (CohortAggregate): Aggregated cohort data
+        student_id (str): ID of the student to summarise
+
+    Returns:
+        Dict[str, Any]: Processed student data with summary statistics
+
+    Raises:
+        UnknownStudent: If the student has no responses in the cohort
+    """
+    key = student_key(student_id)
+    row = int(np.searchsorted(aggregate.student_ids, key))
+    if row >= len(aggregate.student_ids) or aggregate.student_ids[row] != key:
+        raise UnknownStudent(f"No data found for student {student_id}")
+
+    sums = aggregate.group_sums[row]
+    counts = aggregate.group_counts[row]
+
+    # Groups the student answered, in cohort order
+    summary_results = []
+    for column, group in enumerate(aggregate.group_codes):
+        if counts[column] == 0:
+            continue
+        summary_results.append({
+            "component": group,
+            "your_score": float(sums[column] / counts[column] * 100),
+            "total_available": 100,
+            **aggregate.group_stats[column]
+        })
+
+    # Overall score across all groups, as ranked
+    overall_score = float(aggregate.overall_scores[row])
+    summary_results.insert(0, {
+        "component": "Overall Scores",
+        "your_score": overall_score,
+        "total_available": 100,
+        **aggregate.overall_stats
+    })
+
+    return {
+        "student_id": str(student_id),
+        "overall_outcome": classify_outcome(overall_score),
+        "summary_results": summary_results,
+        "ranking": rank_score(aggregate.ranked_scores, overall_score)
+    }
@@ -1,115 +1,924 @@
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Response, request, send_file, jsonify, make_response
 from flask_cors import CORS
-import tempfile
+import atexit
+import contextlib
+import functools
+import hmac
 import os
+import tempfile
+import threading
+import time
 import json
 from io import BytesIO
-from student_report import process_student_data, generate_student_report
+from werkzeug.exceptions import HTTPException
+from aggregation import UnknownStudent, aggregate_cohort, summarise_student
+from binary_ingest import (
+    BINARY_FORMATS, InvalidUpload, UnsupportedUpload, load_columns
+)
+from cohort_stats import InvalidDelta
+from dataset_registry import (
+    DatasetRegistry, DatasetSuperseded, build_dataset, dataset_id_for,
+    delta_dataset_id
+)
+from jobs import JobManager, JobQueueFull
+from memory_sampling import MemorySampler
+from metrics import BYTE_BUCKETS, COUNT_BUCKETS, Registry
+from render_pool import RenderPool
+from report_cache import ReportCache
+from report_generator import compute_boe_statistics
+from report_keys import report_key
+from request_decoding import (
+    BodyTooLarge, CorruptBody, UnsupportedEncoding, decoded_stream
+)
+from sampling_profiler import SamplingProfiler, profiling
+from stage_timing import StageTimer, stage, timing
+from streaming_ingest import HashingReader, ingest_stream
+from student_report import (
+    process_student_data, render_summaries, summarise_students
+)
+from vector_charts import resolve_chart_backend
+from zip_stream import iter_zip
 
 
 app = Flask(__name__)
 CORS(app, resources={
     r"/*": {
         "origins": "*",
-        "methods": ["GET", "POST"],
-        "allow_headers": ["Content-Type"]
+        "methods": ["GET", "POST", "PATCH"],
+        "allow_headers": ["Content-Type", "Content-Encoding", "If-None-Match"],
+        "expose_headers": ["Location", "ETag", "Server-Timing"]
     }
 })
 
+# Uploaded cohorts kept for ?dataset=<id> requests
+datasets = DatasetRegistry(
+    max_entries=int(os.environ.get("DATASET_CACHE_SIZE", 32)),
+    ttl_seconds=float(os.environ.get("DATASET_TTL_SECONDS", 3600))
+)
+
+# Warm worker processes that render PDFs off the request threads;
+# RENDER_WORKERS=0 renders inline
+render_pool = RenderPool(
+    workers=int(os.environ["RENDER_WORKERS"])
+    if os.environ.get("RENDER_WORKERS") else None
+)
+
+# Start and warm the workers now rather than on the first report. Worker
+# processes import this module again as __mp_main__ and must not.
+if __name__ != "__mp_main__":
+    render_pool.start()
+    atexit.register(render_pool.shutdown)
+
+# Rendered PDFs on local disk, shared by all workers on the host;
+# REPORT_CACHE_MAX_BYTES=0 disables the cache
+REPORT_CACHE_MAX_BYTES = int(
+    os.environ.get("REPORT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+report_cache = ReportCache(
+    os.environ.get("REPORT_CACHE_DIR",
+                   os.path.join(tempfile.gettempdir(), "report-cache")),
+    max_bytes=REPORT_CACHE_MAX_BYTES
+) if REPORT_CACHE_MAX_BYTES > 0 else None
+
+# Compressed uploads may not inflate past this many bytes
+MAX_DECOMPRESSED_BYTES = int(
+    os.environ.get("MAX_DECOMPRESSED_BYTES", 512 * 1024 * 1024)
+)
+
+# Background report jobs for clients that cannot wait on one request
+jobs = JobManager(
+    workers=int(os.environ.get("JOB_WORKERS", 2)),
+    max_queued=int(os.environ.get("JOB_QUEUE_SIZE", 16)),
+    result_ttl_seconds=float(os.environ.get("JOB_RESULT_TTL_SECONDS", 3600))
+)
+
+# Fraction of report requests whose memory is traced per stage with
+# tracemalloc; 0 turns tracing off
+memory_sampler = MemorySampler(
+    rate=float(os.environ.get("MEMORY_SAMPLE_RATE", 0)),
+    top_sites=int(os.environ.get("MEMORY_TOP_SITES", 5))
+)
+
+# Token required in the X-Debug-Token header by /debug endpoints and
+# ?profile=1, which are disabled when it is not set
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN")
+
+# Seconds between stack samples of the sampling profiler, and the longest
+# /debug/profile run
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.01))
+MAX_PROFILE_SECONDS = float(os.environ.get("MAX_PROFILE_SECONDS", 120))
+
+
+# Prometheus metrics served at /metrics
+metrics = Registry()
+REQUESTS = metrics.counter(
+    "report_requests_total", "Report requests by endpoint and status code",
+    ["endpoint", "status"]
+)
+REQUEST_ERRORS = metrics.counter(
+    "report_request_errors_total", "Report requests answered with a 5xx",
+    ["endpoint"]
+)
+REQUEST_SECONDS = metrics.histogram(
+    "report_request_duration_seconds", "Time to produce a report response",
+    ["endpoint"]
+)
+STAGE_SECONDS = metrics.histogram(
+    "report_stage_duration_seconds",
+    "Exclusive time per stage of a report request", ["endpoint", "stage"]
+)
+PAYLOAD_BYTES = metrics.histogram(
+    "report_request_payload_bytes", "Request body size as sent",
+    ["endpoint"], buckets=BYTE_BUCKETS
+)
+COHORT_RESPONSES = metrics.histogram(
+    "report_cohort_responses", "Responses in uploaded cohorts",
+    ["endpoint"], buckets=COUNT_BUCKETS
+)
+COHORT_STUDENTS = metrics.histogram(
+    "report_cohort_students", "Students in aggregated cohorts",
+    ["endpoint"], buckets=COUNT_BUCKETS
+)
+IN_FLIGHT = metrics.gauge(
+    "report_requests_in_flight", "Report requests being handled",
+    ["endpoint"]
+)
+MEMORY_SAMPLES = metrics.counter(
+    "report_memory_samples_total", "Report requests traced with tracemalloc",
+    ["endpoint"]
+)
+STAGE_PEAK_BYTES = metrics.histogram(
+    "report_stage_peak_memory_bytes",
+    "Peak memory allocated per stage of traced report requests",
+    ["endpoint", "stage"], buckets=BYTE_BUCKETS
+)
+metrics.gauge(
+    "render_pool_pending_reports", "Reports queued or rendering in the pool",
+    function=lambda: render_pool.pending
+)
+
 
 @app.route("/")
 def home():
     return "<p>BOE Report Generator Service</p>"
 
 
-def generate_pdf_report(json_data, output_file=None):
-    """Wrapper function that handles the temporary file creation"""
-    temp_output = None
-    # Use a temporary file if no output file specified
-    if output_file is None:
-        temp_output = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
-        output_file = temp_output.name
-        temp_output.close()
+@app.route("/metrics")
+def metrics_endpoint():
+    """Expose request and stage metrics in the Prometheus text format."""
+    return Response(metrics.exposition(), content_type=Registry.CONTENT_TYPE)
+
+
+def _debug_authorised():
+    """Return an error response unless the request carries DEBUG_TOKEN.
+
+    Returns:
+        The 404 or 403 response, or None if the caller is authorised
+    """
+    if not DEBUG_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    token = request.headers.get("X-Debug-Token", "")
+    if not hmac.compare_digest(token.encode(), DEBUG_TOKEN.encode()):
+        return jsonify({"error": "Invalid debug token"}), 403
+    return None
+
+
+@app.route("/debug/memory")
+def debug_memory():
+    """List the per-stage memory of recently traced report requests."""
+    error = _debug_authorised()
+    if error:
+        return error
+    return jsonify({
+        "sample_rate": memory_sampler.rate,
+        "samples": memory_sampler.recent()
+    })
+
+
+def _profile_response(profiler):
+    """Return a profile in the format asked for with ``profile_format``.
+
+    ``collapsed`` (the default) is text for flamegraph tools; ``pstats`` is
+    a file for ``pstats.Stats``.
+    """
+    profile_format = request.args.get("profile_format", "collapsed")
+    if profile_format == "pstats":
+        return send_file(
+            BytesIO(profiler.pstats_dump()),
+            mimetype="application/octet-stream",
+            as_attachment=True,
+            download_name="profile.pstats"
+        )
+    if profile_format != "collapsed":
+        return jsonify(
+            {"error": f"Unknown profile_format {profile_format}"}
+        ), 400
+    return Response(profiler.collapsed(), mimetype="text/plain")
+
+
+@app.route("/debug/profile")
+def debug_profile():
+    """Sample the stacks of every thread in this process for ``seconds``.
+
+    Render workers are separate processes and are not included; profile a
+    single request with ``?profile=1`` to see its rendering.
+    """
+    error = _debug_authorised()
+    if error:
+        return error
+    try:
+        seconds = float(request.args.get("seconds", 10))
+    except ValueError:
+        seconds = -1
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        return jsonify({
+            "error": f"seconds must be between 0 and {MAX_PROFILE_SECONDS:g}"
+        }), 400
+
+    with SamplingProfiler(PROFILE_INTERVAL) as profiler:
+        # Waiting on an event keeps this thread out of its own samples
+        threading.Event().wait(seconds)
+    return _profile_response(profiler)
+
+
+def _endpoint():
+    """Return the URL rule of the request, used as the endpoint label."""
+    return request.url_rule.rule if request.url_rule else request.path
+
+
+def _observe_cohort(n_students, endpoint=None):
+    """Record the number of students in a cohort that was aggregated.
+
+    Jobs aggregate outside the request, so they pass the endpoint label
+    taken while the request was being handled.
+    """
+    COHORT_STUDENTS.observe(n_students, endpoint=endpoint or _endpoint())
+
+
+@app.errorhandler(InvalidUpload)
+@app.errorhandler(CorruptBody)
+def unreadable_body(e):
+    """Answer a body that is not valid in its declared format with 400."""
+    return jsonify({"error": str(e)}), 400
+
+
+@app.errorhandler(UnknownStudent)
+def unknown_student(e):
+    return jsonify({"error": str(e)}), 404
+
+
+@app.errorhandler(DatasetSuperseded)
+def dataset_superseded(e):
+    """Answer a read of a dataset a delta has replaced with 409."""
+    return jsonify({"error": str(e)}), 409
+
+
+@app.errorhandler(BodyTooLarge)
+def body_too_large(e):
+    return jsonify({"error": str(e)}), 413
+
+
+@app.errorhandler(UnsupportedUpload)
+@app.errorhandler(UnsupportedEncoding)
+def unsupported_body(e):
+    """Answer an upload format or Content-Encoding not handled with 415."""
+    return jsonify({"error": str(e)}), 415
+
+
+@app.errorhandler(JobQueueFull)
+def job_queue_full(e):
+    return jsonify({"error": str(e)}), 503
+
+
+@app.errorhandler(Exception)
+def server_error(e):
+    """Answer any other error with 500; HTTP errors keep their status."""
+    if isinstance(e, HTTPException):
+        return e
+    return jsonify({"error": str(e)}), 500
+
+
+def instrumented(view):
+    """Time the stages of a report endpoint and record its metrics.
+
+    Stages (parse, aggregate, cache, render, chart, layout, write) are
+    exclusive wall-clock times, sent in milliseconds in the Server-Timing
+    header along with the total and observed in the /metrics histograms.
+    With ``?debug=timing`` the same figures are returned as JSON in place
+    of the report, as WSGI responses cannot carry HTTP trailers. Work done
+    while a streamed body is being sent is not included.
+
+    Requests picked by memory_sampler also have their peak memory per stage
+    recorded. Tracing slows them down, so their latency is left out of the
+    timing histograms.
+
+    With ``?profile=1`` and the debug token, the request is run under the
+    sampling profiler and the profile is returned instead of the report.
+    """
+    @functools.wraps(view)
+    def timed_view(*args, **kwargs):
+        profile = request.args.get("profile") == "1"
+        if profile:
+            error = _debug_authorised()
+            if error:
+                return error
+            profiler = profiling(SamplingProfiler(
+                PROFILE_INTERVAL, thread_ids=[threading.get_ident()]
+            ))
+        else:
+            profiler = contextlib.nullcontext()
+
+        endpoint = _endpoint()
+        if request.content_length is not None:
+            PAYLOAD_BYTES.observe(request.content_length, endpoint=endpoint)
+        IN_FLIGHT.inc(endpoint=endpoint)
+        try:
+            with memory_sampler.sample() as traced, profiler as profiled:
+                timer = StageTimer(trace_memory=traced,
+                                   top_sites=memory_sampler.top_sites)
+                start = time.perf_counter()
+                with timing(timer):
+                    try:
+                        response = view(*args, **kwargs)
+                    except Exception as e:
+                        # Answer it here, so its status is the one recorded
+                        response = app.handle_user_exception(e)
+                    response = make_response(response)
+                total = time.perf_counter() - start
+        except Exception:
+            REQUESTS.inc(endpoint=endpoint, status="500")
+            REQUEST_ERRORS.inc(endpoint=endpoint)
+            raise
+        finally:
+            IN_FLIGHT.dec(endpoint=endpoint)
+
+        REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+        if response.status_code >= 500:
+            REQUEST_ERRORS.inc(endpoint=endpoint)
+        if traced:
+            MEMORY_SAMPLES.inc(endpoint=endpoint)
+            memory_sampler.record(endpoint, timer)
+            for name, peak in timer.peaks.items():
+                STAGE_PEAK_BYTES.observe(peak, endpoint=endpoint, stage=name)
+        else:
+            REQUEST_SECONDS.observe(total, endpoint=endpoint)
+            for name, seconds in timer.stages.items():
+                STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=name)
+
+        if profile:
+            response = make_response(_profile_response(profiled))
+        elif request.args.get("debug") == "timing":
+            response = jsonify({
+                "status": response.status_code,
+                "stages": timer.to_dict(),
+                "total": round(total * 1000, 3)
+            })
+        response.headers["Server-Timing"] = timer.header(total)
+        response.headers["Timing-Allow-Origin"] = "*"
+        return response
+    return timed_view
+
+
+def _compressed():
+    """Return True if the body has a Content-Encoding other than identity."""
+    encoding = request.headers.get("Content-Encoding", "").strip().lower()
+    return encoding not in ("", "identity")
+
+
+def _body_stream():
+    """Return the request body as a stream, decompressed as it is read.
+
+    Raises:
+        UnsupportedEncoding: If the Content-Encoding is not supported
+    """
+    return decoded_stream(request.stream,
+                          request.headers.get("Content-Encoding"),
+                          MAX_DECOMPRESSED_BYTES)
+
+
+def _request_body():
+    """Return the whole request body, decompressed."""
+    if _compressed():
+        return _body_stream().read()
+    return request.get_data()
+
+
+def _read_cohort():
+    """Read the cohort from the request body.
+
+    Binary uploads (see BINARY_FORMATS) are chosen by Content-Type and
+    loaded straight into columns. With ``?ingest=stream`` a JSON body is
+    parsed incrementally into running per-student totals instead of being
+    materialised as a list of dicts. Compressed JSON bodies are always
+    parsed this way, while they are being decompressed.
+
+    Returns:
+        Tuple: (parsed responses as a list of dicts or ResponseColumns,
+            content hash of the body)
+
+    Raises:
+        InvalidUpload: If a binary or streamed body cannot be parsed
+    """
+    with stage("parse"):
+        if request.mimetype in BINARY_FORMATS:
+            body = _request_body()
+            data = load_columns(body, request.mimetype)
+            data_id = dataset_id_for(body)
+        elif request.args.get("ingest") == "stream" or _compressed():
+            reader = HashingReader(_body_stream())
+            try:
+                data = ingest_stream(reader)
+            except ValueError as e:
+                raise InvalidUpload(f"Invalid JSON upload: {e}") from None
+            data_id = reader.hexdigest()
+        else:
+            data = request.get_json()
+            data_id = dataset_id_for(request.get_data())
+    if data:
+        # Streamed ingest sums each student's responses into one row per group
+        counts = getattr(data, "response_count", None)
+        n_responses = int(counts.sum()) if counts is not None else len(data)
+        COHORT_RESPONSES.observe(n_responses, endpoint=_endpoint())
+    return data, data_id
+
+
+def _chart_backend():
+    """Return the chart backend requested with ``?chart_backend=``.
+
+    Raises:
+        ValueError: If the backend name is not recognised
+    """
+    return resolve_chart_backend(request.args.get("chart_backend"))
+
+
+def _lookup_dataset():
+    """Return the dataset named by the ``dataset`` query parameter.
+
+    Returns:
+        Tuple: (dataset, error response); both None when no ID was given
+    """
+    dataset_id = request.args.get("dataset")
+    if not dataset_id:
+        return None, None
+    dataset = datasets.get(dataset_id)
+    if dataset is None:
+        return None, (jsonify({"error": f"Unknown dataset {dataset_id}"}), 404)
+    return dataset, None
+
+
+def _cached_render(key, render):
+    """Return the report cached under ``key``, rendering it on a miss.
+
+    Args:
+        key: Key of the report, as returned by report_key
+        render: Callable returning the PDF bytes
+    """
+    if report_cache is None:
+        return render()
+    with stage("cache"):
+        return report_cache.get_or_render(key, render)
+
+
+def _not_modified(etag):
+    """Return a 304 response if the client already holds this report.
 
-    # Convert JSON data to string if it's a dict
-    if isinstance(json_data, dict):
-        json_data = json.dumps(json_data)
+    Args:
+        etag: Key of the report, as returned by report_key
 
-    # Import the actual report generation function
-    from report_generator import generate_boe_report
-    generate_boe_report(json_data, output_file)
+    Returns:
+        The 304 response, or None if the report has to be sent
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
 
-    # Read the generated PDF into memory
-    with open(output_file, 'rb') as f:
-        pdf_data = f.read()
 
-    # Clean up the temporary file
-    if temp_output:
-        os.unlink(output_file)
+def _send_pdf(pdf_buffer, download_name, etag=None):
+    """Return a rendered PDF as a download.
 
-    return BytesIO(pdf_data)
+    Args:
+        pdf_buffer: BytesIO holding the PDF
+        download_name: File name offered to the client
+        etag: Key of the report, sent as the ETag header
+    """
+    response = send_file(
+        pdf_buffer,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=download_name,
+        etag=False
+    )
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+@app.route("/datasets", methods=["POST"])
+def upload_dataset():
+    """Parse and aggregate a cohort once and return its content hash."""
+    try:
+        body = _request_body()
+        if not body:
+            return jsonify({"error": "No data provided"}), 400
+
+        # Identical uploads map to the same dataset
+        dataset_id = dataset_id_for(body)
+        dataset = datasets.get(dataset_id)
+        status = 200
+        if dataset is None:
+            if request.mimetype in BINARY_FORMATS:
+                data = load_columns(body, request.mimetype)
+            else:
+                data = json.loads(body)
+                if not data or not isinstance(data, list):
+                    return jsonify(
+                        {"error": "Expected a list of responses"}
+                    ), 400
+            dataset = build_dataset(dataset_id, data)
+            datasets.put(dataset)
+            status = 201
+
+        return jsonify({
+            "dataset_id": dataset.dataset_id,
+            "students": dataset.n_students,
+            "responses": dataset.n_responses
+        }), status
+
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Invalid JSON: {e}"}), 400
+
+
+@app.route("/datasets/<dataset_id>", methods=["PATCH"])
+def patch_dataset(dataset_id):
+    """Apply late submissions and remarks to a stored cohort.
+
+    The body is an object of the form ``{"append": [...], "replace": [...],
+    "delete": [...]}``: appended and replacing responses use the upload
+    format, deleted ones are given by responseId. The statistics are updated
+    in time proportional to the delta and the dataset gets a new ID, so
+    reports rendered before the change are never served for it.
+    """
+    try:
+        body = _request_body()
+        if not body:
+            return jsonify({"error": "No data provided"}), 400
+
+        result = datasets.apply_delta(
+            dataset_id, json.loads(body), delta_dataset_id(dataset_id, body)
+        )
+        if result is None:
+            return jsonify({"error": f"Unknown dataset {dataset_id}"}), 404
+        dataset, applied = result
+
+        return jsonify({
+            "dataset_id": dataset.dataset_id,
+            "previous_dataset_id": dataset_id,
+            "applied": applied,
+            "students": dataset.n_students,
+            "responses": dataset.n_responses
+        })
+
+    except (InvalidDelta, json.JSONDecodeError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
 
 
 @app.route("/generate_report", methods=["POST"])
+@instrumented
 def generate_report():
     try:
+        chart_backend = _chart_backend()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    dataset, error = _lookup_dataset()
+    if error:
+        return error
+
+    if dataset is not None:
+        data, input_id = None, dataset.dataset_id
+    else:
         # Get JSON data from request
-        data = request.get_json()
+        data, input_id = _read_cohort()
         if not data:
             return jsonify({"error": "No data provided"}), 400
 
-        # Generate PDF
-        pdf_buffer = generate_pdf_report(data)
+    # Identical input renders identical bytes, so skip known reports
+    etag = report_key("boe", input_id, chart_backend=chart_backend)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
 
-        # Return the PDF as a download
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name="boe_report.pdf"
-        )
+    def render():
+        if dataset is not None:
+            # Use the stored statistics
+            statistics = dataset.boe_statistics
+        else:
+            with stage("aggregate"):
+                statistics = compute_boe_statistics(data)
+            _observe_cohort(len(statistics['marks']))
+
+        # Generate PDF on a render worker
+        return render_pool.render_boe(statistics, chart_backend)
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    # Return the PDF as a download
+    pdf_data = _cached_render(etag, render)
+    return _send_pdf(BytesIO(pdf_data), "boe_report.pdf", etag)
 
 
 @app.route("/generate_student_report/<student_id>", methods=["POST"])
+@instrumented
 def generate_student_report_endpoint(student_id):
     try:
+        chart_backend = _chart_backend()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    dataset, error = _lookup_dataset()
+    if error:
+        return error
+
+    if dataset is not None:
+        data, input_id = None, dataset.dataset_id
+    else:
         # Get JSON data from request
-        data = request.get_json()
+        data, input_id = _read_cohort()
         if not data:
             return jsonify({"error": "No data provided"}), 400
 
-        # Process student data
-        processed_data = process_student_data(data, student_id)
+    # Identical input renders identical bytes, so skip known reports
+    etag = report_key("student", input_id, student_id, chart_backend)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
 
-        # Create temporary file for the PDF
-        temp_output = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
-        output_file = temp_output.name
-        temp_output.close()
+    def render():
+        with stage("aggregate"):
+            if dataset is not None:
+                # Summarise from the stored statistics
+                processed_data = dataset.summarise_student(student_id)
+            else:
+                # Process student data
+                processed_data = summarise_student(
+                    aggregate_cohort(data), student_id
+                )
+        _observe_cohort(processed_data["ranking"]["cohort_size"])
 
-        # Generate PDF report
-        generate_student_report(processed_data, output_file)
+        # Generate PDF report on a render worker
+        return render_pool.render_student(processed_data, chart_backend)
 
-        # Read the generated PDF
-        with open(output_file, 'rb') as f:
-            pdf_data = f.read()
+    pdf_data = _cached_render(etag, render)
 
-        # Clean up
-        os.unlink(output_file)
+    # Return the PDF
+    return _send_pdf(BytesIO(pdf_data), f"student_report_{student_id}.pdf",
+                     etag)
 
-        # Return the PDF
-        pdf_buffer = BytesIO(pdf_data)
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f"student_report_{student_id}.pdf"
+
+def _batch_student_ids(payload):
+    """Return the student IDs a bulk report request is limited to, if any."""
+    student_ids = None
+    if isinstance(payload, dict):
+        student_ids = payload.get("student_ids")
+    if student_ids is None and request.args.get("student_ids"):
+        student_ids = request.args["student_ids"].split(",")
+    return student_ids
+
+
+def _read_batch():
+    """Read a bulk report request.
+
+    The body is either the cohort list itself or an object of the form
+    ``{"data": [...], "student_ids": [...]}``; student IDs may also be given
+    as a comma-separated ``student_ids`` query parameter.
+
+    Returns:
+        Tuple: (cohort responses, student IDs or None for all students)
+    """
+    with stage("parse"):
+        if _compressed():
+            payload = json.loads(_request_body())
+        else:
+            payload = request.get_json()
+    data = payload.get("data") if isinstance(payload, dict) else payload
+    if data:
+        COHORT_RESPONSES.observe(len(data), endpoint=_endpoint())
+    return data, _batch_student_ids(payload)
+
+
+def _summarise_batch():
+    """Summarise every student of a bulk report request up front.
+
+    With ``?dataset=<id>`` the students come from a stored dataset and the
+    body, if any, is an object of the form ``{"student_ids": [...]}``.
+    Otherwise the request is read by _read_batch.
+
+    Returns:
+        Tuple: (processed data per student, error response); one is None
+
+    Raises:
+        ValueError: If a requested student has no data in the cohort
+    """
+    dataset, error = _lookup_dataset()
+    if error:
+        return None, error
+
+    if dataset is not None:
+        body = _request_body()
+        student_ids = _batch_student_ids(json.loads(body) if body else None)
+        with stage("aggregate"):
+            if student_ids is None:
+                student_ids = dataset.student_ids
+            return [dataset.summarise_student(student_id)
+                    for student_id in student_ids], None
+
+    data, student_ids = _read_batch()
+    if not data:
+        return None, (jsonify({"error": "No data provided"}), 400)
+    with stage("aggregate"):
+        return summarise_students(data, student_ids), None
+
+
+@app.route("/generate_student_reports", methods=["POST"])
+@instrumented
+def generate_student_reports_endpoint():
+    """Render every student's report from one cohort upload as a ZIP.
+
+    The body is either the cohort list itself or an object of the form
+    ``{"data": [...], "student_ids": [...]}`` to limit the batch. Student IDs
+    may also be given as a comma-separated ``student_ids`` query parameter.
+    With ``?dataset=<id>`` the cohort is a stored dataset instead.
+    """
+    # Aggregate once and validate the batch before streaming starts
+    try:
+        chart_backend = _chart_backend()
+        processed, error = _summarise_batch()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if error:
+        return error
+
+    reports = render_summaries(processed, chart_backend, pool=render_pool)
+    return Response(
+        iter_zip(reports),
+        mimetype='application/zip',
+        headers={
+            "Content-Disposition": "attachment; filename=student_reports.zip"
+        }
+    )
+
+
+def _job_created(job):
+    """Return the 202 response for a newly queued job."""
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers["Location"] = f"/jobs/{job.job_id}"
+    return response
+
+
+@app.route("/jobs/boe", methods=["POST"])
+def create_boe_job():
+    """Queue a BOE report; accepts the same input as /generate_report."""
+    try:
+        chart_backend = _chart_backend()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    dataset, error = _lookup_dataset()
+    if error:
+        return error
+
+    if dataset is not None:
+        statistics = dataset.boe_statistics
+        data, input_id = None, dataset.dataset_id
+    else:
+        data, input_id = _read_cohort()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+        statistics = None
+
+    endpoint = _endpoint()
+
+    def render():
+        stats = statistics
+        if stats is None:
+            stats = compute_boe_statistics(data)
+            _observe_cohort(len(stats['marks']), endpoint)
+        return render_pool.render_boe(stats, chart_backend)
+
+    def work(job):
+        job.progress(0, 1)
+        pdf_data = _cached_render(
+            report_key("boe", input_id, chart_backend=chart_backend),
+            render
         )
+        job.progress(1, 1)
+        return pdf_data
+
+    return _job_created(
+        jobs.submit("boe", work, filename="boe_report.pdf")
+    )
+
+
+@app.route("/jobs/student/<student_id>", methods=["POST"])
+def create_student_job(student_id):
+    """Queue one student's report; accepts the same input as
+    /generate_student_report/<student_id>.
+
+    An unknown student is rejected before the job is queued.
+    """
+    try:
+        chart_backend = _chart_backend()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    dataset, error = _lookup_dataset()
+    if error:
+        return error
+
+    if dataset is not None:
+        data, input_id = None, dataset.dataset_id
+    else:
+        data, input_id = _read_cohort()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+    # Summarise now, so an unknown student is not queued
+    with stage("aggregate"):
+        if dataset is not None:
+            processed_data = dataset.summarise_student(student_id)
+        else:
+            processed_data = process_student_data(data, student_id)
+    _observe_cohort(processed_data["ranking"]["cohort_size"])
+
+    def work(job):
+        job.progress(0, 1)
+        pdf_data = _cached_render(
+            report_key("student", input_id, student_id, chart_backend),
+            lambda: render_pool.render_student(processed_data, chart_backend)
+        )
+        job.progress(1, 1)
+        return pdf_data
+
+    return _job_created(jobs.submit(
+        "student", work, filename=f"student_report_{student_id}.pdf"
+    ))
+
+
+@app.route("/jobs/cohort", methods=["POST"])
+def create_cohort_job():
+    """Queue a ZIP of student reports; accepts the same input as
+    /generate_student_reports.
+
+    Unknown students are rejected before the job is queued.
+    """
+    try:
+        chart_backend = _chart_backend()
+        processed, error = _summarise_batch()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if error:
+        return error
+
+    def work(job):
+        reports = render_summaries(
+            processed, chart_backend, pool=render_pool,
+            progress=job.progress
+        )
+        return b"".join(iter_zip(reports))
+
+    return _job_created(jobs.submit(
+        "cohort", work, mimetype="application/zip",
+        filename="student_reports.zip"
+    ))
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Report the status and progress of a job."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """Download the PDF or ZIP produced by a finished job."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    if job.status == "failed":
+        return jsonify({"error": job.error}), 500
+    if job.status != "done":
+        return jsonify(job.to_dict()), 409
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return send_file(
+        BytesIO(job.result),
+        mimetype=job.mimetype,
+        as_attachment=True,
+        download_name=job.filename
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+"""Time each stage of report generation at several cohort sizes.
+
+Usage:
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --threshold 0.2
+
+The public functions behind the endpoints are timed: parse is the JSON
+parsing of a request body (parse_stream the ?ingest=stream path),
+aggregate_student is process_student_data and aggregate_boe is
+compute_boe_statistics. generate_student_report and generate_boe_report
+are timed per chart backend and split into their chart, layout and write
+stages, e.g. student_layout_vector. Every measurement is repeated and the
+fastest run is kept. Results are written as JSON; with --baseline, stages
+slower than the baseline by more than --threshold are reported and the
+exit status is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional
+
+from chart_cache import get_chart_background
+from report_generator import compute_boe_statistics, generate_boe_report
+from report_keys import TEMPLATE_VERSION
+from stage_timing import StageTimer, stage, timing
+from streaming_ingest import ingest_stream
+from student_report import generate_student_report, process_student_data
+from synthetic_cohort import CohortSpec, iter_json
+from vector_charts import CHART_BACKENDS
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+# Stages the report functions are split into
+REPORT_STAGES = ('chart', 'layout', 'write')
+
+
+def _best_of(repeat: int, run: Callable[[], Any]) -> float:
+    """Return the fastest of ``repeat`` timed calls."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _best_stages(repeat: int, run: Callable[[], Any]) -> Dict[str, float]:
+    """Return the stages of the fastest of ``repeat`` calls.
+
+    Time not spent in a chart or write stage is counted as layout.
+    """
+    best: Optional[StageTimer] = None
+    for _ in range(repeat):
+        timer = StageTimer()
+        with timing(timer), stage('layout'):
+            run()
+        if best is None or sum(timer.stages.values()) < sum(best.stages.values()):
+            best = timer
+    return {name: best.stages.get(name, 0.0) for name in REPORT_STAGES}
+
+
+def benchmark_cohort(body: bytes, repeat: int = 3,
+                     sample_students: int = 5) -> Dict[str, float]:
+    """Time every stage for one cohort upload.
+
+    Args:
+        body (bytes): The cohort as a JSON array
+        repeat (int): Number of runs per stage; the fastest is kept
+        sample_students (int): Number of student reports rendered
+
+    Returns:
+        Dict[str, float]: Seconds per stage
+    """
+    timings = {}
+    timings['parse'] = _best_of(repeat, lambda: json.loads(body))
+    timings['parse_stream'] = _best_of(
+        repeat, lambda: ingest_stream(BytesIO(body))
+    )
+    data = json.loads(body)
+
+    # Every student request aggregates the whole cohort
+    student_ids = sorted({str(item['studentId']) for item in data},
+                         key=int)[:sample_students]
+    timings['aggregate_student'] = _best_of(
+        repeat, lambda: process_student_data(data, student_ids[0])
+    )
+    timings['aggregate_boe'] = _best_of(
+        repeat, lambda: compute_boe_statistics(data)
+    )
+    students = [process_student_data(data, student_id)
+                for student_id in student_ids]
+    statistics = compute_boe_statistics(data)
+
+    for backend in CHART_BACKENDS:
+        def student_reports() -> None:
+            # A worker renders the cohort's chart background once
+            get_chart_background.cache_clear()
+            for student in students:
+                generate_student_report(student, BytesIO(), backend)
+
+        def boe_report() -> None:
+            generate_boe_report(None, BytesIO(), statistics=statistics,
+                                chart_backend=backend)
+
+        for report, run in (('student', student_reports),
+                            ('boe', boe_report)):
+            run()  # Import plotting libraries and load fonts untimed
+            for name, seconds in _best_stages(repeat, run).items():
+                timings[f'{report}_{name}_{backend}'] = seconds
+    return timings
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float, min_seconds: float = 0.005) -> List[str]:
+    """List the stages that got slower than the baseline.
+
+    Args:
+        results (Dict[str, Any]): Output of this run
+        baseline (Dict[str, Any]): Output of an earlier run
+        threshold (float): Allowed slowdown as a fraction, e.g. 0.2 for 20%
+        min_seconds (float): Differences below this are treated as noise
+
+    Returns:
+        List[str]: One line per regression
+    """
+    regressions = []
+    for dataset, stages in results['datasets'].items():
+        base_stages = baseline.get('datasets', {}).get(dataset, {})
+        for name, seconds in stages.items():
+            base = base_stages.get(name)
+            if base is None:
+                continue
+            if seconds > base * (1 + threshold) and seconds - base > min_seconds:
+                regressions.append(
+                    f"{dataset}/{name}: {base:.4f}s -> {seconds:.4f}s "
+                    f"(+{(seconds / base - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=DEFAULT_SIZES,
+                        help='synthetic cohort sizes in students')
+    parser.add_argument('--sample', default='jsData.json',
+                        help='sample cohort to benchmark, "" to skip')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--students', type=int, default=5,
+                        help='student reports rendered per cohort')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='earlier results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown before flagging, as a fraction')
+    args = parser.parse_args(argv)
+
+    cohorts = {}
+    if args.sample:
+        with open(args.sample, 'rb') as f:
+            cohorts['sample'] = f.read()
+    for size in args.sizes:
+        cohorts[f'synthetic_{size}'] = b''.join(
+            iter_json(CohortSpec(n_students=size))
+        )
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'template_version': TEMPLATE_VERSION,
+            'repeat': args.repeat,
+            'students': args.students,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'datasets': {}
+    }
+    for name, body in cohorts.items():
+        timings = benchmark_cohort(body, args.repeat, args.students)
+        results['datasets'][name] = timings
+        print(name, ' '.join(f'{key}={seconds:.4f}s'
+                             for key, seconds in timings.items()))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against", args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from columnar import CATEGORICAL_FIELDS, ResponseColumns, code_dtype
+
+
+class UnsupportedUpload(Exception):
+    """Raised when an upload format cannot be read by this server."""
+
+
+class InvalidUpload(Exception):
+    """Raised when an upload is not valid data in its declared format."""
+
+
+def _first_appearance(
+    codes: np.ndarray, categories: List[Any]
+) -> Tuple[np.ndarray, List[Any]]:
+    """Renumber codes so categories are in order of first appearance.
+
+    Reports list groups in the order they first occur in the upload, as
+    with JSON input; dictionaries written by other tools may be sorted or
+    contain unused entries.
+    """
+    used, first_row = np.unique(codes, return_index=True)
+    order = used[np.argsort(first_row, kind='stable')]
+    remap = np.zeros(len(categories), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return (remap[codes].astype(code_dtype(len(order))),
+            [categories[code] for code in order])
+
+
+def _table_columns(table) -> ResponseColumns:
+    """Convert a pyarrow Table with the jsData.json fields into columns."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if 'responseValue' not in table.column_names:
+        raise ValueError("Upload has no responseValue column")
+    n_rows = table.num_rows
+
+    codes = {}
+    categories = {}
+    for field in CATEGORICAL_FIELDS:
+        if field not in table.column_names:
+            # Same as a missing key in every JSON record
+            codes[field] = np.zeros(n_rows, dtype=code_dtype(1))
+            categories[field] = [None]
+            continue
+
+        array = table.column(field).combine_chunks()
+        if not pa.types.is_dictionary(array.type):
+            array = pc.dictionary_encode(array, null_encoding='encode')
+        dictionary = array.dictionary.to_pylist()
+        indices = array.indices
+        if indices.null_count:
+            indices = pc.fill_null(indices, len(dictionary))
+            dictionary.append(None)
+        codes[field], categories[field] = _first_appearance(
+            indices.to_numpy(zero_copy_only=False), dictionary
+        )
+
+    response_value = table.column('responseValue').to_numpy()
+    return ResponseColumns(
+        response_value=response_value.astype(np.float32),
+        codes=codes,
+        categories=categories
+    )
+
+
+def load_arrow_stream(body: bytes) -> ResponseColumns:
+    """Read an Arrow IPC stream of responses."""
+    import pyarrow as pa
+    return _table_columns(pa.ipc.open_stream(body).read_all())
+
+
+def load_arrow_file(body: bytes) -> ResponseColumns:
+    """Read an Arrow IPC file of responses."""
+    import pyarrow as pa
+    return _table_columns(pa.ipc.open_file(pa.BufferReader(body)).read_all())
+
+
+def load_parquet(body: bytes) -> ResponseColumns:
+    """Read a Parquet file of responses, keeping string columns encoded."""
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(BytesIO(body))
+    present = [field for field in CATEGORICAL_FIELDS
+               if field in parquet_file.schema_arrow.names]
+    return _table_columns(
+        parquet_file.read(columns=['responseValue'] + present)
+    )
+
+
+def load_msgpack(body: bytes) -> ResponseColumns:
+    """Read MessagePack responses laid out as a map of column name to array.
+
+    Example: ``{"responseValue": [1, 0, ...], "studentId": [...], ...}``
+    """
+    import msgpack
+
+    table = msgpack.unpackb(body)
+    if not isinstance(table, dict) or 'responseValue' not in table:
+        raise ValueError(
+            "Expected a MessagePack map of columns including responseValue"
+        )
+    response_value = np.asarray(table['responseValue'], dtype=np.float32)
+    n_rows = len(response_value)
+
+    codes = {}
+    categories = {}
+    for field in CATEGORICAL_FIELDS:
+        values = table.get(field)
+        if values is None:
+            values = [None] * n_rows
+        if len(values) != n_rows:
+            raise ValueError(f"Column {field} has {len(values)} rows, "
+                             f"expected {n_rows}")
+        index: Dict[Any, int] = {}
+        raw_codes = [index.setdefault(value, len(index)) for value in values]
+        codes[field] = np.array(raw_codes, dtype=code_dtype(len(index)))
+        categories[field] = list(index)
+
+    return ResponseColumns(
+        response_value=response_value, codes=codes, categories=categories
+    )
+
+
+# Binary upload formats by Content-Type, and the module each one needs
+BINARY_FORMATS: Dict[str, Callable[[bytes], ResponseColumns]] = {
+    'application/vnd.apache.arrow.stream': load_arrow_stream,
+    'application/vnd.apache.arrow.file': load_arrow_file,
+    'application/vnd.apache.parquet': load_parquet,
+    'application/x-parquet': load_parquet,
+    'application/msgpack': load_msgpack,
+    'application/x-msgpack': load_msgpack,
+}
+_REQUIRED_MODULES = {
+    load_arrow_stream: 'pyarrow',
+    load_arrow_file: 'pyarrow',
+    load_parquet: 'pyarrow',
+    load_msgpack: 'msgpack',
+}
+
+
+def load_columns(body: bytes, content_type: str) -> ResponseColumns:
+    """Load a binary cohort upload straight into typed columns.
+
+    Args:
+        body (bytes): Raw request body
+        content_type (str): Media type of the body, one of BINARY_FORMATS
+
+    Returns:
+        ResponseColumns: The encoded responses
+
+    Raises:
+        UnsupportedUpload: If the format, or the library it needs, is not
+            available
+        InvalidUpload: If the body cannot be read in that format
+    """
+    loader = BINARY_FORMATS.get(content_type)
+    if loader is None:
+        raise UnsupportedUpload(f"Unsupported upload type {content_type}")
+    try:
+        return loader(body)
+    except ImportError:
+        raise UnsupportedUpload(
+            f"{content_type} uploads need the {_REQUIRED_MODULES[loader]} "
+            "package, which is not installed"
+        ) from None
+    except (ValueError, TypeError, KeyError) as e:
+        # pyarrow and msgpack report corrupt input as ValueError subclasses;
+        # well-formed input of the wrong shape, such as a column that is not
+        # an array, fails with TypeError or KeyError
+        raise InvalidUpload(f"Invalid {content_type} upload: {e}") from None
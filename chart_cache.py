@@ -0,0 +1,172 @@
+import copy
+import hashlib
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image as PILImage
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+from reportlab.platypus import Flowable
+
+from aggregation import PASS_MARK
+
+# Matplotlib's font and text caches are not safe to share between threads
+_render_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ChartBackground:
+    """The cohort part of the performance chart, rendered once.
+
+    Attributes:
+        image (PDFImageXObject): Encoded bitmap, ready to embed in any PDF
+        axes_box (Tuple[float, float, float, float]): Left, bottom, right and
+            top of the plot area as fractions of the image
+        xlim (Tuple[float, float]): Data range of the x axis
+        ylim (Tuple[float, float]): Data range of the y axis
+    """
+    image: PDFImageXObject
+    axes_box: Tuple[float, float, float, float]
+    xlim: Tuple[float, float]
+    ylim: Tuple[float, float]
+
+
+@lru_cache(maxsize=32)
+def get_chart_background(
+    mean: float, stdev: float, pass_mark: float = PASS_MARK
+) -> ChartBackground:
+    """Render the bell curve, grid, pass-mark and labels for a cohort.
+
+    Args:
+        mean (float): Mean of the cohort's overall scores
+        stdev (float): Standard deviation of the cohort's overall scores
+        pass_mark (float): Pass-mark in percent
+
+    Returns:
+        ChartBackground: The cached background
+    """
+    # Create bell curve data
+    x = np.linspace(0, 100, 100)
+    y = ((1/(stdev * np.sqrt(2 * np.pi))) *
+        np.exp(-(x - mean)**2 / (2 * stdev**2)))
+
+    with _render_lock:
+        fig = Figure(figsize=(8, 6), dpi=300)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        ax.plot(x, y, 'k-', linewidth=1)
+
+        # Add pass mark line
+        ax.axvline(x=pass_mark, color='gray', linestyle='--', linewidth=1)
+        ax.text(pass_mark + 0.5, ax.get_ylim()[1],
+                f'Pass-mark = {pass_mark:.2f}%', rotation=0)
+
+        # Customize the plot
+        ax.set_xlabel('Overall Percentage Marks')
+        ax.set_ylabel('Density Function')
+        ax.grid(True, alpha=0.3)
+        ax.set_title('Your Performance')
+        fig.tight_layout()
+        canvas.draw()
+
+        pixels = PILImage.fromarray(np.asarray(canvas.buffer_rgba()))
+        position = ax.get_position()
+        xlim, ylim = ax.get_xlim(), ax.get_ylim()
+
+    name = 'PerfChart' + hashlib.md5(
+        f'{mean!r}:{stdev!r}:{pass_mark!r}'.encode()
+    ).hexdigest()
+    image = PDFImageXObject(name, ImageReader(pixels.convert('RGB')))
+    image.name = name
+
+    return ChartBackground(
+        image=image,
+        axes_box=(position.x0, position.y0, position.x1, position.y1),
+        xlim=tuple(xlim),
+        ylim=tuple(ylim)
+    )
+
+
+class PerformanceChart(Flowable):
+    """Cached cohort background with the student's mark drawn as vectors."""
+
+    def __init__(self, background: ChartBackground, your_mark: float,
+                 width: float = 400, height: float = 300) -> None:
+        super().__init__()
+        self.background = background
+        self.your_mark = your_mark
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def _draw_background(self) -> None:
+        # Same registration as Canvas.drawImage, minus re-encoding the bitmap.
+        # Each document tags the objects it registers, so give it a shallow
+        # copy sharing the encoded stream. This uses canvas internals, which
+        # is why requirements.txt pins reportlab; tests/test_student_report.py
+        # checks the embedded image after an upgrade.
+        canv = self.canv
+        image = self.background.image
+        reg_name = canv._doc.getXObjectName(image.name)
+        if not canv._doc.idToObject.get(reg_name):
+            image = copy.copy(image)
+            canv._setXObjects(image)
+            canv._doc.Reference(image, reg_name)
+            canv._doc.addForm(image.name, image)
+        canv.saveState()
+        canv.scale(self.width, self.height)
+        canv._code.append("/%s Do" % reg_name)
+        canv.restoreState()
+        canv._formsinuse.append(image.name)
+
+    def draw(self) -> None:
+        self._draw_background()
+
+        # Map the mark from data coordinates onto the plot area
+        left, bottom, right, top = self.background.axes_box
+        x_min, x_max = self.background.xlim
+        mark = min(max(self.your_mark, x_min), x_max)
+        x = (left + (mark - x_min) / (x_max - x_min) * (right - left)) * self.width
+        y_bottom = bottom * self.height
+        y_top = top * self.height
+
+        # Add your mark line and text
+        canv = self.canv
+        canv.saveState()
+        canv.setLineWidth(0.7)
+        canv.line(x, y_bottom, x, y_top)
+        font_size = 10 * self.width / (8 * 72)
+        canv.setFont('Helvetica', font_size)
+        label_x = x + self.width * (right - left) / (x_max - x_min)
+        y_min, y_max = self.background.ylim
+        label_y = y_bottom + (0.95 * y_max - y_min) / (y_max - y_min) * (y_top - y_bottom)
+        canv.drawString(label_x, label_y + font_size * 1.2, 'Your mark')
+        canv.drawString(label_x, label_y, f'{self.your_mark:.1f}')
+        canv.restoreState()
+
+
+def performance_chart(overall_scores: Dict[str, float],
+                      width: float = 400, height: float = 300) -> PerformanceChart:
+    """Build the performance chart flowable for one student.
+
+    Args:
+        overall_scores (Dict[str, float]): Dictionary containing overall score statistics
+        width (float): Width of the chart in points
+        height (float): Height of the chart in points
+
+    Returns:
+        PerformanceChart: The chart flowable
+    """
+    background = get_chart_background(
+        float(overall_scores['mean']), float(overall_scores['stdev'])
+    )
+    return PerformanceChart(
+        background, float(overall_scores['your_score']), width, height
+    )
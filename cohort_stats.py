@@ -0,0 +1,441 @@
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from aggregation import (
+    UnknownStudent, classify_outcome, rank_score, student_key
+)
+from aggregate_cube import CUBE_FIELDS, build_cube
+from columnar import as_columns
+from report_generator import boe_statistics_from_sums
+
+# A stored response: (student ID, item group code, item subgroup name, value)
+Response = Tuple[int, str, str, float]
+
+# Fields every appended or replacing response must carry
+DELTA_FIELDS = ('responseId', 'studentId', 'responseValue', 'itemGroupCode',
+                'itemSubGroupName')
+
+
+class InvalidDelta(Exception):
+    """A response delta cannot be applied to the cohort."""
+
+
+class RunningStats:
+    """Count, mean and variance of a changing set of values.
+
+    The mean and variance are kept with Welford's algorithm, which is
+    updated in O(1) when a value is added or removed. The values are also
+    kept sorted, giving the minimum, maximum and rank of any value by
+    binary search.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.values: List[float] = []
+
+    @classmethod
+    def from_values(cls, values: Sequence[float]) -> 'RunningStats':
+        """Build the statistics of an initial set of values in bulk."""
+        stats = cls()
+        array = np.asarray(values, dtype=np.float64)
+        if array.size:
+            stats.count = int(array.size)
+            stats.mean = float(array.mean())
+            stats._m2 = float(((array - stats.mean) ** 2).sum())
+            stats.values = sorted(array.tolist())
+        return stats
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        bisect.insort(self.values, value)
+
+    def remove(self, value: float) -> None:
+        """Remove a value previously added; it must be present."""
+        index = bisect.bisect_left(self.values, value)
+        if index == len(self.values) or self.values[index] != value:
+            raise KeyError(value)
+        del self.values[index]
+        self.count -= 1
+        if self.count == 0:
+            self.mean = self._m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        # Removal can round below zero when the remaining values are equal
+        self._m2 = max(self._m2 - delta * (value - self.mean), 0.0)
+
+    def replace(self, old: Optional[float], new: Optional[float]) -> None:
+        """Swap one value for another; None stands for no value."""
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+    def summary(self) -> Dict[str, float]:
+        """Return min, max, mean and population standard deviation."""
+        if self.count == 0:
+            return {"min": 0.0, "max": 0.0, "mean": 0.0, "stdev": 0.0}
+        return {
+            "min": self.values[0],
+            "max": self.values[-1],
+            "mean": self.mean,
+            "stdev": (self._m2 / self.count) ** 0.5 if self.count > 1 else 0.0
+        }
+
+
+def _percentage(cell: Optional[List[float]]) -> Optional[float]:
+    # cell is [sum, count]; students without responses have no score
+    if cell is None:
+        return None
+    return cell[0] / cell[1] * 100
+
+
+def _response_value(value: Any) -> float:
+    # Uploaded values are stored as float32 columns; round deltas the same
+    # way so a patched cohort matches a fresh upload of the same responses
+    return float(np.float32(value))
+
+
+class CohortStats:
+    """Cohort statistics that follow response deltas incrementally.
+
+    Per-student sums and counts are kept for every item group and subgroup,
+    along with RunningStats of the students' percentage scores per group and
+    overall. Appending, replacing or deleting a response updates the cells
+    of one student and two score sets, so a delta costs time proportional
+    to its size rather than to the cohort.
+
+    Responses can only be replaced or deleted if the store was built with
+    their IDs; each indexed response costs roughly 200 bytes.
+
+    Attributes:
+        lock (threading.Lock): Held while reading or changing the store
+        n_responses (int): Number of responses in the cohort
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.n_responses = 0
+        # student -> group -> [sum, count]
+        self._cells: Dict[int, Dict[str, List[float]]] = {}
+        # student -> (group, subgroup) -> [sum, count]
+        self._subgroup_cells: Dict[int, Dict[Tuple[str, str], List[float]]] = {}
+        # student -> [sum, count] over all groups
+        self._totals: Dict[int, List[float]] = {}
+        # Responses per group, in order of first appearance
+        self._group_responses: Dict[str, int] = {}
+        self._group_scores: Dict[str, RunningStats] = {}
+        self._overall_scores = RunningStats()
+        # responseId -> (response, number of identical copies uploaded)
+        self._responses: Optional[Dict[str, Tuple[Response, int]]] = None
+        self._boe_statistics: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_columns(cls, data: Any,
+                     response_ids: Optional[Sequence[str]] = None) -> 'CohortStats':
+        """Build the store for an uploaded cohort.
+
+        Args:
+            data (Any): Parsed responses as a list of dicts or ResponseColumns
+            response_ids (Optional[Sequence[str]]): responseId of every row;
+                without them responses can be appended but not replaced or
+                deleted
+
+        Returns:
+            CohortStats: The store
+        """
+        columns = as_columns(data, CUBE_FIELDS)
+        if not len(columns):
+            raise ValueError("No responses provided")
+        store = cls()
+        store.n_responses = len(columns)
+
+        def decoded(codes: Dict[str, np.ndarray], field: str) -> List[Any]:
+            categories = columns.categories[field]
+            if field == 'studentId':
+                return [int(categories[code]) for code in codes[field]]
+            return [categories[code] for code in codes[field]]
+
+        # Cells are rollups of one cube, as in aggregate_cohort
+        cube = build_cube(columns)
+        codes, sums, counts = cube.rollup(('studentId', 'itemGroupCode'))
+        for student, group, total, count in zip(
+                cube.decode('studentId', codes['studentId']),
+                cube.decode('itemGroupCode', codes['itemGroupCode']),
+                sums.tolist(), counts.tolist()):
+            student = int(student)
+            # IDs that differ only in type are one student; add their cells
+            cell = store._cells.setdefault(student, {}).setdefault(
+                group, [0.0, 0]
+            )
+            cell[0] += total
+            cell[1] += count
+            student_total = store._totals.setdefault(student, [0.0, 0])
+            student_total[0] += total
+            student_total[1] += count
+
+        codes, sums, counts = cube.rollup(
+            ('studentId', 'itemGroupCode', 'itemSubGroupCode')
+        )
+        for student, group, subgroup, total, count in zip(
+                cube.decode('studentId', codes['studentId']),
+                cube.decode('itemGroupCode', codes['itemGroupCode']),
+                cube.decode('itemSubGroupCode', codes['itemSubGroupCode']),
+                sums.tolist(), counts.tolist()):
+            # Blocks are kept by name, as the BOE report shows them
+            key = (group, cube.subgroup_names[subgroup])
+            cell = store._subgroup_cells.setdefault(int(student), {}).setdefault(
+                key, [0.0, 0]
+            )
+            cell[0] += total
+            cell[1] += count
+
+        # Groups in order of first appearance
+        codes, _, counts = cube.rollup(('itemGroupCode',))
+        group_responses = dict(zip(codes['itemGroupCode'].tolist(),
+                                   counts.tolist()))
+        for code, group in enumerate(cube.categories['itemGroupCode']):
+            if group_responses.get(code):
+                store._group_responses[group] = group_responses[code]
+
+        for group in store._group_responses:
+            store._group_scores[group] = RunningStats.from_values([
+                _percentage(cells[group]) for cells in store._cells.values()
+                if group in cells
+            ])
+        store._overall_scores = RunningStats.from_values(
+            [_percentage(total) for total in store._totals.values()]
+        )
+
+        if response_ids is not None:
+            store._responses = {}
+            for response_id, response in zip(response_ids, zip(
+                    decoded(columns.codes, 'studentId'),
+                    decoded(columns.codes, 'itemGroupCode'),
+                    decoded(columns.codes, 'itemSubGroupName'),
+                    columns.response_value.tolist())):
+                indexed = store._responses.get(response_id)
+                if indexed is None:
+                    store._responses[response_id] = (response, 1)
+                elif indexed[0] == response:
+                    # Exported twice; replaced and deleted together
+                    store._responses[response_id] = (response, indexed[1] + 1)
+                else:
+                    # One ID naming different responses cannot be changed
+                    # safely; keep the cohort but accept appends only
+                    store._responses = None
+                    break
+        return store
+
+    @property
+    def n_students(self) -> int:
+        return len(self._totals)
+
+    @property
+    def student_ids(self) -> List[str]:
+        """IDs of the students with responses, in ID order."""
+        return [str(student) for student in sorted(self._totals)]
+
+    def _update(self, response: Response, copies: int) -> None:
+        """Add copies of a response, or remove them if copies is negative."""
+        student, group, subgroup, value = response
+
+        cells = self._cells.setdefault(student, {})
+        old_score = _percentage(cells.get(group))
+        cell = cells.setdefault(group, [0.0, 0])
+        cell[0] += copies * value
+        cell[1] += copies
+        if cell[1] == 0:
+            del cells[group]
+        new_score = _percentage(cells.get(group))
+
+        total = self._totals.setdefault(student, [0.0, 0])
+        old_overall = _percentage(total) if total[1] else None
+        total[0] += copies * value
+        total[1] += copies
+        new_overall = _percentage(total) if total[1] else None
+        if total[1] == 0:
+            del self._totals[student]
+            del self._cells[student]
+
+        subgroup_cells = self._subgroup_cells.setdefault(student, {})
+        subgroup_cell = subgroup_cells.setdefault((group, subgroup), [0.0, 0])
+        subgroup_cell[0] += copies * value
+        subgroup_cell[1] += copies
+        if subgroup_cell[1] == 0:
+            del subgroup_cells[(group, subgroup)]
+            if not subgroup_cells:
+                del self._subgroup_cells[student]
+
+        self._group_responses[group] = self._group_responses.get(group, 0) + copies
+        group_scores = self._group_scores.setdefault(group, RunningStats())
+        group_scores.replace(old_score, new_score)
+        if self._group_responses[group] == 0:
+            del self._group_responses[group]
+            del self._group_scores[group]
+
+        self._overall_scores.replace(old_overall, new_overall)
+        self.n_responses += copies
+
+    def _parse(self, record: Any) -> Tuple[str, Response]:
+        if not isinstance(record, dict):
+            raise InvalidDelta("Appended and replacing responses must be objects")
+        missing = [field for field in DELTA_FIELDS if record.get(field) is None]
+        if missing:
+            raise InvalidDelta(
+                f"Response {record.get('responseId')} is missing {', '.join(missing)}"
+            )
+        try:
+            response = (int(record['studentId']), record['itemGroupCode'],
+                        record['itemSubGroupName'],
+                        _response_value(record['responseValue']))
+        except (TypeError, ValueError) as e:
+            raise InvalidDelta(
+                f"Response {record['responseId']} is invalid: {e}"
+            ) from None
+        return record['responseId'], response
+
+    def apply(self, delta: Dict[str, Iterable[Any]]) -> Dict[str, int]:
+        """Apply a response delta.
+
+        The delta is an object with optional ``append`` and ``replace``
+        lists of response records and a ``delete`` list of response IDs.
+        It is checked in full before anything changes, so an invalid delta
+        leaves the store as it was.
+
+        Args:
+            delta (Dict[str, Iterable[Any]]): The changes to apply
+
+        Returns:
+            Dict[str, int]: Number of responses appended, replaced and deleted
+
+        Raises:
+            InvalidDelta: If the delta is malformed, appends a response that
+                exists, changes one that does not, or names a response twice
+        """
+        if not isinstance(delta, dict):
+            raise InvalidDelta("Expected an object with append, replace and "
+                               "delete lists")
+        unknown = set(delta) - {'append', 'replace', 'delete'}
+        if unknown:
+            raise InvalidDelta(f"Unknown delta operations: {', '.join(sorted(unknown))}")
+        operations = {name: list(delta.get(name) or [])
+                      for name in ('append', 'replace', 'delete')}
+        if self._responses is None and (operations['replace'] or operations['delete']):
+            raise InvalidDelta("This cohort was uploaded without unique "
+                               "response IDs, so responses can only be appended")
+
+        responses = self._responses if self._responses is not None else {}
+        seen = set()
+        changes: List[Tuple[str, Optional[Tuple[Response, int]],
+                            Optional[Response]]] = []
+        for name in ('append', 'replace', 'delete'):
+            for item in operations[name]:
+                if name == 'delete':
+                    response_id, new = item, None
+                else:
+                    response_id, new = self._parse(item)
+                if not isinstance(response_id, str):
+                    raise InvalidDelta(f"Response IDs must be strings, got {response_id!r}")
+                if response_id in seen:
+                    raise InvalidDelta(f"Response {response_id} appears more than once")
+                seen.add(response_id)
+                old = responses.get(response_id)
+                if name == 'append' and old is not None:
+                    raise InvalidDelta(f"Response {response_id} already exists")
+                if name != 'append' and old is None:
+                    raise InvalidDelta(f"Unknown response {response_id}")
+                changes.append((response_id, old, new))
+
+        for response_id, old, new in changes:
+            copies = 1
+            if old is not None:
+                old, copies = old
+                self._update(old, -copies)
+            if new is not None:
+                self._update(new, copies)
+            if self._responses is not None:
+                if new is None:
+                    del self._responses[response_id]
+                else:
+                    self._responses[response_id] = (new, copies)
+        if changes:
+            self._boe_statistics = None
+        return {name: len(items) for name, items in operations.items()}
+
+    def summarise_student(self, student_id: str) -> Dict[str, Any]:
+        """Build the report data for one student, as summarise_student does.
+
+        Args:
+            student_id (str): ID of the student to summarise
+
+        Returns:
+            Dict[str, Any]: Processed student data with summary statistics
+
+        Raises:
+            UnknownStudent: If the student has no responses in the cohort
+        """
+        key = student_key(student_id)
+        cells = self._cells.get(key)
+        if cells is None:
+            raise UnknownStudent(f"No data found for student {student_id}")
+
+        summary_results = [{
+            "component": group,
+            "your_score": _percentage(cells[group]),
+            "total_available": 100,
+            **self._group_scores[group].summary()
+        } for group in self._group_responses if group in cells]
+
+        overall_score = _percentage(self._totals[key])
+        summary_results.insert(0, {
+            "component": "Overall Scores",
+            "your_score": overall_score,
+            "total_available": 100,
+            **self._overall_scores.summary()
+        })
+
+        return {
+            "student_id": str(student_id),
+            "overall_outcome": classify_outcome(overall_score),
+            "summary_results": summary_results,
+            "ranking": rank_score(self._overall_scores.values, overall_score)
+        }
+
+    def boe_statistics(self) -> Dict[str, Any]:
+        """Return the BOE report tables, as compute_boe_statistics does.
+
+        The tables are rebuilt from the per-student cells, not the
+        responses, and kept until the next delta.
+        """
+        if self._boe_statistics is None:
+            marks = pd.DataFrame({
+                'studentId': list(self._totals),
+                'responseValue': [total[0] for total in self._totals.values()]
+            })
+            summed = pd.DataFrame(
+                [(student, group, cell[0])
+                 for student, cells in self._cells.items()
+                 for group, cell in cells.items()],
+                columns=['studentId', 'itemGroupCode', 'responseValue']
+            )
+            subgroups = pd.DataFrame(
+                [(group, student, subgroup, cell[0])
+                 for student, cells in self._subgroup_cells.items()
+                 for (group, subgroup), cell in cells.items()],
+                columns=['itemGroupCode', 'studentId', 'itemSubGroupName',
+                         'responseValue']
+            )
+            self._boe_statistics = boe_statistics_from_sums(
+                marks, summed, subgroups, list(self._group_responses)
+            )
+        return self._boe_statistics
@@ -0,0 +1,187 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+# Fields stored as integer codes plus a lookup table of distinct values.
+# responseId is unique per row and unused by the reports, so it is dropped.
+CATEGORICAL_FIELDS = (
+    'studentId', 'cohort', 'calendarYear', 'teachingPeriod',
+    'itemID', 'itemCode', 'itemName',
+    'itemGroupID', 'itemGroupCode', 'itemGroupName',
+    'itemSubGroupID', 'itemSubGroupCode', 'itemSubGroupName'
+)
+
+
+def code_dtype(n_categories: int) -> np.dtype:
+    """Pick the smallest unsigned integer type able to hold the codes."""
+    if n_categories <= np.iinfo(np.uint8).max + 1:
+        return np.dtype(np.uint8)
+    if n_categories <= np.iinfo(np.uint16).max + 1:
+        return np.dtype(np.uint16)
+    return np.dtype(np.uint32)
+
+
+@dataclass
+class ResponseColumns:
+    """Dictionary-encoded, column-oriented response records.
+
+    Attributes:
+        response_value (np.ndarray): responseValue of every row as float32
+        codes (Dict[str, np.ndarray]): Integer codes per categorical field
+        categories (Dict[str, List[Any]]): Distinct values per categorical
+            field, indexed by code, in order of first appearance
+        response_count (Optional[np.ndarray]): Number of responses summed
+            into each row, or None when every row is a single response
+    """
+    response_value: np.ndarray
+    codes: Dict[str, np.ndarray]
+    categories: Dict[str, List[Any]]
+    response_count: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.response_value)
+
+    def decode(self, field: str) -> np.ndarray:
+        """Expand a categorical field back into one value per row.
+
+        Args:
+            field (str): Name of a categorical field
+
+        Returns:
+            np.ndarray: The field's value for every row
+        """
+        lookup = np.empty(len(self.categories[field]), dtype=object)
+        lookup[:] = self.categories[field]
+        return lookup[self.codes[field]]
+
+    def counts(self, group_index: np.ndarray, minlength: int = 0) -> np.ndarray:
+        """Count the responses falling into each group.
+
+        Args:
+            group_index (np.ndarray): Group number of every row
+            minlength (int): Minimum number of groups in the result
+
+        Returns:
+            np.ndarray: Number of responses per group
+        """
+        if self.response_count is None:
+            return np.bincount(group_index, minlength=minlength)
+        return np.bincount(
+            group_index, weights=self.response_count, minlength=minlength
+        ).astype(np.int64)
+
+    def nbytes(self) -> int:
+        """Size of the column arrays in bytes (lookup tables excluded)."""
+        total = self.response_value.nbytes + sum(
+            codes.nbytes for codes in self.codes.values()
+        )
+        if self.response_count is not None:
+            total += self.response_count.nbytes
+        return total
+
+
+def encode_records(
+    records: List[Dict[str, Any]], fields: Sequence[str] = CATEGORICAL_FIELDS
+) -> ResponseColumns:
+    """Convert a list of response dicts into typed columns.
+
+    Encoding costs a pass over the records per field, so callers that group
+    by a few fields should name only those.
+
+    Args:
+        records (List[Dict[str, Any]]): Raw data from JSON file
+        fields (Sequence[str]): Categorical fields to encode
+
+    Returns:
+        ResponseColumns: The encoded responses
+    """
+    response_value = np.fromiter(
+        (item['responseValue'] for item in records),
+        dtype=np.float32, count=len(records)
+    )
+
+    codes = {}
+    categories = {}
+    for field in fields:
+        index: Dict[Any, int] = {}
+        raw_codes = [index.setdefault(item.get(field), len(index))
+                     for item in records]
+        codes[field] = np.array(raw_codes, dtype=code_dtype(len(index)))
+        categories[field] = list(index)
+
+    return ResponseColumns(
+        response_value=response_value, codes=codes, categories=categories
+    )
+
+
+def as_columns(
+    data: Any, fields: Sequence[str] = CATEGORICAL_FIELDS
+) -> ResponseColumns:
+    """Accept either encoded columns or a list of response dicts.
+
+    Args:
+        data (Any): ResponseColumns or raw data from JSON file
+        fields (Sequence[str]): Categorical fields a list of dicts must have
+            encoded; columns are returned as they are
+
+    Returns:
+        ResponseColumns: The encoded responses
+    """
+    if isinstance(data, ResponseColumns):
+        return data
+    return encode_records(data, fields)
+
+
+def group_index(
+    columns: ResponseColumns, fields: Sequence[str]
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Number the distinct combinations of fields present in the columns.
+
+    The field codes are packed into a single integer key. When the key space
+    is small next to the number of rows the keys present are found with one
+    ``np.bincount``; otherwise with ``np.unique``, which has to sort. Groups
+    are numbered in key order either way.
+
+    Args:
+        columns (ResponseColumns): Encoded responses
+        fields (Sequence[str]): Categorical fields to group by
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], np.ndarray]: Codes of each field per
+            group, and the group number of every row
+    """
+    shape = tuple(len(columns.categories[field]) for field in fields)
+    key = np.ravel_multi_index(
+        tuple(columns.codes[field] for field in fields), shape
+    ).astype(np.int64, copy=False)
+
+    key_space = int(np.prod(shape, dtype=np.int64))
+    if key_space <= 4 * len(columns):
+        present = np.bincount(key, minlength=key_space) > 0
+        unique_keys = np.flatnonzero(present)
+        inverse = (np.cumsum(present) - 1)[key]
+    else:
+        unique_keys, inverse = np.unique(key, return_inverse=True)
+
+    # Unpack the key back into per-field codes
+    group_codes = dict(zip(fields, np.unravel_index(unique_keys, shape)))
+    return group_codes, inverse
+
+
+def group_by(
+    columns: ResponseColumns, fields: Sequence[str]
+) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    """Sum and count responseValue for every distinct combination of fields.
+
+    Args:
+        columns (ResponseColumns): Encoded responses
+        fields (Sequence[str]): Categorical fields to group by
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]: Codes of each
+            field per group, sum of responseValue and number of responses
+    """
+    group_codes, inverse = group_index(columns, fields)
+    sums = np.bincount(inverse, weights=columns.response_value)
+    counts = columns.counts(inverse)
+    return group_codes, sums, counts
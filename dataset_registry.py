@@ -0,0 +1,214 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from cohort_stats import CohortStats
+from columnar import ResponseColumns
+
+
+class DatasetSuperseded(Exception):
+    """A delta was applied to the dataset after it was looked up."""
+
+
+@dataclass
+class Dataset:
+    """A parsed, pre-aggregated cohort upload.
+
+    Attributes:
+        dataset_id (str): Content hash of the uploaded body, chained with
+            every delta applied since
+        stats (CohortStats): Statistics used by both report types, handed on
+            to the dataset a delta turns this one into
+        created (float): Monotonic time the dataset was registered
+        superseded_by (Optional[str]): ID of the dataset a delta turned this
+            one into, if any
+    """
+    dataset_id: str
+    stats: CohortStats
+    created: float = field(default_factory=time.monotonic)
+    superseded_by: Optional[str] = None
+
+    @contextmanager
+    def _reading(self) -> Iterator[CohortStats]:
+        # Reports keyed by this ID must not see a later delta
+        with self.stats.lock:
+            if self.superseded_by is not None:
+                raise DatasetSuperseded(
+                    f"Dataset {self.dataset_id} was updated to "
+                    f"{self.superseded_by}"
+                )
+            yield self.stats
+
+    @property
+    def n_students(self) -> int:
+        with self._reading() as stats:
+            return stats.n_students
+
+    @property
+    def student_ids(self) -> List[str]:
+        with self._reading() as stats:
+            return stats.student_ids
+
+    @property
+    def n_responses(self) -> int:
+        with self._reading() as stats:
+            return stats.n_responses
+
+    @property
+    def boe_statistics(self) -> Dict[str, Any]:
+        """Tables used by the BOE report."""
+        with self._reading() as stats:
+            return stats.boe_statistics()
+
+    def summarise_student(self, student_id: str) -> Dict[str, Any]:
+        """Build the report data for one student of the cohort."""
+        with self._reading() as stats:
+            return stats.summarise_student(student_id)
+
+
+def dataset_id_for(body: bytes) -> str:
+    """Derive the content-addressed ID of an uploaded body.
+
+    Args:
+        body (bytes): Raw request body
+
+    Returns:
+        str: Hex SHA-256 digest of the body
+    """
+    return hashlib.sha256(body).hexdigest()
+
+
+def delta_dataset_id(dataset_id: str, body: bytes) -> str:
+    """Derive the ID of a dataset after a delta is applied to it.
+
+    Args:
+        dataset_id (str): ID of the dataset the delta applies to
+        body (bytes): Raw delta request body
+
+    Returns:
+        str: Hex SHA-256 digest of the previous ID and the delta
+    """
+    return dataset_id_for(dataset_id.encode() + b'\n' + body)
+
+
+def build_dataset(
+    dataset_id: str, raw_data: Union[List[Dict[str, Any]], ResponseColumns]
+) -> Dataset:
+    """Aggregate a parsed cohort for both report types.
+
+    Responses uploaded as a list of dicts with unique responseIds can later
+    be replaced or deleted by deltas; other uploads only accept appends.
+
+    Args:
+        dataset_id (str): ID to register the dataset under
+        raw_data (Union[List[Dict[str, Any]], ResponseColumns]): Parsed
+            responses, or the same data already encoded as columns
+
+    Returns:
+        Dataset: The pre-aggregated cohort
+    """
+    response_ids = None
+    if isinstance(raw_data, list):
+        response_ids = [record.get('responseId') for record in raw_data]
+        if None in response_ids:
+            response_ids = None
+    return Dataset(
+        dataset_id=dataset_id,
+        stats=CohortStats.from_columns(raw_data, response_ids)
+    )
+
+
+class DatasetRegistry:
+    """Bounded in-memory store of datasets with LRU and TTL eviction.
+
+    Datasets keep per-student totals rather than the responses themselves,
+    plus an index of response values where responses can be replaced or
+    deleted later.
+    """
+
+    def __init__(self, max_entries: int = 32, ttl_seconds: float = 3600) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dataset]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, dataset: Dataset, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - dataset.created > self.ttl_seconds
+
+    def get(self, dataset_id: str) -> Optional[Dataset]:
+        """Look up a dataset, refreshing its LRU position.
+
+        Args:
+            dataset_id (str): ID returned when the dataset was registered
+
+        Returns:
+            Optional[Dataset]: The dataset, or None if unknown or expired
+        """
+        with self._lock:
+            dataset = self._entries.get(dataset_id)
+            if dataset is None:
+                return None
+            if self._expired(dataset, time.monotonic()):
+                del self._entries[dataset_id]
+                return None
+            self._entries.move_to_end(dataset_id)
+            return dataset
+
+    def put(self, dataset: Dataset) -> None:
+        """Register a dataset, evicting expired and least recently used ones.
+
+        Args:
+            dataset (Dataset): The dataset to store
+        """
+        with self._lock:
+            now = time.monotonic()
+            for dataset_id in [key for key, value in self._entries.items()
+                               if self._expired(value, now)]:
+                del self._entries[dataset_id]
+
+            self._entries[dataset.dataset_id] = dataset
+            self._entries.move_to_end(dataset.dataset_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def apply_delta(self, dataset_id: str, delta: Dict[str, Any],
+                    new_id: str) -> Optional[Tuple[Dataset, Dict[str, int]]]:
+        """Apply a response delta to a dataset and register the result.
+
+        The statistics are updated in place and move to a new dataset under
+        ``new_id``; the old ID is dropped, so reports cached under it stay
+        correct for the data they were rendered from.
+
+        Args:
+            dataset_id (str): ID of the dataset to change
+            delta (Dict[str, Any]): Changes, as taken by CohortStats.apply
+            new_id (str): ID of the updated dataset, see delta_dataset_id
+
+        Returns:
+            Optional[Tuple[Dataset, Dict[str, int]]]: The updated dataset and
+                the number of responses appended, replaced and deleted, or
+                None if the dataset is unknown or expired
+
+        Raises:
+            InvalidDelta: If the delta cannot be applied
+            DatasetSuperseded: If another delta was applied first
+        """
+        dataset = self.get(dataset_id)
+        if dataset is None:
+            return None
+        with dataset._reading() as stats:
+            applied = stats.apply(delta)
+            updated = Dataset(dataset_id=new_id, stats=stats)
+            dataset.superseded_by = new_id
+        with self._lock:
+            self._entries.pop(dataset_id, None)
+        self.put(updated)
+        return updated, applied
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,150 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+@dataclass
+class Job:
+    """A report rendered in the background.
+
+    Attributes:
+        job_id (str): Random ID handed to the client
+        kind (str): 'boe', 'student' or 'cohort'
+        status (str): One of JOB_STATUSES
+        done (int): Number of units of work finished
+        total (int): Number of units of work, 0 until known
+        result (Optional[bytes]): PDF or ZIP content once done
+        mimetype (str): Content type of the result
+        filename (str): Download name of the result
+        error (Optional[str]): Failure message if the job failed
+        created (float): Monotonic time the job was submitted
+        finished (Optional[float]): Monotonic time the job finished
+    """
+    job_id: str
+    kind: str
+    status: str = 'queued'
+    done: int = 0
+    total: int = 0
+    result: Optional[bytes] = None
+    mimetype: str = 'application/pdf'
+    filename: str = 'report.pdf'
+    error: Optional[str] = None
+    created: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    def progress(self, done: int, total: int) -> None:
+        """Record how much of the job has been completed.
+
+        Args:
+            done (int): Units of work finished so far
+            total (int): Total units of work
+        """
+        self.done, self.total = done, total
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the job for the status endpoint.
+
+        Returns:
+            Dict[str, Any]: Status, progress and error of the job
+        """
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "error": self.error
+        }
+
+
+class JobManager:
+    """Runs report jobs on a small thread pool with a bounded queue.
+
+    The threads only orchestrate; rendering itself happens wherever the job
+    function sends it, typically the render pool. Finished jobs are kept
+    for result_ttl_seconds and then forgotten.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 16,
+                 result_ttl_seconds: float = 3600) -> None:
+        self.max_queued = max_queued
+        self.result_ttl_seconds = result_ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='report-job')
+        self._jobs: Dict[str, Job] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _purge_expired(self, now: float) -> None:
+        if self.result_ttl_seconds <= 0:
+            return
+        for job_id in [key for key, job in self._jobs.items()
+                       if job.finished is not None
+                       and now - job.finished > self.result_ttl_seconds]:
+            del self._jobs[job_id]
+
+    def submit(self, kind: str, work: Callable[[Job], bytes],
+               mimetype: str = 'application/pdf',
+               filename: str = 'report.pdf') -> Job:
+        """Queue a job.
+
+        Args:
+            kind (str): 'boe', 'student' or 'cohort'
+            work (Callable[[Job], bytes]): Produces the result, reporting
+                progress on the job it is given
+            mimetype (str): Content type of the result
+            filename (str): Download name of the result
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            JobQueueFull: If max_queued jobs are already queued or running
+        """
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            if self._pending >= self.max_queued:
+                raise JobQueueFull(
+                    f"Too many report jobs in progress ({self.max_queued})"
+                )
+            self._pending += 1
+            job = Job(job_id=uuid.uuid4().hex, kind=kind, mimetype=mimetype,
+                      filename=filename)
+            self._jobs[job.job_id] = job
+
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job: Job, work: Callable[[Job], bytes]) -> None:
+        job.status = 'running'
+        try:
+            job.result = work(job)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.monotonic()
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job.
+
+        Args:
+            job_id (str): ID returned when the job was submitted
+
+        Returns:
+            Optional[Job]: The job, or None if unknown or expired
+        """
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return self._jobs.get(job_id)
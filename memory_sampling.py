@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from stage_timing import StageTimer
+
+
+class MemorySampler:
+    """Traces the memory of a sampled fraction of requests.
+
+    tracemalloc slows every allocation in the process while it runs, so it
+    is only started for sampled requests and stopped afterwards. Tracing is
+    process-wide: one request is traced at a time, and allocations made by
+    other threads meanwhile are counted too.
+
+    Args:
+        rate (float): Fraction of requests to trace, 0 disables sampling
+        top_sites (int): Allocation sites kept per stage
+        keep (int): Number of recent samples kept for the debug endpoint
+        frames (int): Stack frames stored per allocation
+    """
+
+    def __init__(self, rate: float = 0.0, top_sites: int = 5, keep: int = 50,
+                 frames: int = 1) -> None:
+        self.rate = rate
+        self.top_sites = top_sites
+        self.frames = frames
+        self._samples: deque = deque(maxlen=keep)
+        self._tracing = threading.Lock()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def sample(self) -> Iterator[bool]:
+        """Trace memory in the block if this request is sampled.
+
+        Yields:
+            bool: True if memory is being traced for this request
+        """
+        if self.rate <= 0 or random.random() >= self.rate:
+            yield False
+            return
+        # Skip, rather than wait, while another request is being traced,
+        # or if tracemalloc was started by someone else
+        if tracemalloc.is_tracing() or not self._tracing.acquire(blocking=False):
+            yield False
+            return
+        try:
+            tracemalloc.start(self.frames)
+            try:
+                yield True
+            finally:
+                tracemalloc.stop()
+        finally:
+            self._tracing.release()
+
+    def record(self, endpoint: str, timer: StageTimer) -> Dict[str, Any]:
+        """Keep the memory measured for one request.
+
+        Args:
+            endpoint (str): Endpoint that handled the request
+            timer (StageTimer): Timer that traced the request's stages
+
+        Returns:
+            Dict[str, Any]: The stored sample
+        """
+        sample = {
+            "endpoint": endpoint,
+            "time": time.time(),
+            "peak_bytes": max(timer.peaks.values(), default=0),
+            "stages": timer.memory_dict()
+        }
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """Return the kept samples, most recent first."""
+        with self._lock:
+            return list(reversed(self._samples))
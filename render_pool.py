@@ -0,0 +1,225 @@
+import functools
+import itertools
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional
+
+from report_generator import render_boe_pdf
+from sampling_profiler import active_profiler, profiled_call
+from stage_timing import active_timer, record, stage, timed_call
+from student_report import render_student_pdf
+
+
+def _warm_worker() -> None:
+    """Import and exercise the rendering stack once in a fresh worker.
+
+    Importing matplotlib and seaborn, loading font metrics and building the
+    report styles and static fragments dominate the first render of a cold
+    process.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    import seaborn  # noqa: F401
+
+    row = {'your_score': 50.0, 'total_available': 100, 'min': 0.0,
+           'max': 100.0, 'mean': 50.0, 'stdev': 10.0}
+    sample = {
+        'student_id': 'warmup',
+        'overall_outcome': 'Pass',
+        'summary_results': [dict(row, component='Overall Scores'),
+                            dict(row, component='SBA')],
+        'ranking': {'rank': 1, 'cohort_size': 1, 'percentile': 100.0,
+                    'decile': 1}
+    }
+    for backend in ('vector', 'raster'):
+        render_student_pdf(sample, backend)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class _InlineExecutor(Executor):
+    """Runs submitted jobs in the calling thread, for a pool of size 0."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class RenderPool:
+    """Pool of warmed worker processes that render PDFs to bytes.
+
+    Rendering is CPU-bound and holds the GIL, so reports are rendered in
+    separate processes and only their inputs and PDF bytes cross the process
+    boundary. Workers are started from a clean forkserver (or spawned) rather
+    than forked from the threaded web server.
+
+    Args:
+        workers (Optional[int]): Number of worker processes, defaults to the
+            number of CPUs. 0 renders inline in the calling thread.
+    """
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        # Separate lock: shutdown cancels futures while holding _lock
+        self._pending_lock = threading.Lock()
+        self._pending = 0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.workers <= 0:
+                    self._executor = _InlineExecutor()
+                else:
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context(
+                        'forkserver' if 'forkserver' in methods else 'spawn'
+                    )
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=context,
+                        initializer=_warm_worker
+                    )
+            return self._executor
+
+    @property
+    def pending(self) -> int:
+        """Number of reports queued or rendering."""
+        return self._pending
+
+    def _submit(self, fn, *args) -> Future:
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            with self._pending_lock:
+                self._pending -= 1
+            raise
+        # Also called for cancelled futures
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+
+    def start(self) -> None:
+        """Start and warm every worker now rather than on the first job."""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def submit_student(self, json_data: Dict[str, Any],
+                       chart_backend: Optional[str] = None) -> Future:
+        """Queue a student report.
+
+        Args:
+            json_data (Dict[str, Any]): The student's summarised data
+            chart_backend (Optional[str]): 'raster' or 'vector' chart rendering
+
+        Returns:
+            Future: Resolves to the PDF content
+        """
+        return self._submit(render_student_pdf, json_data, chart_backend)
+
+    def render_student(self, json_data: Dict[str, Any],
+                       chart_backend: Optional[str] = None) -> bytes:
+        """Render a student report on a worker and wait for it.
+
+        Stages timed in the worker are added to the caller's stage timer.
+        """
+        return self._render(render_student_pdf, json_data, chart_backend)
+
+    def render_boe(self, statistics: Dict[str, Any],
+                   chart_backend: Optional[str] = None) -> bytes:
+        """Render a BOE report on a worker and wait for it.
+
+        Args:
+            statistics (Dict[str, Any]): Result of compute_boe_statistics
+            chart_backend (Optional[str]): 'raster' or 'vector' chart rendering
+
+        Returns:
+            bytes: The PDF content
+        """
+        return self._render(render_boe_pdf, statistics, chart_backend)
+
+    def _render(self, fn, *args) -> bytes:
+        timer = active_timer()
+        call = functools.partial(
+            timed_call,
+            trace_memory=timer is not None and timer.trace_memory,
+            top_sites=timer.top_sites if timer is not None else 0
+        )
+        # A profiled request samples its own thread; workers in other
+        # processes sample themselves and send their stacks back
+        profiler = active_profiler() if self.workers > 0 else None
+        if profiler is not None:
+            call = functools.partial(profiled_call, call,
+                                     interval=profiler.interval)
+        with stage('render'):
+            result = self._submit(call, fn, *args).result()
+            if profiler is not None:
+                result, samples = result
+                profiler.merge(samples, prefix=(('~', 0, '<render worker>'),))
+            pdf, worker_timer = result
+            record(worker_timer)
+        return pdf
+
+    def map_students(self, processed: Iterable[Dict[str, Any]],
+                     chart_backend: Optional[str] = None,
+                     window: Optional[int] = None) -> Iterator[bytes]:
+        """Fan a batch of student reports out over every worker.
+
+        At most ``window`` reports are queued or finished but not yet
+        yielded, so a large batch keeps only a few PDFs in memory while the
+        workers stay busy. Reports are yielded in input order, so the caller
+        can stream early results while later ones are rendering.
+
+        Args:
+            processed (Iterable[Dict[str, Any]]): Summarised data per student,
+                consumed as reports are queued
+            chart_backend (Optional[str]): 'raster' or 'vector' chart rendering
+            window (Optional[int]): Reports in flight, defaults to two per
+                worker
+
+        Yields:
+            bytes: The PDF content per student
+        """
+        if window is None:
+            window = 2 * self.workers
+        window = max(window, 1)
+        futures: Deque[Future] = deque()
+        students = iter(processed)
+        try:
+            while True:
+                for student_data in itertools.islice(
+                        students, window - len(futures)):
+                    futures.append(
+                        self.submit_student(student_data, chart_backend)
+                    )
+                if not futures:
+                    return
+                yield futures.popleft().result()
+        finally:
+            # Drop queued work if the client went away mid-batch
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
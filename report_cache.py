@@ -0,0 +1,117 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is not serialised across processes
+    fcntl = None
+
+
+class ReportCache:
+    """Rendered PDFs on local disk, bounded by a byte budget with LRU eviction.
+
+    Entries are written to a temporary file and atomically renamed into
+    place, so concurrent readers never see a partial PDF. A file's mtime is
+    its last use; eviction removes the least recently used files and is
+    serialised between processes with a lock file.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.pdf')
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Read a cached report and mark it as recently used.
+
+        Args:
+            key (str): Report key from report_key
+
+        Returns:
+            Optional[bytes]: The PDF, or None if it is not cached
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Missing, or evicted by another process since it was opened
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store a report, then evict old ones to stay within the budget.
+
+        Args:
+            key (str): Report key from report_key
+            data (bytes): The PDF
+        """
+        if len(data) > self.max_bytes:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._evict()
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        """Return a cached report, rendering and storing it on a miss.
+
+        Args:
+            key (str): Report key from report_key
+            render (Callable[[], bytes]): Renders the PDF
+
+        Returns:
+            bytes: The PDF
+        """
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def _evict(self) -> None:
+        with self._locked():
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
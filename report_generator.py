@@ -1,72 +1,96 @@
 import json
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from reportlab.lib.utils import simpleSplit
+from reportlab.lib.utils import ImageReader, simpleSplit
 from io import BytesIO
-import tempfile
-import os
 from reportlab.platypus import Table, TableStyle
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.graphics import renderPDF
+from aggregate_cube import as_cube
+from stage_timing import stage
+from vector_charts import boe_histogram_drawing, resolve_chart_backend
 
-def generate_boe_report(json_data, output_file="BOE_Report.pdf"):
+def _rollup_frame(cube, dimensions):
     """
-    Generate a comprehensive BOE report PDF from JSON data.
+    Sum responseValue per distinct combination of cube dimensions.
+    
+    Args:
+        cube: AggregateCube of the responses
+        dimensions: Cube dimensions to group by
+    
+    Returns:
+        pd.DataFrame: One row per group with the decoded dimensions and the
+            summed 'responseValue'
+    """
+    group_codes, sums, _ = cube.rollup(dimensions)
+    frame = {
+        dimension: cube.decode(dimension, group_codes[dimension])
+        for dimension in dimensions
+    }
+    frame['responseValue'] = sums
+    return pd.DataFrame(frame)
+
+def compute_boe_statistics(json_data):
+    """
+    Aggregate raw responses into the statistics shown in the BOE report.
     
     Args:
-        json_data: Input data as JSON string or Python dict
-        output_file: Path to save the PDF report
+        json_data: Input data as JSON string, Python dict, ResponseColumns
+            or AggregateCube
+    
+    Returns:
+        dict: Student marks, exam component table and subgroup tables
     """
-    # Convert JSON to DataFrame
+    # Every table is a rollup of one cube
     if isinstance(json_data, str):
-        data = json.loads(json_data)
-        df = pd.DataFrame(data)
-    else:
-        df = pd.DataFrame(json_data)
+        json_data = json.loads(json_data)
+    cube = as_cube(json_data)
     
+    # Blocks are reported by name; codes sharing a name are one block
+    subgroup_df = _rollup_frame(
+        cube, ['itemGroupCode', 'studentId', 'itemSubGroupCode']
+    )
+    subgroup_df['itemSubGroupName'] = subgroup_df['itemSubGroupCode'].map(
+        cube.subgroup_names
+    )
+    subgroup_df = subgroup_df.groupby(
+        ['itemGroupCode', 'studentId', 'itemSubGroupName'], sort=False,
+        as_index=False
+    )['responseValue'].sum()
+    
+    return boe_statistics_from_sums(
+        _rollup_frame(cube, ['studentId']),
+        _rollup_frame(cube, ['studentId', 'itemGroupCode']),
+        subgroup_df,
+        cube.categories['itemGroupCode']
+    )
+
+def boe_statistics_from_sums(marks_df, summed_df, subgroup_df, group_codes):
+    """
+    Build the BOE report tables from per-student summed responses.
+    
+    Args:
+        marks_df: 'studentId' and summed 'responseValue' per student
+        summed_df: Summed 'responseValue' per 'studentId' and 'itemGroupCode'
+        subgroup_df: Summed 'responseValue' per 'itemGroupCode', 'studentId'
+            and 'itemSubGroupName'
+        group_codes: Item group codes in report order
+    
+    Returns:
+        dict: Student marks, exam component table and subgroup tables
+    """
     # 1. Calculate each student's total marks
-    marks_df = df.groupby(['studentId'])['responseValue'].sum().reset_index()
+    marks_df = marks_df.sort_values('studentId').reset_index(drop=True)
     marks_df = marks_df.rename(columns={'responseValue': 'Marks'})
     
     # Define total possible marks
     total_possible = 140
     marks_df['Percentage'] = (marks_df['Marks'] / total_possible) * 100
     
-    # 2. Create the histogram visualization with matching fonts
-    plt.style.use('seaborn-v0_8')
-    plt.rcParams.update({
-        'font.family': 'sans-serif',
-        'font.sans-serif': 'Helvetica',
-        'axes.titlesize': 16,
-        'axes.labelsize': 12,
-        'xtick.labelsize': 10,
-        'ytick.labelsize': 10
-    })
-    
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(marks_df['Percentage'], bins=20, kde=False, 
-                 stat='density', alpha=0.5, color='skyblue', 
-                 edgecolor='black', ax=ax)
-    sns.kdeplot(marks_df['Percentage'], color='darkblue', linewidth=2, ax=ax)
-    
-    ax.set_title('Overall Performance', pad=20, fontweight='bold')
-    ax.set_xlabel('Overall Percentage Marks', fontweight='bold')
-    ax.set_ylabel('Density Function', fontweight='bold')
-    ax.set_xlim(0, 100)
-    ax.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    
-    # Save the plot to a temporary file
-    temp_img = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-    plt.savefig(temp_img.name, format='png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
     # 3. Generate the exam component statistics table
-    summed_df = df.groupby(['studentId', 'itemGroupCode'])['responseValue'].sum().reset_index()
     summary_table = summed_df.groupby('itemGroupCode')['responseValue'].agg(
         Min='min',
         Max='max',
@@ -90,12 +114,11 @@ def generate_boe_report(json_data, output_file="BOE_Report.pdf"):
     final_table = pd.concat([summary_table, overall_stats], ignore_index=True)
     
     # 4. Generate subgroup statistics for each item group
-    group_codes = df['itemGroupCode'].unique()
     subgroup_tables = []
     
     for group_code in group_codes:
-        group_df = df[df['itemGroupCode'] == group_code]
-        summed_df = group_df.groupby(['studentId', 'itemSubGroupName'])['responseValue'].sum().reset_index()
+        group_df = subgroup_df[subgroup_df['itemGroupCode'] == group_code]
+        summed_df = group_df[['studentId', 'itemSubGroupName', 'responseValue']]
         
         summary_table = summed_df.groupby('itemSubGroupName')['responseValue'].agg(
             Min='min',
@@ -125,16 +148,99 @@ def generate_boe_report(json_data, output_file="BOE_Report.pdf"):
             }
         })
     
+    return {
+        'marks': marks_df,
+        'summary_table': final_table,
+        'subgroup_tables': subgroup_tables
+    }
+
+def _render_histogram_png(marks_df):
+    """
+    Render the overall performance histogram with matplotlib and seaborn.
+    
+    Args:
+        marks_df: Student marks with a 'Percentage' column
+    
+    Returns:
+        BytesIO holding the PNG chart
+    """
+    # Plotting libraries are only needed for raster charts
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
+    # Create the histogram visualization with matching fonts. The style is
+    # applied in a context so it does not leak into other charts rendered
+    # by the same process.
+    style = {
+        'font.family': 'sans-serif',
+        'font.sans-serif': 'Helvetica',
+        'axes.titlesize': 16,
+        'axes.labelsize': 12,
+        'xtick.labelsize': 10,
+        'ytick.labelsize': 10
+    }
+    with plt.style.context('seaborn-v0_8'), plt.rc_context(style):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        sns.histplot(marks_df['Percentage'], bins=20, kde=False, 
+                     stat='density', alpha=0.5, color='skyblue', 
+                     edgecolor='black', ax=ax)
+        sns.kdeplot(marks_df['Percentage'], color='darkblue', linewidth=2, ax=ax)
+    
+        ax.set_title('Overall Performance', pad=20, fontweight='bold')
+        ax.set_xlabel('Overall Percentage Marks', fontweight='bold')
+        ax.set_ylabel('Density Function', fontweight='bold')
+        ax.set_xlim(0, 100)
+        ax.grid(True, linestyle='--', alpha=0.7)
+        plt.tight_layout()
+    
+        # Save the plot to an in-memory PNG
+        chart_png = BytesIO()
+        plt.savefig(chart_png, format='png', dpi=300, bbox_inches='tight')
+        plt.close()
+    chart_png.seek(0)
+    
+    return chart_png
+
+def generate_boe_report(json_data, output_file="BOE_Report.pdf", statistics=None,
+                        chart_backend=None):
+    """
+    Generate a comprehensive BOE report PDF from JSON data.
+    
+    Args:
+        json_data: Input data as JSON string, parsed list or ResponseColumns
+        output_file: Path or binary file-like object to write the PDF to
+        statistics: Precomputed result of compute_boe_statistics, if any
+        chart_backend: 'raster' or 'vector', defaults to REPORT_CHART_BACKEND
+    """
+    if statistics is None:
+        statistics = compute_boe_statistics(json_data)
+    marks_df = statistics['marks']
+    final_table = statistics['summary_table']
+    subgroup_tables = statistics['subgroup_tables']
+    
+    # 2. Create the histogram visualization
+    chart_backend = resolve_chart_backend(chart_backend)
+    if chart_backend == 'raster':
+        with stage('chart'):
+            chart_png = _render_histogram_png(marks_df)
+    
     # Generate PDF Report
-    c = canvas.Canvas(output_file, pagesize=A4)
+    c = canvas.Canvas(output_file, pagesize=A4, invariant=1)
     width, height = A4
     
     # Title
     c.setFont("Helvetica-Bold", 16)
     c.drawCentredString(width/2, height - 50, "B.O.E Report")
     
-    # Add the histogram image to PDF
-    c.drawImage(temp_img.name, 50, height - 350, width=500, height=250)
+    # Add the histogram to PDF
+    if chart_backend == 'raster':
+        c.drawImage(ImageReader(chart_png), 50, height - 350, width=500, height=250)
+    else:
+        with stage('chart'):
+            histogram = boe_histogram_drawing(marks_df['Percentage'])
+        renderPDF.draw(histogram, c, 50, height - 350)
     
     # Current y position for content
     y_pos = height - 400
@@ -242,8 +348,22 @@ def generate_boe_report(json_data, output_file="BOE_Report.pdf"):
         y_pos -= 20
     
     # Clean up and save PDF
-    c.save()
-    temp_img.close()
-    os.unlink(temp_img.name)
-    print(f"Report generated successfully at {output_file}")
+    with stage('write'):
+        c.save()
 
+def render_boe_pdf(statistics, chart_backend=None):
+    """
+    Render the BOE report in memory.
+    
+    Args:
+        statistics: Result of compute_boe_statistics
+        chart_backend: 'raster' or 'vector', defaults to REPORT_CHART_BACKEND
+    
+    Returns:
+        The PDF content as bytes
+    """
+    pdf_buffer = BytesIO()
+    with stage('layout'):
+        generate_boe_report(None, pdf_buffer, statistics=statistics,
+                            chart_backend=chart_backend)
+    return pdf_buffer.getvalue()
@@ -0,0 +1,28 @@
+import hashlib
+from typing import Optional
+
+# Bump whenever a change to the templates alters the rendered PDFs, so
+# cached reports and ETags from older templates stop matching
+TEMPLATE_VERSION = "2"
+
+
+def report_key(report_type: str, input_id: str,
+               student_id: Optional[str] = None,
+               chart_backend: Optional[str] = None) -> str:
+    """Derive the identity of a rendered report.
+
+    PDFs are rendered in reportlab's invariant mode, so equal keys mean
+    byte-identical reports.
+
+    Args:
+        report_type (str): 'boe' or 'student'
+        input_id (str): Content hash of the cohort the report is built from
+        student_id (Optional[str]): Student the report is for, if any
+        chart_backend (Optional[str]): Resolved chart backend
+
+    Returns:
+        str: Hex SHA-256 digest identifying the report
+    """
+    parts = (TEMPLATE_VERSION, report_type, input_id,
+             student_id or '', chart_backend or '')
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
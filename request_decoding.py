@@ -0,0 +1,107 @@
+import gzip
+import zlib
+from typing import BinaryIO, Optional, Tuple, Type
+
+
+class UnsupportedEncoding(Exception):
+    """Raised for a Content-Encoding this server cannot decode."""
+
+
+class BodyTooLarge(Exception):
+    """Raised when a request body decompresses past the configured limit."""
+
+
+class CorruptBody(Exception):
+    """Raised when a request body is not valid data in its encoding."""
+
+
+# Errors gzip reports for corrupt or truncated input
+_GZIP_ERRORS = (OSError, EOFError, zlib.error)
+
+
+class _SizeLimitedReader:
+    """Passes reads through, failing once more than max_bytes came out.
+
+    Decoding errors of the wrapped decompressors are raised as CorruptBody.
+    """
+
+    def __init__(self, stream: BinaryIO, max_bytes: int,
+                 errors: Tuple[Type[BaseException], ...] = ()) -> None:
+        self._stream = stream
+        self._remaining = max_bytes
+        self._errors = errors
+        self.max_bytes = max_bytes
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            chunks = iter(lambda: self.read(64 * 1024), b'')
+            return b''.join(chunks)
+        # Ask for at most one byte past the budget so an oversized body is
+        # noticed without decompressing much more than the limit
+        try:
+            chunk = self._stream.read(min(size, self._remaining + 1))
+        except self._errors as e:
+            raise CorruptBody(
+                f"Could not decompress the request body: {e}"
+            ) from None
+        self._remaining -= len(chunk)
+        if self._remaining < 0:
+            raise BodyTooLarge(
+                f"Request body exceeds {self.max_bytes} bytes once decompressed"
+            )
+        return chunk
+
+
+def _decoder(
+    stream: BinaryIO, encoding: str
+) -> Tuple[BinaryIO, Tuple[Type[BaseException], ...]]:
+    """Return a decompressing reader and the errors it raises for bad input."""
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.GzipFile(fileobj=stream, mode='rb'), _GZIP_ERRORS
+    if encoding == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise UnsupportedEncoding(
+                "zstd request bodies need the zstandard package, "
+                "which is not installed"
+            ) from None
+        return zstandard.ZstdDecompressor().stream_reader(
+            stream, read_across_frames=True
+        ), (zstandard.ZstdError,)
+    raise UnsupportedEncoding(f"Unsupported Content-Encoding {encoding}")
+
+
+def decoded_stream(stream: BinaryIO, content_encoding: Optional[str],
+                   max_bytes: int) -> BinaryIO:
+    """Wrap a request body so reads return decompressed bytes.
+
+    Decompression happens as the body is read, so a parser consuming the
+    result never holds the whole decompressed body.
+
+    Args:
+        stream (BinaryIO): Raw request body
+        content_encoding (Optional[str]): Content-Encoding header, possibly
+            listing several encodings in the order they were applied
+        max_bytes (int): Most decompressed bytes to accept
+
+    Returns:
+        BinaryIO: Readable stream of the decoded body
+
+    Raises:
+        UnsupportedEncoding: If an encoding is not gzip, zstd or identity
+
+    Reads from the result raise BodyTooLarge past max_bytes and CorruptBody
+    for input that does not decompress.
+    """
+    encodings = [encoding.strip().lower()
+                 for encoding in (content_encoding or '').split(',')]
+    encodings = [encoding for encoding in encodings
+                 if encoding and encoding != 'identity']
+    if not encodings:
+        return stream
+    errors: Tuple[Type[BaseException], ...] = ()
+    for encoding in reversed(encodings):
+        stream, decoder_errors = _decoder(stream, encoding)
+        errors += decoder_errors
+    return _SizeLimitedReader(stream, max_bytes, errors)
@@ -0,0 +1,206 @@
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# A function as pstats identifies it: (file name, first line, name)
+Function = Tuple[str, int, str]
+# A sampled call stack, outermost function first
+Stack = Tuple[Function, ...]
+
+# Leaf functions of threads that are only waiting; left out by default so
+# idle server and pool threads do not drown out the work
+IDLE_FUNCTIONS = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('socketserver.py', 'serve_forever'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+    ('connection.py', '_recv'),
+    ('connection.py', 'wait'),
+    ('process.py', '_process_worker'),
+}
+
+
+def _function(code) -> Function:
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling Python stacks from a background thread.
+
+    Every ``interval`` seconds the current stack of each watched thread is
+    recorded. Nothing is hooked into the profiled code, so the overhead is
+    one stack walk per thread per sample, and results are approximate.
+
+    Args:
+        interval (float): Seconds between samples
+        thread_ids (Optional[Iterable[int]]): Threads to sample, all other
+            threads if None
+        include_idle (bool): Keep samples of threads waiting in
+            IDLE_FUNCTIONS
+    """
+
+    def __init__(self, interval: float = 0.01,
+                 thread_ids: Optional[Iterable[int]] = None,
+                 include_idle: bool = False) -> None:
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.include_idle = include_idle
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='sampling-profiler')
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def seconds_per_sample(self) -> float:
+        """Wall-clock time each sample stands for.
+
+        Walking stacks and waiting for the GIL stretch the interval, so the
+        measured time between samples is used rather than the nominal one.
+        """
+        if self.samples == 0:
+            return self.interval
+        return max(self.interval, self.elapsed / self.samples)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        start = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_function(frame.f_code))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                leaf_file, _, leaf_name = stack[0]
+                if (not self.include_idle and
+                        (os.path.basename(leaf_file), leaf_name) in IDLE_FUNCTIONS):
+                    continue
+                self.counts[tuple(reversed(stack))] += 1
+            self.samples += 1
+            self.elapsed = time.perf_counter() - start
+
+    def merge(self, counts: Dict[Stack, int], prefix: Stack = ()) -> None:
+        """Add samples taken by another profiler, e.g. in a render worker.
+
+        Args:
+            counts (Dict[Stack, int]): The other profiler's counts
+            prefix (Stack): Frames placed above the merged stacks
+        """
+        for stack, count in counts.items():
+            self.counts[prefix + stack] += count
+
+    def collapsed(self) -> str:
+        """Return the samples in collapsed-stack format.
+
+        One line per distinct stack, ``outer;inner;leaf count``, as read by
+        flamegraph.pl, speedscope and similar tools.
+        """
+        lines = []
+        for stack, count in sorted(self.counts.items()):
+            frames = ';'.join(
+                # '~' marks functions without a source file, as in pstats
+                name if filename == '~'
+                else f'{name} ({os.path.basename(filename)}:{line})'
+                for filename, line, name in stack
+            )
+            lines.append(f'{frames} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def pstats_dump(self) -> bytes:
+        """Return the samples as a marshalled pstats file.
+
+        Call counts are sample counts and times are samples multiplied by
+        seconds_per_sample; load with ``pstats.Stats(path)``.
+        """
+        stats: Dict[Function, list] = {}
+        seconds_per_sample = self.seconds_per_sample
+
+        def entry(function: Function) -> list:
+            return stats.setdefault(function, [0, 0, 0.0, 0.0, {}])
+
+        for stack, count in self.counts.items():
+            seconds = count * seconds_per_sample
+            for function in set(stack):
+                # Inclusive time, counted once per sample under recursion
+                values = entry(function)
+                values[0] += count
+                values[1] += count
+                values[3] += seconds
+            entry(stack[-1])[2] += seconds
+            for caller, callee in zip(stack, stack[1:]):
+                callers = entry(callee)[4]
+                callers[caller] = callers.get(caller, 0) + count
+
+        return marshal.dumps({function: tuple(values)
+                              for function, values in stats.items()})
+
+
+# Profiler of the request being handled in this context, if any
+_active: ContextVar[Optional[SamplingProfiler]] = ContextVar(
+    'sampling_profiler', default=None
+)
+
+
+@contextmanager
+def profiling(profiler: SamplingProfiler) -> Iterator[SamplingProfiler]:
+    """Run ``profiler`` and make it the active one for the block."""
+    token = _active.set(profiler)
+    try:
+        with profiler:
+            yield profiler
+    finally:
+        _active.reset(token)
+
+
+def active_profiler() -> Optional[SamplingProfiler]:
+    """Return the profiler of the request in this context, if any."""
+    return _active.get()
+
+
+def profiled_call(fn: Callable[..., Any], *args: Any,
+                  interval: float = 0.01) -> Tuple[Any, Dict[Stack, int]]:
+    """Call ``fn`` while sampling the calling thread.
+
+    Used in worker processes, whose stacks the request's profiler cannot
+    see.
+
+    Returns:
+        Tuple[Any, Dict[Stack, int]]: The result and the sampled stacks
+    """
+    profiler = SamplingProfiler(interval, thread_ids=[threading.get_ident()])
+    with profiler:
+        result = fn(*args)
+    return result, dict(profiler.counts)
@@ -0,0 +1,201 @@
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class StageTimer:
+    """Wall-clock time spent in each named stage of one request.
+
+    Stages may nest; time spent in an inner stage is not counted again in
+    the stage around it, so the stages add up to the time they cover.
+    Entering the same stage name twice accumulates.
+
+    With trace_memory, and while tracemalloc is tracing, the peak memory
+    allocated during each stage is recorded as well, including its inner
+    stages, along with the allocation sites of the memory the stage still
+    held when it ended. Time spent taking memory snapshots is reported as
+    a separate 'tracemalloc' stage.
+
+    Args:
+        trace_memory (bool): Record memory per stage
+        top_sites (int): Allocation sites kept per stage, 0 for none
+    """
+
+    def __init__(self, trace_memory: bool = False, top_sites: int = 5) -> None:
+        self.stages: Dict[str, float] = {}
+        self.trace_memory = trace_memory
+        self.top_sites = top_sites
+        self.peaks: Dict[str, int] = {}
+        self.sites: Dict[str, List[Dict[str, Any]]] = {}
+        self._nested: List[float] = []
+        self._memory: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as ``name``."""
+        memory = self.trace_memory and tracemalloc.is_tracing()
+        if memory:
+            self._traced(self._start_memory)
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(name, elapsed - self._nested.pop())
+            if self._nested:
+                self._nested[-1] += elapsed
+            if memory:
+                self._traced(self._end_memory, name)
+
+    def _traced(self, fn: Callable[..., None], *args: Any) -> None:
+        # Snapshots are slow; book them as their own stage rather than
+        # inflating the stage around them
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        self.add('tracemalloc', elapsed)
+        if self._nested:
+            self._nested[-1] += elapsed
+
+    def _start_memory(self) -> None:
+        snapshot = tracemalloc.take_snapshot() if self.top_sites else None
+        current, peak = tracemalloc.get_traced_memory()
+        # reset_peak below also clears the peak of the enclosing stage
+        if self._memory:
+            self._memory[-1]['peak'] = max(self._memory[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        self._memory.append({'start': current, 'peak': current,
+                             'snapshot': snapshot})
+
+    def _end_memory(self, name: str) -> None:
+        frame = self._memory.pop()
+        peak = max(tracemalloc.get_traced_memory()[1], frame['peak'])
+        self.peaks[name] = max(self.peaks.get(name, 0), peak - frame['start'])
+        if frame['snapshot'] is not None:
+            differences = tracemalloc.take_snapshot().compare_to(
+                frame['snapshot'], 'lineno'
+            )
+            # Snapshots of tracemalloc itself are not allocation sites
+            differences = [diff for diff in differences
+                           if diff.traceback[0].filename != tracemalloc.__file__]
+            self.sites[name] = [
+                {'site': f'{os.path.basename(diff.traceback[0].filename)}:'
+                         f'{diff.traceback[0].lineno}',
+                 'size_diff': diff.size_diff,
+                 'count_diff': diff.count_diff}
+                for diff in differences[:self.top_sites]
+            ]
+        if self._memory:
+            self._memory[-1]['peak'] = max(self._memory[-1]['peak'], peak)
+        # Leave the snapshots out of the enclosing stage's peak
+        tracemalloc.reset_peak()
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add time to a stage."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def merge(self, other: 'StageTimer') -> None:
+        """Add stages timed elsewhere, e.g. in a render worker.
+
+        Merged time is treated like a nested stage of the current one.
+        """
+        for name, seconds in other.stages.items():
+            self.add(name, seconds)
+        if self._nested:
+            self._nested[-1] += sum(other.stages.values())
+        for name, peak in other.peaks.items():
+            self.peaks[name] = max(self.peaks.get(name, 0), peak)
+        self.sites.update(other.sites)
+        if self._memory and other.peaks:
+            frame = self._memory[-1]
+            frame['peak'] = max(frame['peak'],
+                                frame['start'] + max(other.peaks.values()))
+
+    def header(self, total: Optional[float] = None) -> str:
+        """Format the stages as a Server-Timing header value.
+
+        Args:
+            total (Optional[float]): Seconds for the whole request, sent as
+                an extra 'total' metric
+
+        Returns:
+            str: e.g. ``parse;dur=12.3, render;dur=80.1``
+        """
+        metrics = list(self.stages.items())
+        if total is not None:
+            metrics.append(('total', total))
+        return ', '.join(f'{name};dur={seconds * 1000:.1f}'
+                         for name, seconds in metrics)
+
+    def to_dict(self) -> Dict[str, float]:
+        """Return the stages in milliseconds."""
+        return {name: round(seconds * 1000, 3)
+                for name, seconds in self.stages.items()}
+
+    def memory_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Return the peak bytes and allocation sites per stage."""
+        return {name: {'peak_bytes': peak, 'top_sites': self.sites.get(name, [])}
+                for name, peak in self.peaks.items()}
+
+
+# Timer of the request being handled in this thread or context, if any
+_active: ContextVar[Optional[StageTimer]] = ContextVar('stage_timer',
+                                                       default=None)
+
+
+@contextmanager
+def timing(timer: StageTimer) -> Iterator[StageTimer]:
+    """Make ``timer`` collect the stages run inside the block."""
+    token = _active.set(timer)
+    try:
+        yield timer
+    finally:
+        _active.reset(token)
+
+
+def active_timer() -> Optional[StageTimer]:
+    """Return the timer collecting stages in this context, if any."""
+    return _active.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block on the active timer; a no-op without one."""
+    timer = _active.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def record(other: StageTimer) -> None:
+    """Merge stages timed elsewhere into the active timer, if any."""
+    timer = _active.get()
+    if timer is not None:
+        timer.merge(other)
+
+
+def timed_call(fn: Callable[..., Any], *args: Any, trace_memory: bool = False,
+               top_sites: int = 5) -> Tuple[Any, StageTimer]:
+    """Call ``fn`` with a fresh timer and return its result and the timer.
+
+    Used in worker processes, whose stages cannot reach the request's timer
+    directly. With trace_memory, tracemalloc runs for the duration of the
+    call unless it is already tracing.
+    """
+    timer = StageTimer(trace_memory, top_sites)
+    started = trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        with timing(timer):
+            result = fn(*args)
+    finally:
+        if started:
+            tracemalloc.stop()
+    return result, timer
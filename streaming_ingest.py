@@ -0,0 +1,231 @@
+import codecs
+import hashlib
+import json
+import re
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from columnar import ResponseColumns, code_dtype
+
+# Item-level fields are not needed by any report, so records that only
+# differ in them are summed into the same accumulator cell.
+CELL_FIELDS = (
+    'studentId', 'cohort', 'calendarYear', 'teachingPeriod',
+    'itemGroupID', 'itemGroupCode', 'itemGroupName',
+    'itemSubGroupID', 'itemSubGroupCode', 'itemSubGroupName'
+)
+
+_WHITESPACE = re.compile(r'\s*')
+
+# Length of the longest JSON literal the decoder knows, '-Infinity'
+_LONGEST_LITERAL = len('-Infinity')
+
+
+def iter_json_array(stream: BinaryIO, chunk_size: int = 64 * 1024,
+                    max_element_size: int = 1024 * 1024) -> Iterator[Any]:
+    """Incrementally parse a JSON array, yielding one element at a time.
+
+    Only the current chunk and the element being decoded are held in memory.
+
+    Args:
+        stream (BinaryIO): UTF-8 encoded JSON array
+        chunk_size (int): Number of bytes read from the stream at a time
+        max_element_size (int): Longest element accepted, in characters
+
+    Yields:
+        Any: Each decoded element of the array
+
+    Raises:
+        ValueError: If the stream is not a well-formed JSON array, or an
+            element is longer than max_element_size
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    at_eof = False
+    expect = '['
+
+    def fill() -> bool:
+        nonlocal buffer, pos, at_eof
+        if at_eof:
+            return False
+        if len(buffer) - pos > max_element_size:
+            raise ValueError(
+                f"Response longer than {max_element_size} characters"
+            )
+        chunk = stream.read(chunk_size)
+        at_eof = not chunk
+        buffer = buffer[pos:] + text_decoder.decode(chunk or b'', final=at_eof)
+        pos = 0
+        return True
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if not fill():
+                raise ValueError("Unexpected end of JSON input")
+            continue
+
+        char = buffer[pos]
+        if expect == '[':
+            if char != '[':
+                raise ValueError("Expected a JSON array of responses")
+            pos += 1
+            expect = 'value or ]'
+            continue
+        if char == ']' and expect != 'value':
+            pos += 1
+            break
+        if expect == ', or ]':
+            if char != ',':
+                raise ValueError("Expected ',' or ']' between responses")
+            pos += 1
+            expect = 'value'
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            # Only an element cut short at the end of the buffer can still
+            # be completed by the next chunk
+            if _truncated(e, len(buffer)) and fill():
+                continue
+            raise
+        if len(buffer) - end < _LONGEST_LITERAL and not at_eof:
+            # A number could still be cut short at the chunk boundary,
+            # e.g. '1e' of '1e-3'
+            fill()
+            continue
+        yield value
+        pos = end
+        expect = ', or ]'
+
+    # Nothing but whitespace may follow the array
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos < len(buffer):
+            raise ValueError("Unexpected data after the JSON array")
+        buffer, pos = '', 0
+        if not fill():
+            return
+
+
+def _truncated(error: json.JSONDecodeError, buffer_length: int) -> bool:
+    """Tell whether a decoding error may be due to the input ending early.
+
+    An unterminated string is only reported when the input ends inside it,
+    and a literal or number cut short fails within a few characters of the
+    end; any other error is in a complete token.
+    """
+    return (error.msg.startswith('Unterminated string')
+            or error.pos >= buffer_length - _LONGEST_LITERAL)
+
+
+class HashingReader:
+    """Wraps a binary stream and hashes everything read through it.
+
+    The digest matches dataset_id_for() of the whole body once the stream
+    has been read to the end.
+    """
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self._stream = stream
+        self._hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        self._hash.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        """Return the hex SHA-256 digest of the bytes read so far."""
+        return self._hash.hexdigest()
+
+
+class ResponseAccumulator:
+    """Running per-student, per-subgroup sums of streamed responses.
+
+    Memory grows with the number of distinct (student, group, subgroup)
+    cells rather than with the number of responses.
+    """
+
+    def __init__(self) -> None:
+        self._cells: Dict[Tuple[Any, ...], List[float]] = {}
+        self.n_responses = 0
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Fold one response into its cell.
+
+        Args:
+            record (Dict[str, Any]): A single response object
+        """
+        key = tuple(record.get(field) for field in CELL_FIELDS)
+        cell = self._cells.get(key)
+        if cell is None:
+            self._cells[key] = [float(record['responseValue']), 1]
+        else:
+            cell[0] += record['responseValue']
+            cell[1] += 1
+        self.n_responses += 1
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> "ResponseAccumulator":
+        """Fold every response of an iterable into the accumulator.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): Response objects
+
+        Returns:
+            ResponseAccumulator: The accumulator itself
+        """
+        for record in records:
+            self.add(record)
+        return self
+
+    def to_columns(self) -> ResponseColumns:
+        """Encode the accumulated cells as columns with response counts.
+
+        Returns:
+            ResponseColumns: One row per cell
+        """
+        keys = list(self._cells)
+        totals = list(self._cells.values())
+
+        codes = {}
+        categories = {}
+        for position, field in enumerate(CELL_FIELDS):
+            index: Dict[Any, int] = {}
+            raw_codes = [index.setdefault(key[position], len(index))
+                         for key in keys]
+            codes[field] = np.array(raw_codes, dtype=code_dtype(len(index)))
+            categories[field] = list(index)
+
+        return ResponseColumns(
+            response_value=np.array([total[0] for total in totals],
+                                    dtype=np.float32),
+            codes=codes,
+            categories=categories,
+            response_count=np.array([total[1] for total in totals],
+                                    dtype=np.int64)
+        )
+
+
+def ingest_stream(stream: BinaryIO) -> ResponseColumns:
+    """Parse a JSON array of responses straight into accumulated columns.
+
+    Args:
+        stream (BinaryIO): Request body containing a JSON array of responses
+
+    Returns:
+        ResponseColumns: Per-cell sums and counts of the responses
+
+    Raises:
+        ValueError: If the body is not a JSON array of response objects
+    """
+    try:
+        return ResponseAccumulator().extend(iter_json_array(stream)).to_columns()
+    except (AttributeError, KeyError, TypeError):
+        raise ValueError(
+            "Every response must be an object with a numeric responseValue"
+        ) from None
@@ -1,28 +1,94 @@
+import copy
+import functools
 import json
-import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Set the backend to non-interactive 'Agg'
-import matplotlib.pyplot as plt
+import threading
 from io import BytesIO
-from typing import Dict, List, Any
+from typing import (
+    Dict, List, Any, BinaryIO, Callable, Iterator, Optional, Tuple, Union
+)
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfgen.canvas import Canvas
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem, Image,
-    Table
+    SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem,
+    Table, Flowable
 )
 from reportlab.platypus.tables import TableStyle
+from aggregation import aggregate_cohort, summarise_student
+from columnar import ResponseColumns
+from stage_timing import stage
+from vector_charts import performance_chart_drawing, resolve_chart_backend
 
-def create_introduction_section(student_id: str) -> List[Any]:
-    """Create the introduction section of the report.
+# Static fragments are built and laid out once per thread, then shared by
+# every report rendered on that thread
+_prebuilt_fragments = threading.local()
+
+class PrebuiltFlowable(Flowable):
+    """Static flowable whose layout is computed once and reused.
+
+    The wrapped flowable keeps its line breaks from the first wrap at a given
+    width, so later reports only pay for drawing it.
+    """
+
+    def __init__(self, flowable: Flowable) -> None:
+        super().__init__()
+        self.flowable = flowable
+        self._wrapped_width = None
+        self._size = (0, 0)
+
+    def wrap(self, availWidth, availHeight):
+        if availWidth != self._wrapped_width:
+            self._size = self.flowable.wrapOn(self.canv, availWidth, availHeight)
+            self._wrapped_width = availWidth
+        self.width, self.height = self._size
+        return self._size
+
+    def split(self, availWidth, availHeight):
+        # The pieces of a split belong to the current document only, so split
+        # a private copy and leave the shared layout untouched
+        return copy.deepcopy(self.flowable).splitOn(
+            self.canv, availWidth, availHeight
+        )
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self.flowable.drawOn(canvas, x, y, _sW)
+
+    def getSpaceBefore(self):
+        return self.flowable.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self.flowable.getSpaceAfter()
+
+    def getKeepWithNext(self):
+        return self.flowable.getKeepWithNext()
+
+def prebuilt(builder: Callable[[], List[Any]]) -> Callable[[], List[Any]]:
+    """Build a static fragment once per thread and reuse its flowables.
 
     Args:
-        student_id (str): The student's ID number
+        builder (Callable[[], List[Any]]): Returns the fragment's flowables
 
     Returns:
-        List[Any]: List of flowable elements for the PDF
+        Callable[[], List[Any]]: Returns the shared, prebuilt flowables
     """
+    @functools.wraps(builder)
+    def get_fragment() -> List[Any]:
+        fragments = _prebuilt_fragments.__dict__
+        if builder.__name__ not in fragments:
+            fragments[builder.__name__] = [
+                PrebuiltFlowable(flowable) for flowable in builder()
+            ]
+        # Platypus flags flowables pushed to the next frame and never clears
+        # the flag, so reset it before the fragment joins a new document
+        for flowable in fragments[builder.__name__]:
+            flowable.__dict__.pop('_postponed', None)
+        return fragments[builder.__name__]
+    return get_fragment
+
+@functools.lru_cache(maxsize=None)
+def _report_styles() -> Tuple[Any, ParagraphStyle]:
+    """Return the sample stylesheet and the body text style of the report."""
     styles = getSampleStyleSheet()
     custom_style = ParagraphStyle(
         'CustomStyle',
@@ -31,16 +97,25 @@ def create_introduction_section(student_id: str) -> List[Any]:
         spaceAfter=12,
         leading=16
     )
+    return styles, custom_style
 
-    # Create elements list
-    elements = []
+@functools.lru_cache(maxsize=None)
+def _table_style() -> TableStyle:
+    """Return the style shared by the tables of the report."""
+    return TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
 
-    # Add student ID
-    student_id_text = Paragraph(
-        f"Student ID: {student_id}", styles['Heading1']
-    )
-    elements.append(student_id_text)
-    elements.append(Spacer(1, 12))
+@prebuilt
+def _introduction_text() -> List[Any]:
+    """Build the static introduction heading, text and bullet points."""
+    styles, custom_style = _report_styles()
+    elements = []
 
     # Add Introduction heading
     intro_heading = Paragraph("Introduction", styles['Heading2'])
@@ -89,69 +164,36 @@ def create_introduction_section(student_id: str) -> List[Any]:
 
     return elements
 
-def create_performance_chart(overall_scores: Dict[str, float]) -> BytesIO:
-    """Create a bell curve performance chart.
+def create_introduction_section(student_id: str) -> List[Any]:
+    """Create the introduction section of the report.
 
     Args:
-        overall_scores (Dict[str, float]): Dictionary containing overall score statistics
-    
-    Returns:
-        BytesIO: The chart image data
-    """
-    # Create bell curve data
-    x = np.linspace(0, 100, 100)
-    mu = overall_scores['mean']  # Mean of the distribution
-    sigma = overall_scores['stdev']  # Standard deviation
-    y = ((1/(sigma * np.sqrt(2 * np.pi))) * 
-        np.exp(-(x - mu)**2 / (2 * sigma**2)))
-
-    # Create the plot
-    plt.figure(figsize=(8, 6))
-    plt.plot(x, y, 'k-', linewidth=1)
-
-    # Add pass mark line
-    plt.axvline(x=35.5, color='gray', linestyle='--', linewidth=1)
-    plt.text(36, plt.ylim()[1], 'Pass-mark = 35.50%', rotation=0)
-
-    # Add your mark line and text
-    your_mark = overall_scores['your_score']
-    plt.axvline(x=your_mark, color='black', linestyle='-', linewidth=1)
-    plt.text(your_mark + 1, plt.ylim()[1] * 0.95, 
-            f'Your mark\n{your_mark:.1f}', rotation=0)
-
-    # Customize the plot
-    plt.xlabel('Overall Percentage Marks')
-    plt.ylabel('Density Function')
-    plt.grid(True, alpha=0.3)
-    plt.title('Your Performance')
-
-    # Save plot to memory
-    img_data = BytesIO()
-    plt.savefig(img_data, format='png', dpi=300, bbox_inches='tight')
-    plt.close()
-    img_data.seek(0)
-
-    return img_data
-
-def create_performance_section(json_data: Dict[str, Any]) -> List[Any]:
-    """Create the performance section of the report.
+        student_id (str): The student's ID number
 
-    Args:
-        json_data (Dict[str, Any]): The student's data
-    
     Returns:
         List[Any]: List of flowable elements for the PDF
     """
+    styles, custom_style = _report_styles()
 
-    styles = getSampleStyleSheet()
-    custom_style = ParagraphStyle(
-        'CustomStyle',
-        parent=styles['Normal'],
-        spaceBefore=12,
-        spaceAfter=12,
-        leading=16
+    # Create elements list
+    elements = []
+
+    # Add student ID
+    student_id_text = Paragraph(
+        f"Student ID: {student_id}", styles['Heading1']
     )
+    elements.append(student_id_text)
+    elements.append(Spacer(1, 12))
+
+    # Add the static introduction text
+    elements.extend(_introduction_text())
 
+    return elements
+
+@prebuilt
+def _performance_introduction() -> List[Any]:
+    """Build the static title and summary text of the performance section."""
+    styles, custom_style = _report_styles()
     elements = []
 
     # Add section title
@@ -169,39 +211,13 @@ def create_performance_section(json_data: Dict[str, Any]) -> List[Any]:
     elements.append(summary_text)
     elements.append(Spacer(1, 12))
 
-    # Create summary results table
-    table_style = TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ])
-
-    # Create summary table header
-    summary_header = [
-        'Exam component', 'Your score', 'Total Available', 'Min', 'Max', 'Mean', 'StDev'
-    ]
-
-    # Create summary table rows
-    summary_rows = []
-    for result in json_data['summary_results']:
-        summary_rows.append([
-            result['component'],
-            f"{result['your_score']:.1f}",
-            str(result['total_available']),
-            f"{result['min']:.1f}",
-            f"{result['max']:.1f}",
-            f"{result['mean']:.1f}",
-            f"{result['stdev']:.2f}"
-        ])
+    return elements
 
-    # Create and style the summary table
-    summary_table = Table([summary_header] + summary_rows)
-    summary_table.setStyle(table_style)
-    elements.append(summary_table)
-    elements.append(Spacer(1, 24))
+@prebuilt
+def _performance_chart_introduction() -> List[Any]:
+    """Build the static title and description of the performance chart."""
+    styles, custom_style = _report_styles()
+    elements = []
 
     # Add chart title
     chart_title = Paragraph("Your overall performance (MARKS)", styles['Heading2'])
@@ -220,26 +236,13 @@ def create_performance_section(json_data: Dict[str, Any]) -> List[Any]:
     elements.append(desc)
     elements.append(Spacer(1, 12))
 
-    # Get overall scores for chart
-    overall_scores = next(
-        (item for item in json_data['summary_results']
-         if item['component'] == 'Overall Scores'),
-        {'your_score': 0, 'mean': 70, 'stdev': 10}
-    )
-
-    # Create and add the performance chart
-    chart_data = create_performance_chart(overall_scores)
-    chart = Image(chart_data, width=400, height=300)
-    elements.append(chart)
-    elements.append(Spacer(1, 12))
+    return elements
 
-    # Add outcome text
-    outcome_text = Paragraph(
-        f"<i>Your Overall Outcome at the Current Exam: {json_data['overall_outcome']}</i>",
-        custom_style
-    )
-    elements.append(outcome_text)
-    elements.append(Spacer(1, 12))
+@prebuilt
+def _grade_ranges() -> List[Any]:
+    """Build the static mark ranges table and explanatory note."""
+    styles, custom_style = _report_styles()
+    elements = []
 
     # Create mark ranges table
     grade_table_data = [
@@ -253,7 +256,7 @@ def create_performance_section(json_data: Dict[str, Any]) -> List[Any]:
     ]
 
     grade_table = Table(grade_table_data)
-    grade_table.setStyle(table_style)
+    grade_table.setStyle(_table_style())
     elements.append(grade_table)
     elements.append(Spacer(1, 12))
 
@@ -271,14 +274,109 @@ def create_performance_section(json_data: Dict[str, Any]) -> List[Any]:
 
     return elements
 
+def create_performance_section(
+    json_data: Dict[str, Any], chart_backend: Optional[str] = None
+) -> List[Any]:
+    """Create the performance section of the report.
+
+    Args:
+        json_data (Dict[str, Any]): The student's data
+        chart_backend (Optional[str]): 'raster' or 'vector', defaults to the
+            REPORT_CHART_BACKEND setting
+    
+    Returns:
+        List[Any]: List of flowable elements for the PDF
+    """
+
+    styles, custom_style = _report_styles()
+
+    elements = []
+
+    # Add the static section title and summary text
+    elements.extend(_performance_introduction())
+
+    # Create summary results table
+    table_style = _table_style()
+
+    # Create summary table header
+    summary_header = [
+        'Exam component', 'Your score', 'Total Available', 'Min', 'Max', 'Mean', 'StDev'
+    ]
+
+    # Create summary table rows
+    summary_rows = []
+    for result in json_data['summary_results']:
+        summary_rows.append([
+            result['component'],
+            f"{result['your_score']:.1f}",
+            str(result['total_available']),
+            f"{result['min']:.1f}",
+            f"{result['max']:.1f}",
+            f"{result['mean']:.1f}",
+            f"{result['stdev']:.2f}"
+        ])
+
+    # Create and style the summary table
+    summary_table = Table([summary_header] + summary_rows)
+    summary_table.setStyle(table_style)
+    elements.append(summary_table)
+    elements.append(Spacer(1, 24))
+
+    # Add the static chart title and description
+    elements.extend(_performance_chart_introduction())
+
+    # Get overall scores for chart
+    overall_scores = next(
+        (item for item in json_data['summary_results']
+         if item['component'] == 'Overall Scores'),
+        {'your_score': 0, 'mean': 70, 'stdev': 10}
+    )
+
+    # Add the performance chart
+    with stage('chart'):
+        if resolve_chart_backend(chart_backend) == 'vector':
+            elements.append(
+                performance_chart_drawing(overall_scores, width=400, height=300)
+            )
+        else:
+            # Reuse the cohort background and overlay the student's mark
+            from chart_cache import performance_chart
+            elements.append(
+                performance_chart(overall_scores, width=400, height=300)
+            )
+    elements.append(Spacer(1, 12))
+
+    # Add outcome text
+    outcome_text = Paragraph(
+        f"<i>Your Overall Outcome at the Current Exam: {json_data['overall_outcome']}</i>",
+        custom_style
+    )
+    elements.append(outcome_text)
+    elements.append(Spacer(1, 12))
+
+    # Add the static mark ranges table and note
+    elements.extend(_grade_ranges())
+
+    return elements
+
+class _TimedCanvas(Canvas):
+    """Canvas that reports PDF serialisation as the 'write' stage."""
+
+    def save(self) -> None:
+        with stage('write'):
+            super().save()
+
 def generate_student_report(
-    json_data: Dict[str, Any], output_filename: str
+    json_data: Dict[str, Any], output_filename: Union[str, BinaryIO],
+    chart_backend: Optional[str] = None
 ) -> None:
     """Generate a PDF report for a student.
 
     Args:
         json_data (Dict[str, Any]): The student's data
-        output_filename (str): The name of the output PDF file
+        output_filename (Union[str, BinaryIO]): The name of the output PDF file
+            or a writable binary buffer
+        chart_backend (Optional[str]): 'raster' or 'vector' chart rendering
     """
     # Create the PDF document
     doc = SimpleDocTemplate(
@@ -287,7 +385,8 @@ def generate_student_report(
         rightMargin=72,
         leftMargin=72,
         topMargin=72,
-        bottomMargin=72
+        bottomMargin=72,
+        invariant=1
     )
 
     # Create the elements list
@@ -297,7 +396,7 @@ def generate_student_report(
     elements.extend(create_introduction_section(str(json_data['student_id'])))
 
     # Add performance section
-    elements.extend(create_performance_section(json_data))
+    elements.extend(create_performance_section(json_data, chart_backend))
 
     # Add domain analysis section
     elements.extend(create_domain_analysis_section(json_data))
@@ -306,27 +405,13 @@ def generate_student_report(
     elements.extend(create_decile_section(json_data))
 
     # Build the PDF
-    doc.build(elements)
-
-
-def create_domain_analysis_section(json_data: Dict[str, Any]) -> List[Any]:
-    """Create the domain analysis section of the report.
+    doc.build(elements, canvasmaker=_TimedCanvas)
 
-    Args:
-        json_data (Dict[str, Any]): The student's data
-
-    Returns:
-        List[Any]: List of flowable elements for the PDF
-    """
-    styles = getSampleStyleSheet()
-    custom_style = ParagraphStyle(
-        'CustomStyle',
-        parent=styles['Normal'],
-        spaceBefore=12,
-        spaceAfter=12,
-        leading=16
-    )
 
+@prebuilt
+def _domain_analysis_introduction() -> List[Any]:
+    """Build the static title and introduction of the domain analysis section."""
+    styles, custom_style = _report_styles()
     elements = []
 
     # Add section title
@@ -343,15 +428,26 @@ def create_domain_analysis_section(json_data: Dict[str, Any]) -> List[Any]:
     elements.append(intro_text)
     elements.append(Spacer(1, 12))
 
+    return elements
+
+def create_domain_analysis_section(json_data: Dict[str, Any]) -> List[Any]:
+    """Create the domain analysis section of the report.
+
+    Args:
+        json_data (Dict[str, Any]): The student's data
+
+    Returns:
+        List[Any]: List of flowable elements for the PDF
+    """
+    styles, custom_style = _report_styles()
+
+    elements = []
+
+    # Add the static section title and introduction
+    elements.extend(_domain_analysis_introduction())
+
     # Create summary table
-    table_style = TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ])
+    table_style = _table_style()
 
     # Create table header
     table_data = [
@@ -400,24 +496,10 @@ def create_domain_analysis_section(json_data: Dict[str, Any]) -> List[Any]:
 
     return elements
 
-def create_decile_section(json_data: Dict[str, Any]) -> List[Any]:
-    """Create the decile ranking section of the report.
-
-    Args:
-        json_data (Dict[str, Any]): The student's data
-
-    Returns:
-        List[Any]: List of flowable elements for the PDF
-    """
-    styles = getSampleStyleSheet()
-    custom_style = ParagraphStyle(
-        'CustomStyle',
-        parent=styles['Normal'],
-        spaceBefore=12,
-        spaceAfter=12,
-        leading=16
-    )
-
+@prebuilt
+def _decile_introduction() -> List[Any]:
+    """Build the static title and introduction of the decile section."""
+    styles, custom_style = _report_styles()
     elements = []
 
     # Add section title
@@ -434,56 +516,13 @@ def create_decile_section(json_data: Dict[str, Any]) -> List[Any]:
     elements.append(intro_text)
     elements.append(Spacer(1, 12))
 
-    # Calculate decile based on overall score
-    overall_scores = next(
-        (item for item in json_data['summary_results']
-         if item['component'] == 'Overall Scores'),
-        None
-    )
-    if overall_scores:
-        score = overall_scores['your_score']
-        all_scores = []
-        # Get scores for all students
-        for result in json_data['summary_results']:
-            if result['component'] == 'Overall Scores':
-                all_scores = [score for score in range(
-                    int(result['min']), 
-                    int(result['max']) + 1
-                )]
-                break
-        
-        # Calculate decile
-        all_scores.sort()
-        position = sum(1 for s in all_scores if s <= score)
-        decile = ((len(all_scores) - position) // (len(all_scores) // 10)) + 1
-        
-        # Function to get the ordinal suffix
-        def get_ordinal_suffix(decile):
-            if decile == 1:
-                return "st"
-            elif decile == 2:
-                return "nd"
-            elif decile == 3:
-                return "rd"
-            else:
-                return "th"
-        
-        # Determine the ordinal suffix
-        ordinal_suffix = get_ordinal_suffix(decile)
-        
-        # Add decile text
-        decile_text = Paragraph(
-            f"You are in the {decile}{ordinal_suffix} decile.",
-            ParagraphStyle(
-                'DecileStyle',
-                parent=styles['Normal'],
-                fontSize=14,
-                alignment=1,  # Center alignment
-                spaceAfter=12
-            )
-        )
-        elements.append(decile_text)
-        elements.append(Spacer(1, 12))
+    return elements
+
+@prebuilt
+def _decile_guide() -> List[Any]:
+    """Build the static decile interpretation guide and disclaimers."""
+    styles, custom_style = _report_styles()
+    elements = []
 
     # Add interpretation text
     elements.append(Paragraph("How to interpret your rank:", custom_style))
@@ -552,140 +591,148 @@ def create_decile_section(json_data: Dict[str, Any]) -> List[Any]:
 
     return elements
 
-def process_student_data(raw_data: List[Dict[str, Any]], student_id: str) -> Dict[str, Any]:
+def create_decile_section(json_data: Dict[str, Any]) -> List[Any]:
+    """Create the decile ranking section of the report.
+
+    Args:
+        json_data (Dict[str, Any]): The student's data
+
+    Returns:
+        List[Any]: List of flowable elements for the PDF
+    """
+    styles, custom_style = _report_styles()
+
+    elements = []
+
+    # Add the static section title and introduction
+    elements.extend(_decile_introduction())
+
+    # Decile from the cohort ranking computed during aggregation
+    ranking = json_data.get('ranking')
+    if ranking:
+        decile = ranking['decile']
+
+        # Function to get the ordinal suffix
+        def get_ordinal_suffix(decile):
+            if decile == 1:
+                return "st"
+            elif decile == 2:
+                return "nd"
+            elif decile == 3:
+                return "rd"
+            else:
+                return "th"
+        
+        # Determine the ordinal suffix
+        ordinal_suffix = get_ordinal_suffix(decile)
+        
+        # Add decile text
+        decile_text = Paragraph(
+            f"You are in the {decile}{ordinal_suffix} decile.",
+            ParagraphStyle(
+                'DecileStyle',
+                parent=styles['Normal'],
+                fontSize=14,
+                alignment=1,  # Center alignment
+                spaceAfter=12
+            )
+        )
+        elements.append(decile_text)
+        elements.append(Spacer(1, 12))
+
+    # Add the static interpretation guide and disclaimers
+    elements.extend(_decile_guide())
+
+    return elements
+
+def process_student_data(
+    raw_data: Union[List[Dict[str, Any]], ResponseColumns], student_id: str
+) -> Dict[str, Any]:
     """Process raw student data to generate summary statistics by itemGroupCode.
 
     Args:
-        raw_data (List[Dict[str, Any]]): Raw data from JSON file
+        raw_data (Union[List[Dict[str, Any]], ResponseColumns]): Raw data from
+            JSON file, or the same data already encoded as columns
         student_id (str): ID of the student to process
     
     Returns:
         Dict[str, Any]: Processed student data with summary statistics
     """
-    # Filter data for the specific student
-    student_responses = [item for item in raw_data if int(item['studentId']) == int(student_id)]
-    
-    if not student_responses:
-        raise ValueError(f"No data found for student {student_id}")
-
-    # Get all unique itemGroupCodes
-    group_codes = {item['itemGroupCode'] for item in raw_data}
-    print(f"Found group codes: {group_codes}")  # Debug log
-
-    # Initialize summary results
-    summary_results = []
-    student_total_correct = 0
-    student_total_responses = 0
-
-    # Process each itemGroupCode
-    for group in group_codes:
-        # Get student's responses for this group
-        student_group_responses = [
-            item for item in student_responses 
-            if item['itemGroupCode'] == group
-        ]
-        
-        print(f"Processing group {group} with {len(student_group_responses)} responses")  # Debug log
-    
-        if student_group_responses:
-            # Calculate student's score for this group
-            group_score = sum(item['responseValue'] for item in student_group_responses)
-            group_total = len(student_group_responses)
-            
-            if group_total == 0:  # Prevent division by zero
-                print(f"Warning: No responses found for group {group}")
-                continue
-                
-            student_score = (group_score / group_total) * 100
-            print(f"Group {group} - Score: {group_score}, Total: {group_total}, Percentage: {student_score}")  # Debug log
-        
-            # Update overall totals
-            student_total_correct += group_score
-            student_total_responses += group_total
-        
-            # Get all students' scores for this group
-            group_scores = []
-            for sid in {item['studentId'] for item in raw_data}:
-                responses = [
-                    item for item in raw_data 
-                    if item['studentId'] == sid 
-                    and item['itemGroupCode'] == group
-                ]
-                if responses:
-                    score = sum(r['responseValue'] for r in responses)
-                    if len(responses) > 0:  # Prevent division by zero
-                        avg_score = (score / len(responses)) * 100
-                        group_scores.append(avg_score)
-            
-            if group_scores:  # Only add if we have scores
-                summary_results.append({
-                    "component": group,
-                    "your_score": student_score,
-                    "total_available": 100,
-                    "min": min(group_scores),
-                    "max": max(group_scores),
-                    "mean": np.mean(group_scores),
-                    "stdev": np.std(group_scores) if len(group_scores) > 1 else 0
-                })
-
-    # Calculate overall score and statistics
-    if student_total_responses > 0:  # Prevent division by zero
-        overall_score = (student_total_correct / student_total_responses) * 100
-        print(f"Overall - Score: {student_total_correct}, Total: {student_total_responses}, Percentage: {overall_score}")  # Debug log
-
-        # Get overall scores for all students
-        all_scores = []
-        for sid in {item['studentId'] for item in raw_data}:
-            responses = [item for item in raw_data if item['studentId'] == sid]
-            if responses:
-                score = sum(r['responseValue'] for r in responses)
-                if len(responses) > 0:  # Prevent division by zero
-                    avg_score = (score / len(responses)) * 100
-                    all_scores.append(avg_score)
-
-        if all_scores:  # Only add if we have scores
-            summary_results.insert(0, {
-                "component": "Overall Scores",
-                "your_score": overall_score,
-                "total_available": 100,
-                "min": min(all_scores),
-                "max": max(all_scores),
-                "mean": np.mean(all_scores),
-                "stdev": np.std(all_scores) if len(all_scores) > 1 else 0
-            })
-
-            # Determine outcome based on overall score
-            if overall_score >= 69.50:
-                outcome = "Excellent Pass"
-            elif overall_score >= 59.50:
-                outcome = "Very Good Pass"
-            elif overall_score >= 49.50:
-                outcome = "Good Pass"
-            elif overall_score >= 44.50:
-                outcome = "Pass"
-            elif overall_score >= 39.50:
-                outcome = "Borderline Pass"
-            else:
-                outcome = "NOT Pass"
-        else:
-            outcome = "Insufficient Data"
+    return summarise_student(aggregate_cohort(raw_data), student_id)
+
+def render_student_pdf(
+    json_data: Dict[str, Any], chart_backend: Optional[str] = None
+) -> bytes:
+    """Render a student's PDF report in memory.
+
+    Args:
+        json_data (Dict[str, Any]): The student's data
+        chart_backend (Optional[str]): 'raster' or 'vector' chart rendering
+
+    Returns:
+        bytes: The PDF content
+    """
+    pdf_buffer = BytesIO()
+    with stage('layout'):
+        generate_student_report(json_data, pdf_buffer, chart_backend)
+    return pdf_buffer.getvalue()
+
+def summarise_students(
+    raw_data: Union[List[Dict[str, Any]], ResponseColumns],
+    student_ids: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Aggregate a cohort once and summarise many of its students.
+
+    Args:
+        raw_data (Union[List[Dict[str, Any]], ResponseColumns]): Raw data
+            from JSON file, or the same data encoded as columns
+        student_ids (Optional[List[str]]): Students to summarise, defaults
+            to all
+
+    Returns:
+        List[Dict[str, Any]]: Processed data per student
+
+    Raises:
+        ValueError: If a student has no data in the cohort
+    """
+    aggregate = aggregate_cohort(raw_data)
+    if student_ids is None:
+        student_ids = [str(sid) for sid in aggregate.student_ids]
+    return [summarise_student(aggregate, sid) for sid in student_ids]
+
+
+def render_summaries(
+    processed: List[Dict[str, Any]], chart_backend: Optional[str] = None,
+    pool: Optional[Any] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Iterator[Tuple[str, bytes]]:
+    """Render PDF reports for students summarised up front.
+
+    Args:
+        processed (List[Dict[str, Any]]): Processed data per student
+        chart_backend (Optional[str]): 'raster' or 'vector' chart rendering
+        pool (Optional[Any]): RenderPool to fan the batch out over, renders
+            in the calling thread if None
+        progress (Optional[Callable[[int, int], None]]): Called with the
+            number of rendered and total reports as each one completes
+
+    Returns:
+        Iterator[Tuple[str, bytes]]: File name and PDF content per student
+    """
+    if pool is not None:
+        pdfs = pool.map_students(processed, chart_backend)
     else:
-        outcome = "No Responses"
-        summary_results.insert(0, {
-            "component": "Overall Scores",
-            "your_score": 0,
-            "total_available": 100,
-            "min": 0,
-            "max": 0,
-            "mean": 0,
-            "stdev": 0
-        })
-
-    return {
-        "student_id": str(student_id),
-        "overall_outcome": outcome,
-        "summary_results": summary_results
-    }
+        pdfs = (render_student_pdf(student_data, chart_backend)
+                for student_data in processed)
+
+    def named_reports() -> Iterator[Tuple[str, bytes]]:
+        for done, (student_data, pdf) in enumerate(zip(processed, pdfs), 1):
+            if progress is not None:
+                progress(done, len(processed))
+            yield f"student_report_{student_data['student_id']}.pdf", pdf
+
+    return named_reports()
+
 
 if __name__ == "__main__":
     # Load and process data for one student
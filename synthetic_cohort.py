@@ -0,0 +1,320 @@
+"""Generate synthetic cohort responses in the jsData.json schema.
+
+Usage:
+    python synthetic_cohort.py --students 10000 --output cohort.json
+    python synthetic_cohort.py --students 200000 --gzip --output cohort.json.gz
+
+Scores follow a two-parameter logistic item response model: every student
+has a normally distributed ability, every item a difficulty and a
+discrimination. Single-mark items are right or wrong and multi-mark items
+are scored in half marks. Output is produced one student at a time, so
+arbitrarily large cohorts can be streamed to disk or over HTTP.
+"""
+import argparse
+import gzip
+import json
+import sys
+import uuid
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+# Item groups in the order they are used, with their marks per item and
+# share of the paper as in jsData.json; further groups are numbered and
+# get an equal share
+ITEM_GROUPS = (
+    ('SBA', 'Item Type SBA', 1.0, 0.9),
+    ('SAQ', 'Item Type SAQ', 2.0, 0.1),
+)
+
+# Subgroup topics shared by every item group
+TOPICS = (
+    ('ICA', 'Introduction to Clinical Application'),
+    ('CBG', 'Cell Biology and Genetics'),
+    ('PAT', 'Pathological Processes'),
+    ('PHY', 'Physiology and Pharmacology'),
+    ('CAR', 'Cardiovascular System'),
+    ('RES', 'Respiratory System'),
+    ('GIS', 'Gastrointestinal System'),
+    ('NEU', 'Nervous System, Neuropsychiatry, and Neuroanatomy'),
+    ('IMS', 'Immune System'),
+    ('REP', 'Reproductive System'),
+    ('REN', 'Renal and Urinary System'),
+    ('MSK', 'Musculoskeletal System'),
+    ('HAN', 'Head and Neck'),
+    ('MEH', 'Metabolism, Endocrinology and Haematology'),
+    ('INF', 'Infection'),
+    ('CPT', 'Clinical Pharmacology and Therapeutics'),
+    ('ICP', 'Introduction to Clinical Practice'),
+    ('FBS', 'Fundamentals of body structure'),
+    ('SPA', 'Social and Psychological Aspects of Health'),
+)
+
+
+@dataclass
+class CohortSpec:
+    """Shape and score distribution of a synthetic cohort.
+
+    Attributes:
+        n_students (int): Number of students
+        n_items (int): Number of items on the paper
+        n_item_groups (int): Number of item groups (SBA, SAQ, ...)
+        n_subgroups (int): Number of subgroup topics per item group
+        cohorts (Sequence[str]): Cohorts students are spread over
+        calendar_years (Sequence[int]): Calendar years students sat the exam in
+        teaching_periods (Sequence[int]): Teaching periods items belong to
+        mean_difficulty (float): Mean item difficulty on the ability scale;
+            negative values make the paper easier
+        omit_rate (float): Probability that a student skips an item
+        seed (int): Seed for items and students, so output is reproducible
+    """
+    n_students: int = 100
+    n_items: int = 166
+    n_item_groups: int = 2
+    n_subgroups: int = 15
+    cohorts: Sequence[str] = ('2020',)
+    calendar_years: Sequence[int] = (2024,)
+    teaching_periods: Sequence[int] = (1, 2)
+    mean_difficulty: float = -0.8
+    omit_rate: float = 0.0
+    seed: int = 0
+
+
+def _uuid(rng: np.random.Generator) -> str:
+    high, low = rng.integers(0, 2 ** 63, size=2, dtype=np.int64)
+    return str(uuid.UUID(int=(int(high) << 64 | int(low)), version=4))
+
+
+def build_items(spec: CohortSpec) -> List[Dict[str, Any]]:
+    """Create the items of the paper with their scoring parameters.
+
+    Args:
+        spec (CohortSpec): Cohort description
+
+    Returns:
+        List[Dict[str, Any]]: Item fields of the schema plus 'maxValue',
+            'difficulty' and 'discrimination'
+    """
+    rng = np.random.default_rng([spec.seed, 0])
+    groups = []
+    for index in range(spec.n_item_groups):
+        if index < len(ITEM_GROUPS):
+            code, name, max_value, share = ITEM_GROUPS[index]
+        else:
+            code, name, max_value = f'G{index + 1}', f'Item Type G{index + 1}', 1.0
+            share = 1 / spec.n_item_groups
+        subgroups = []
+        for position in range(spec.n_subgroups):
+            topic, topic_name = TOPICS[position % len(TOPICS)]
+            if position >= len(TOPICS):
+                topic = f'{topic}{position // len(TOPICS) + 1}'
+            subgroups.append((f'{code}_{topic}', topic_name, _uuid(rng)))
+        groups.append((code, name, max_value, _uuid(rng), subgroups, share))
+
+    # Split the items by share, handing leftovers to the largest remainders
+    shares = np.array([group[-1] for group in groups])
+    quotas = shares / shares.sum() * spec.n_items
+    counts = np.floor(quotas).astype(np.int64)
+    leftover = spec.n_items - counts.sum()
+    counts[np.argsort(counts - quotas, kind='stable')[:leftover]] += 1
+
+    items = []
+    for group, count in zip(groups, counts):
+        code, name, max_value, group_id, subgroups, _ = group
+        for position in range(count):
+            sub_code, sub_name, sub_id = subgroups[position % len(subgroups)]
+            items.append(_item(spec, rng, code, name, max_value, group_id,
+                               sub_code, sub_name, sub_id))
+    return items
+
+
+def _item(spec: CohortSpec, rng: np.random.Generator, code: str, name: str,
+          max_value: float, group_id: str, sub_code: str, sub_name: str,
+          sub_id: str) -> Dict[str, Any]:
+    return {
+        'teachingPeriod': int(spec.teaching_periods[
+            rng.integers(len(spec.teaching_periods))
+        ]),
+        'itemID': _uuid(rng),
+        'itemCode': sub_code,
+        'itemName': sub_name,
+        'itemSubGroupID': sub_id,
+        'itemGroupID': group_id,
+        'itemGroupCode': code,
+        'itemGroupName': name,
+        'itemSubGroupCode': sub_code,
+        'itemSubGroupName': sub_name,
+        'maxValue': max_value,
+        'difficulty': float(rng.normal(spec.mean_difficulty, 1.0)),
+        'discrimination': float(rng.uniform(0.6, 1.8)),
+    }
+
+
+def _student_scores(spec: CohortSpec, difficulty: np.ndarray,
+                    discrimination: np.ndarray, max_value: np.ndarray,
+                    index: int):
+    """Draw one student's marks and which items they answered."""
+    rng = np.random.default_rng([spec.seed, 1, index])
+    ability = rng.normal()
+    p_correct = 1 / (1 + np.exp(-discrimination * (ability - difficulty)))
+    # Multi-mark items are scored in half marks and, as in jsData.json,
+    # average about one mark; full marks are rare
+    steps = np.maximum((max_value * 2).astype(np.int64), 1)
+    values = rng.binomial(steps, p_correct / np.maximum(max_value, 1)) / 2
+    values = np.where(max_value <= 1, rng.random(len(max_value)) < p_correct, values)
+    answered = rng.random(len(max_value)) >= spec.omit_rate
+    return rng, values.astype(np.float64), answered
+
+
+def _item_fields(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in item.items()
+            if key not in ('maxValue', 'difficulty', 'discrimination')}
+
+
+def iter_students(spec: CohortSpec) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the response records of one student at a time.
+
+    Args:
+        spec (CohortSpec): Cohort description
+
+    Yields:
+        List[Dict[str, Any]]: The student's responses in the jsData.json schema
+    """
+    items = build_items(spec)
+    fields = [_item_fields(item) for item in items]
+    difficulty = np.array([item['difficulty'] for item in items])
+    discrimination = np.array([item['discrimination'] for item in items])
+    max_value = np.array([item['maxValue'] for item in items])
+
+    for index in range(spec.n_students):
+        rng, values, answered = _student_scores(
+            spec, difficulty, discrimination, max_value, index
+        )
+        student = {
+            'studentId': 190000000 + index,
+            'cohort': spec.cohorts[index % len(spec.cohorts)],
+            'calendarYear': spec.calendar_years[index % len(spec.calendar_years)],
+        }
+        yield [
+            {'responseId': _uuid(rng), 'responseValue': float(value),
+             **student, **item_fields}
+            for item_fields, value, present in zip(fields, values, answered)
+            if present
+        ]
+
+
+def iter_records(spec: CohortSpec) -> Iterator[Dict[str, Any]]:
+    """Yield every response record of the cohort.
+
+    Args:
+        spec (CohortSpec): Cohort description
+
+    Yields:
+        Dict[str, Any]: One response in the jsData.json schema
+    """
+    for records in iter_students(spec):
+        yield from records
+
+
+def iter_json(spec: CohortSpec) -> Iterator[bytes]:
+    """Encode the cohort as a JSON array, one student per chunk.
+
+    Args:
+        spec (CohortSpec): Cohort description
+
+    Yields:
+        bytes: Consecutive pieces of the UTF-8 JSON document
+    """
+    yield b'['
+    first = True
+    for records in iter_students(spec):
+        if not records:
+            continue
+        chunk = ', '.join(json.dumps(record) for record in records)
+        yield (chunk if first else ', ' + chunk).encode()
+        first = False
+    yield b']'
+
+
+def write_cohort(spec: CohortSpec, stream: BinaryIO) -> int:
+    """Stream the cohort as JSON into a binary file.
+
+    Args:
+        spec (CohortSpec): Cohort description
+        stream (BinaryIO): Destination
+
+    Returns:
+        int: Number of bytes written, before any compression
+    """
+    written = 0
+    for chunk in iter_json(spec):
+        stream.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def generate_cohort(spec: CohortSpec) -> List[Dict[str, Any]]:
+    """Build the whole cohort in memory, for small test cohorts.
+
+    Args:
+        spec (CohortSpec): Cohort description
+
+    Returns:
+        List[Dict[str, Any]]: Every response of the cohort
+    """
+    return list(iter_records(spec))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = CohortSpec()
+    parser.add_argument('--students', type=int, default=defaults.n_students)
+    parser.add_argument('--items', type=int, default=defaults.n_items)
+    parser.add_argument('--item-groups', type=int,
+                        default=defaults.n_item_groups)
+    parser.add_argument('--subgroups', type=int, default=defaults.n_subgroups,
+                        help='subgroup topics per item group')
+    parser.add_argument('--cohorts', nargs='+', default=list(defaults.cohorts))
+    parser.add_argument('--calendar-years', type=int, nargs='+',
+                        default=list(defaults.calendar_years))
+    parser.add_argument('--teaching-periods', type=int, nargs='+',
+                        default=list(defaults.teaching_periods))
+    parser.add_argument('--mean-difficulty', type=float,
+                        default=defaults.mean_difficulty)
+    parser.add_argument('--omit-rate', type=float, default=defaults.omit_rate)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--output', default='-',
+                        help='file to write, "-" for stdout')
+    parser.add_argument('--gzip', action='store_true',
+                        help='gzip-compress the output')
+    args = parser.parse_args(argv)
+
+    spec = CohortSpec(
+        n_students=args.students,
+        n_items=args.items,
+        n_item_groups=args.item_groups,
+        n_subgroups=args.subgroups,
+        cohorts=tuple(args.cohorts),
+        calendar_years=tuple(args.calendar_years),
+        teaching_periods=tuple(args.teaching_periods),
+        mean_difficulty=args.mean_difficulty,
+        omit_rate=args.omit_rate,
+        seed=args.seed
+    )
+
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        if args.gzip:
+            with gzip.GzipFile(fileobj=output, mode='wb') as compressed:
+                write_cohort(spec, compressed)
+        else:
+            write_cohort(spec, output)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
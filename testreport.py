@@ -12,6 +12,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem
 from reportlab.lib.enums import TA_LEFT, TA_CENTER
+from aggregate_cube import AggregateCube, build_cube
 
 def load_and_process_data(file_path: str) -> pd.DataFrame:
     """Load exam results from JSON and convert to DataFrame.
@@ -31,51 +32,53 @@ def load_and_process_data(file_path: str) -> pd.DataFrame:
         print(f"Error loading data: {str(e)}")
         return pd.DataFrame()
 
-def calculate_student_performance(df: pd.DataFrame, student_id: int) -> Dict[str, Any]:
+def calculate_student_performance(cube: AggregateCube, student_id: int) -> Dict[str, Any]:
     """Calculate performance metrics for a specific student compared to their cohort.
     
+    Every figure is a slice of the aggregate cube, so no response is
+    rescanned per group or teaching period.
+    
     Args:
-        df (pd.DataFrame): The complete exam results dataset
+        cube (AggregateCube): Aggregate cube of the complete exam results
         student_id (int): ID of the student to analyze
         
     Returns:
         Dict[str, Any]: Dictionary containing performance metrics
     """
-    # Filter for the specific student
-    student_data = df[df['studentId'] == student_id]
-    student_cohort = student_data['cohort'].iloc[0]
+    # Find the student's cohort and calendar year
+    codes, _, _ = cube.rollup(['cohort', 'calendarYear'], studentId=student_id)
+    student_cohort = cube.decode('cohort', codes['cohort'])[0]
+    calendar_year = cube.decode('calendarYear', codes['calendarYear'])[0]
     
-    # Get cohort data
-    cohort_data = df[df['cohort'] == student_cohort]
+    def average(dimension=None, **where):
+        """Mean responseValue per value of dimension, or overall."""
+        if dimension is None:
+            _, sums, counts = cube.rollup(**where)
+            return sums[0] / counts[0] if len(counts) else float('nan')
+        codes, sums, counts = cube.rollup([dimension], **where)
+        return dict(zip(cube.decode(dimension, codes[dimension]), sums / counts))
     
     # Calculate metrics
     metrics = {
         'student_id': student_id,
         'cohort': student_cohort,
-        'calendar_year': student_data['calendarYear'].iloc[0],
-        'overall_average': student_data['responseValue'].mean(),
-        'cohort_average': cohort_data['responseValue'].mean(),
+        'calendar_year': calendar_year,
+        'overall_average': average(studentId=student_id),
+        'cohort_average': average(cohort=student_cohort),
         'performance_by_group': {},
         'performance_by_teaching_period': {}
     }
     
-    # Calculate performance by item group
-    for group in df['itemGroupCode'].unique():
-        student_group_avg = student_data[student_data['itemGroupCode'] == group]['responseValue'].mean()
-        cohort_group_avg = cohort_data[cohort_data['itemGroupCode'] == group]['responseValue'].mean()
-        metrics['performance_by_group'][group] = {
-            'student_avg': student_group_avg,
-            'cohort_avg': cohort_group_avg
-        }
-    
-    # Calculate performance by teaching period
-    for period in df['teachingPeriod'].unique():
-        student_period_avg = student_data[student_data['teachingPeriod'] == period]['responseValue'].mean()
-        cohort_period_avg = cohort_data[cohort_data['teachingPeriod'] == period]['responseValue'].mean()
-        metrics['performance_by_teaching_period'][period] = {
-            'student_avg': student_period_avg,
-            'cohort_avg': cohort_period_avg
-        }
+    # Calculate performance by item group and by teaching period
+    for dimension, key in [('itemGroupCode', 'performance_by_group'),
+                           ('teachingPeriod', 'performance_by_teaching_period')]:
+        student_avg = average(dimension, studentId=student_id)
+        cohort_avg = average(dimension, cohort=student_cohort)
+        for value in cube.categories[dimension]:
+            metrics[key][value] = {
+                'student_avg': student_avg.get(value, float('nan')),
+                'cohort_avg': cohort_avg.get(value, float('nan'))
+            }
     
     return metrics
 
@@ -132,7 +135,8 @@ def main():
         
         # Process first student as an example
         if len(student_ids) > 0:
-            student_metrics = calculate_student_performance(df, student_ids[0])
+            cube = build_cube(df.to_dict('records'))
+            student_metrics = calculate_student_performance(cube, student_ids[0])
             plots = generate_performance_plots(student_metrics, 'output')
             
             print(f"Processed performance report for student {student_ids[0]}")
@@ -545,7 +549,7 @@ student_data = {
 }
 
 # First install required packages
-!pip install python-docx matplotlib
+# pip install python-docx matplotlib
 
 # Generate the report
 generate_student_report(student_data, "Student_Report.docx")
@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Render inline and without the disk cache, so each test sees fresh output
+os.environ.setdefault("RENDER_WORKERS", "0")
+os.environ.setdefault("REPORT_CACHE_MAX_BYTES", "0")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def responses():
+    """The sample cohort shipped with the repository."""
+    with open(os.path.join(ROOT, "jsData.json")) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def body(responses):
+    return json.dumps(responses).encode()
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def dataset_id(client, body):
+    response = client.post("/datasets", data=body, content_type="application/json")
+    return response.json["dataset_id"]
@@ -0,0 +1,118 @@
+from collections import defaultdict
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+from aggregate_cube import CUBE_DIMENSIONS, build_cube
+from aggregation import aggregate_cohort
+from dataset_registry import build_dataset
+from report_generator import compute_boe_statistics
+from streaming_ingest import ingest_stream
+
+
+def naive_rollup(records, dimensions, **where):
+    totals = defaultdict(lambda: [0.0, 0])
+    for record in records:
+        if any(record[field] != value for field, value in where.items()):
+            continue
+        total = totals[tuple(record[field] for field in dimensions)]
+        total[0] += record["responseValue"]
+        total[1] += 1
+    return totals
+
+
+def cube_rollup(cube, dimensions, **where):
+    codes, sums, counts = cube.rollup(dimensions, **where)
+    # Without dimensions there is one group, keyed by the empty tuple
+    keys = list(zip(*(cube.decode(dimension, codes[dimension])
+                      for dimension in dimensions))) or [()] * len(sums)
+    return {key: [total, count]
+            for key, total, count in zip(keys, sums.tolist(), counts.tolist())}
+
+
+@pytest.fixture(scope="module")
+def cube(responses):
+    return build_cube(responses)
+
+
+@pytest.mark.parametrize("dimensions", [
+    (),
+    ("studentId",),
+    ("itemGroupCode",),
+    ("studentId", "itemGroupCode"),
+    ("itemGroupCode", "studentId", "itemSubGroupCode"),
+    CUBE_DIMENSIONS,
+])
+def test_rollup_matches_records(responses, cube, dimensions):
+    expected = naive_rollup(responses, dimensions)
+    actual = cube_rollup(cube, dimensions)
+    assert actual.keys() == expected.keys()
+    for key, (total, count) in expected.items():
+        assert actual[key][1] == count
+        assert actual[key][0] == pytest.approx(total)
+
+
+def test_rollup_with_filters(responses, cube):
+    student_id = responses[0]["studentId"]
+    cohort = responses[0]["cohort"]
+    for dimensions, where in [
+        (("itemGroupCode",), {"studentId": student_id}),
+        (("teachingPeriod",), {"cohort": cohort}),
+        ((), {"studentId": student_id, "itemGroupCode": "SAQ"}),
+    ]:
+        expected = naive_rollup(responses, dimensions, **where)
+        actual = cube_rollup(cube, dimensions, **where)
+        assert actual.keys() == expected.keys()
+        for key, (total, count) in expected.items():
+            assert actual[key] == [pytest.approx(total), count]
+
+    # A value that is not in the cube selects nothing
+    codes, sums, counts = cube.rollup(("itemGroupCode",), studentId=-1)
+    assert len(sums) == len(counts) == len(codes["itemGroupCode"]) == 0
+
+
+def test_rows_with_response_counts_roll_up_alike(responses, body, cube):
+    streamed = build_cube(ingest_stream(BytesIO(body)))
+    dimensions = ("studentId", "itemGroupCode", "itemSubGroupCode")
+    assert cube_rollup(streamed, dimensions).keys() == \
+        cube_rollup(cube, dimensions).keys()
+    for key, (total, count) in cube_rollup(cube, dimensions).items():
+        assert cube_rollup(streamed, dimensions)[key] == \
+            [pytest.approx(total), count]
+    assert streamed.subgroup_names == cube.subgroup_names
+
+
+def test_reports_from_cube_match_raw_data(responses, cube):
+    from_cube = aggregate_cohort(cube)
+    from_records = aggregate_cohort(responses)
+    assert np.array_equal(from_cube.student_ids, from_records.student_ids)
+    assert from_cube.group_codes == from_records.group_codes
+    assert np.allclose(from_cube.group_sums, from_records.group_sums)
+    assert np.array_equal(from_cube.group_counts, from_records.group_counts)
+    assert np.allclose(from_cube.ranked_scores, from_records.ranked_scores)
+
+    boe_cube = compute_boe_statistics(cube)
+    boe_records = compute_boe_statistics(responses)
+    assert boe_cube["summary_table"].equals(boe_records["summary_table"])
+    assert boe_cube["marks"].equals(boe_records["marks"])
+
+
+def test_ids_differing_in_type_are_one_student(responses):
+    student_id = responses[0]["studentId"]
+    rows = [i for i, record in enumerate(responses)
+            if record["studentId"] == student_id]
+    mixed = [dict(record) for record in responses]
+    for i in rows[:len(rows) // 2]:
+        mixed[i]["studentId"] = str(student_id)
+
+    expected = aggregate_cohort(responses)
+    for data in (mixed, build_cube(mixed)):
+        actual = aggregate_cohort(data)
+        assert np.array_equal(actual.student_ids, expected.student_ids)
+        assert np.array_equal(actual.group_counts, expected.group_counts)
+        assert np.allclose(actual.group_sums, expected.group_sums)
+        assert np.allclose(actual.overall_scores, expected.overall_scores)
+
+    assert build_dataset("mixed", mixed).summarise_student(str(student_id)) == \
+        build_dataset("plain", responses).summarise_student(str(student_id))
@@ -0,0 +1,22 @@
+from benchmark import benchmark_cohort, compare
+from synthetic_cohort import CohortSpec, iter_json
+
+
+def test_benchmark_reports_each_backend_separately():
+    body = b''.join(iter_json(CohortSpec(n_students=20)))
+    timings = benchmark_cohort(body, repeat=1, sample_students=2)
+    for report in ('student', 'boe'):
+        for stage in ('chart', 'layout', 'write'):
+            assert timings[f'{report}_{stage}_raster'] > 0
+            assert timings[f'{report}_{stage}_vector'] > 0
+    assert {'parse', 'parse_stream', 'aggregate_student',
+            'aggregate_boe'} <= timings.keys()
+
+
+def test_compare_flags_slower_stages_only():
+    baseline = {'datasets': {'sample': {'parse': 0.1, 'aggregate_boe': 0.1}}}
+    results = {'datasets': {'sample': {'parse': 0.2, 'aggregate_boe': 0.1001,
+                                       'new_stage': 1.0}}}
+    regressions = compare(results, baseline, threshold=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('sample/parse:')
@@ -0,0 +1,138 @@
+from io import BytesIO
+
+import pytest
+
+# Both formats are optional, like their support in binary_ingest
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from aggregation import aggregate_cohort, summarise_student
+from binary_ingest import InvalidUpload, load_columns
+
+needs_arrow = pytest.mark.skipif(pa is None, reason="pyarrow is not installed")
+needs_msgpack = pytest.mark.skipif(msgpack is None,
+                                   reason="msgpack is not installed")
+
+
+def arrow_table(responses):
+    return pa.Table.from_pylist(responses)
+
+
+def arrow_stream(responses):
+    table = arrow_table(responses)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_file(responses):
+    table = arrow_table(responses)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def parquet(responses):
+    buffer = BytesIO()
+    pq.write_table(arrow_table(responses), buffer)
+    return buffer.getvalue()
+
+
+def msgpack_columns(responses):
+    return msgpack.packb({field: [item[field] for item in responses]
+                          for field in responses[0]})
+
+
+FORMATS = [
+    pytest.param("application/vnd.apache.arrow.stream", arrow_stream,
+                 marks=needs_arrow),
+    pytest.param("application/vnd.apache.arrow.file", arrow_file,
+                 marks=needs_arrow),
+    pytest.param("application/vnd.apache.parquet", parquet, marks=needs_arrow),
+    pytest.param("application/msgpack", msgpack_columns, marks=needs_msgpack),
+]
+
+
+@pytest.mark.parametrize("content_type, encode", FORMATS)
+def test_binary_upload_matches_json(responses, content_type, encode):
+    columns = load_columns(encode(responses), content_type)
+    assert len(columns) == len(responses)
+
+    from_binary = aggregate_cohort(columns)
+    from_json = aggregate_cohort(responses)
+    assert from_binary.group_codes == from_json.group_codes
+    for student_id in from_json.student_ids:
+        assert summarise_student(from_binary, str(student_id)) == \
+            summarise_student(from_json, str(student_id))
+
+
+@pytest.mark.parametrize("content_type, encode", FORMATS)
+def test_binary_upload_endpoint(client, responses, content_type, encode):
+    response = client.post("/datasets", data=encode(responses),
+                           content_type=content_type)
+    assert response.status_code in (200, 201)
+    assert response.json["students"] == 9
+    assert response.json["responses"] == len(responses)
+
+
+@pytest.mark.parametrize("content_type, make_body", [
+    pytest.param("application/vnd.apache.arrow.stream", lambda: b"garbage",
+                 marks=needs_arrow),
+    pytest.param("application/vnd.apache.arrow.file", lambda: b"garbage",
+                 marks=needs_arrow),
+    pytest.param("application/vnd.apache.parquet", lambda: b"PAR1garbage",
+                 marks=needs_arrow),
+    pytest.param("application/msgpack", lambda: b"\x01\x02",
+                 marks=needs_msgpack),
+    pytest.param("application/msgpack", lambda: msgpack.packb([1, 2]),
+                 marks=needs_msgpack),
+    pytest.param("application/msgpack",
+                 lambda: msgpack.packb({"responseValue": [1.0],
+                                        "studentId": [1, 2]}),
+                 marks=needs_msgpack),
+
+    # Columns that are not arrays, or hold unhashable values
+    pytest.param("application/msgpack",
+                 lambda: msgpack.packb({"responseValue": [1.0],
+                                        "studentId": 5}),
+                 marks=needs_msgpack),
+    pytest.param("application/msgpack",
+                 lambda: msgpack.packb({"responseValue": 1.0}),
+                 marks=needs_msgpack),
+    pytest.param("application/msgpack",
+                 lambda: msgpack.packb({"responseValue": {"a": 1}}),
+                 marks=needs_msgpack),
+    pytest.param("application/msgpack",
+                 lambda: msgpack.packb({"responseValue": [1.0],
+                                        "studentId": [[1]]}),
+                 marks=needs_msgpack),
+])
+def test_corrupt_binary_upload_is_a_client_error(client, responses,
+                                                 content_type, make_body):
+    body = make_body()
+    with pytest.raises(InvalidUpload):
+        load_columns(body, content_type)
+
+    student_id = responses[0]["studentId"]
+    for path in ("/datasets", "/generate_report",
+                 f"/generate_student_report/{student_id}"):
+        response = client.post(path, data=body, content_type=content_type)
+        assert response.status_code == 400, path
+        assert content_type in response.json["error"]
+
+
+@needs_msgpack
+def test_upload_without_response_values(client):
+    body = msgpack_columns([{"studentId": 1}])
+    response = client.post("/datasets", data=body,
+                           content_type="application/msgpack")
+    assert response.status_code == 400
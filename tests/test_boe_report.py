@@ -0,0 +1,69 @@
+import json
+
+
+def test_boe_report_from_body(client, body, capfd):
+    response = client.post("/generate_report", data=body,
+                           content_type="application/json")
+    assert response.status_code == 200
+    assert response.data.startswith(b"%PDF")
+    assert response.headers["Content-Disposition"] == \
+        "attachment; filename=boe_report.pdf"
+    # Nothing is written to the server's stdout per request
+    assert capfd.readouterr().out == ""
+
+
+
+def test_report_etag_is_the_same_for_the_same_input(client, body, dataset_id):
+    first = client.post("/generate_report", data=body,
+                        content_type="application/json")
+    again = client.post("/generate_report", data=body,
+                        content_type="application/json")
+    etag, _ = first.get_etag()
+    assert etag and again.get_etag()[0] == etag
+    # Reports are rendered reproducibly, so the same ETag means the same bytes
+    assert again.data == first.data
+
+    # The ETag names the content: the same cohort stored as a dataset
+    # gives the same one, another chart backend or report another
+    def etag_of(path, data=body):
+        return client.post(path, data=data,
+                           content_type="application/json").get_etag()[0]
+
+    assert etag_of(f"/generate_report?dataset={dataset_id}", None) == etag
+    assert etag_of("/generate_report?chart_backend=raster") == etag
+    assert etag_of("/generate_report?chart_backend=vector") != etag
+    student_id = json.loads(body)[0]["studentId"]
+    assert etag_of(f"/generate_student_report/{student_id}") != etag
+
+def test_if_none_match_answers_not_modified(client, body, dataset_id):
+    path = f"/generate_report?dataset={dataset_id}"
+    etag, _ = client.post(path).get_etag()
+
+    response = client.post(path, headers={"If-None-Match": f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.get_etag()[0] == etag
+
+    response = client.post(path, headers={"If-None-Match": '"other", *'})
+    assert response.status_code == 304
+    response = client.post(path, headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.data.startswith(b"%PDF")
+
+
+def test_etag_changes_after_a_delta(client, responses, dataset_id):
+    student_id = responses[0]["studentId"]
+    paths = ("/generate_report?dataset={}",
+             f"/generate_student_report/{student_id}?dataset={{}}")
+    etags = [client.post(path.format(dataset_id)).get_etag()[0]
+             for path in paths]
+
+    record = dict(responses[0], responseValue=0.0)
+    updated = client.patch(f"/datasets/{dataset_id}",
+                           json={"replace": [record]}).json["dataset_id"]
+    for path, etag in zip(paths, etags):
+        response = client.post(path.format(updated),
+                               headers={"If-None-Match": f'"{etag}"'})
+        # The report held by the client is stale, so it is sent again
+        assert response.status_code == 200
+        assert response.get_etag()[0] != etag
@@ -0,0 +1,37 @@
+import numpy as np
+
+from columnar import CATEGORICAL_FIELDS, as_columns, encode_records, group_by
+
+
+def test_encode_records_only_named_fields(responses):
+    columns = encode_records(responses, ('studentId', 'itemGroupCode'))
+    assert set(columns.codes) == {'studentId', 'itemGroupCode'}
+    assert len(columns) == len(responses)
+
+    everything = as_columns(responses)
+    assert set(everything.codes) == set(CATEGORICAL_FIELDS)
+    assert as_columns(everything, ('studentId',)) is everything
+
+
+def test_group_by_matches_records(responses):
+    columns = encode_records(responses, ('studentId', 'itemGroupCode'))
+    codes, sums, counts = group_by(columns, ('studentId', 'itemGroupCode'))
+
+    expected = {}
+    for item in responses:
+        key = (item['studentId'], item['itemGroupCode'])
+        total = expected.setdefault(key, [0.0, 0])
+        total[0] += item['responseValue']
+        total[1] += 1
+
+    students = columns.categories['studentId']
+    groups = columns.categories['itemGroupCode']
+    actual = {
+        (students[s], groups[g]): [total, count]
+        for s, g, total, count in zip(codes['studentId'],
+                                      codes['itemGroupCode'], sums, counts)
+    }
+    assert actual.keys() == expected.keys()
+    for key, (total, count) in expected.items():
+        assert actual[key][1] == count
+        assert np.isclose(actual[key][0], total)
@@ -0,0 +1,96 @@
+import pytest
+
+
+def test_upload_returns_content_hash(client, body):
+    first = client.post("/datasets", data=body, content_type="application/json")
+    assert first.status_code == 201
+    assert first.json["students"] == 9
+    assert first.json["responses"] == 1384
+
+    again = client.post("/datasets", data=body, content_type="application/json")
+    assert again.status_code == 200
+    assert again.json["dataset_id"] == first.json["dataset_id"]
+
+
+def test_report_from_dataset(client, body, responses):
+    dataset_id = client.post(
+        "/datasets", data=body, content_type="application/json"
+    ).json["dataset_id"]
+    student_id = responses[0]["studentId"]
+
+    stored = client.post(f"/generate_student_report/{student_id}?dataset={dataset_id}")
+    assert stored.status_code == 200
+    assert stored.data.startswith(b"%PDF")
+    assert client.post(f"/generate_report?dataset={dataset_id}").status_code == 200
+
+
+def test_dataset_summary_matches_uploaded_body(responses):
+    from aggregation import aggregate_cohort, summarise_student
+    from dataset_registry import build_dataset
+
+    dataset = build_dataset("sample", responses)
+    aggregate = aggregate_cohort(responses)
+    for student_id in aggregate.student_ids:
+        stored = dataset.summarise_student(str(student_id))
+        expected = summarise_student(aggregate, str(student_id))
+        assert stored["overall_outcome"] == expected["overall_outcome"]
+        assert stored["ranking"] == expected["ranking"]
+        assert len(stored["summary_results"]) == len(expected["summary_results"])
+        for row, expected_row in zip(stored["summary_results"],
+                                     expected["summary_results"]):
+            assert row == pytest.approx(expected_row)
+
+
+def test_unknown_dataset(client, responses):
+    response = client.post(
+        f"/generate_student_report/{responses[0]['studentId']}?dataset=missing"
+    )
+    assert response.status_code == 404
+
+
+def test_malformed_upload_is_a_client_error(client):
+    for data in (b"{not json", b"\xff\xfe[]", b'{"a": 1}', b"[]"):
+        response = client.post("/datasets", data=data,
+                               content_type="application/json")
+        assert response.status_code == 400, data
+
+
+def test_student_reports_zip_from_dataset(client, dataset_id):
+    import zipfile
+    from io import BytesIO
+
+    response = client.post(f"/generate_student_reports?dataset={dataset_id}")
+    assert response.status_code == 200
+    assert len(zipfile.ZipFile(BytesIO(response.data)).namelist()) == 9
+
+
+def test_student_reports_zip_is_sent_per_student(client, dataset_id,
+                                                 monkeypatch):
+    import zipfile
+    from io import BytesIO
+
+    import render_pool
+
+    rendered = []
+
+    def render(student_data, chart_backend=None):
+        rendered.append(student_data["student_id"])
+        return b"%PDF-" + str(student_data["student_id"]).encode()
+
+    monkeypatch.setattr(render_pool, "render_student_pdf", render)
+    response = client.post(f"/generate_student_reports?dataset={dataset_id}",
+                           buffered=False)
+    assert response.status_code == 200
+    assert "Content-Length" not in response.headers
+
+    # Each student's report is sent as soon as it is rendered, and the
+    # central directory after the last one
+    chunks = []
+    for chunk in response.response:
+        chunks.append(chunk)
+        assert len(rendered) == min(len(chunks), 9)
+    response.close()
+    assert len(chunks) == 10
+    names = zipfile.ZipFile(BytesIO(b"".join(chunks))).namelist()
+    assert names == [f"student_report_{student_id}.pdf"
+                     for student_id in rendered]
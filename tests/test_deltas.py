@@ -0,0 +1,154 @@
+import copy
+import json
+import random
+
+import pytest
+
+from cohort_stats import InvalidDelta
+from dataset_registry import build_dataset
+from synthetic_cohort import CohortSpec, generate_cohort
+
+
+@pytest.fixture(scope="module")
+def cohort():
+    return generate_cohort(CohortSpec(n_students=30))
+
+
+def assert_tables_close(table, expected):
+    assert table.columns.tolist() == expected.columns.tolist()
+    assert len(table) == len(expected)
+    for row, expected_row in zip(table.to_dict("records"),
+                                 expected.to_dict("records")):
+        for column, value in expected_row.items():
+            if isinstance(value, str):
+                assert row[column] == value
+            else:
+                # Tables are rounded to 2 places, so a last-ulp difference
+                # in the sums can move a value by one in the last place
+                assert row[column] == pytest.approx(value, abs=0.011)
+
+
+def assert_same_statistics(dataset, expected):
+    """Compare a delta-updated dataset with one built from scratch."""
+    assert dataset.n_students == expected.n_students
+    assert dataset.n_responses == expected.n_responses
+    assert dataset.student_ids == expected.student_ids
+    for student_id in expected.student_ids:
+        actual = dataset.summarise_student(student_id)
+        wanted = expected.summarise_student(student_id)
+        assert actual["overall_outcome"] == wanted["overall_outcome"]
+        assert actual["ranking"] == wanted["ranking"]
+        assert len(actual["summary_results"]) == len(wanted["summary_results"])
+        for row, wanted_row in zip(actual["summary_results"],
+                                   wanted["summary_results"]):
+            assert row == pytest.approx(wanted_row)
+
+    actual, wanted = dataset.boe_statistics, expected.boe_statistics
+    marks = actual["marks"].sort_values("studentId")
+    wanted_marks = wanted["marks"].sort_values("studentId")
+    assert marks["studentId"].tolist() == wanted_marks["studentId"].tolist()
+    assert marks["Marks"].tolist() == pytest.approx(wanted_marks["Marks"].tolist())
+    assert_tables_close(actual["summary_table"], wanted["summary_table"])
+    assert len(actual["subgroup_tables"]) == len(wanted["subgroup_tables"])
+    for table, wanted_table in zip(actual["subgroup_tables"],
+                                   wanted["subgroup_tables"]):
+        assert table["group_code"] == wanted_table["group_code"]
+        assert_tables_close(table["table"], wanted_table["table"])
+
+
+def test_deltas_match_a_rebuilt_cohort(cohort):
+    rng = random.Random(7)
+    records = copy.deepcopy(cohort)
+    dataset = build_dataset("synthetic", records)
+
+    for step in range(5):
+        by_id = {record["responseId"]: record for record in records}
+        chosen = rng.sample(sorted(by_id), 60)
+        replaced = []
+        for response_id in chosen[:30]:
+            record = dict(by_id[response_id])
+            record["responseValue"] = rng.choice([0.0, 0.5, 1.0, 2.0])
+            replaced.append(record)
+        deleted = chosen[30:]
+        appended = []
+        for n, record in enumerate(rng.sample(records, 20)):
+            record = dict(record, responseId=f"late-{step}-{n}")
+            record["responseValue"] = rng.choice([0.0, 1.0])
+            appended.append(record)
+
+        applied = dataset.stats.apply(
+            {"append": appended, "replace": replaced, "delete": deleted}
+        )
+        assert applied == {"append": 20, "replace": 30, "delete": 30}
+
+        replacements = {record["responseId"]: record for record in replaced}
+        records = [replacements.get(record["responseId"], record)
+                   for record in records
+                   if record["responseId"] not in deleted] + appended
+
+        assert_same_statistics(dataset, build_dataset("rebuilt", records))
+
+
+def test_deleting_a_students_responses_removes_them(cohort):
+    dataset = build_dataset("synthetic", cohort)
+    student_id = cohort[0]["studentId"]
+    dataset.stats.apply({"delete": [
+        record["responseId"] for record in cohort
+        if record["studentId"] == student_id
+    ]})
+
+    remaining = [record for record in cohort
+                 if record["studentId"] != student_id]
+    assert str(student_id) not in dataset.student_ids
+    with pytest.raises(ValueError):
+        dataset.summarise_student(str(student_id))
+    assert_same_statistics(dataset, build_dataset("rebuilt", remaining))
+
+
+@pytest.mark.parametrize("delta", [
+    {"delete": ["missing"]},
+    {"append": [{"responseId": "new"}]},
+    {"replace": [{"responseId": "missing", "responseValue": 1.0}]},
+    {"rename": []},
+    [],
+])
+def test_invalid_delta_changes_nothing(cohort, delta):
+    dataset = build_dataset("synthetic", cohort)
+    first = cohort[0]["responseId"]
+    if isinstance(delta, dict) and "delete" in delta:
+        # Valid changes ahead of the invalid one are not applied either
+        delta = {"delete": [first] + delta["delete"]}
+    with pytest.raises(InvalidDelta):
+        dataset.stats.apply(delta)
+    assert_same_statistics(dataset, build_dataset("rebuilt", cohort))
+
+
+def test_patch_endpoint(client, cohort):
+    body = json.dumps(cohort).encode()
+    dataset_id = client.post("/datasets", data=body,
+                             content_type="application/json").json["dataset_id"]
+    record = dict(cohort[0], responseValue=0.0)
+
+    response = client.patch(f"/datasets/{dataset_id}",
+                            json={"replace": [record]})
+    assert response.status_code == 200
+    updated = response.json
+    assert updated["previous_dataset_id"] == dataset_id
+    assert updated["applied"] == {"append": 0, "replace": 1, "delete": 0}
+    assert updated["dataset_id"] != dataset_id
+
+    # The old ID no longer serves reports; the new one does
+    student_id = record["studentId"]
+    assert client.post(
+        f"/generate_student_report/{student_id}?dataset={dataset_id}"
+    ).status_code == 404
+    assert client.post(
+        f"/generate_student_report/{student_id}?dataset={updated['dataset_id']}"
+    ).status_code == 200
+
+    assert client.patch(f"/datasets/{updated['dataset_id']}",
+                        json={"delete": ["missing"]}).status_code == 400
+    assert client.patch(f"/datasets/{updated['dataset_id']}",
+                        data=b"{not json").status_code == 400
+    assert client.patch("/datasets/missing",
+                        json={"delete": []}).status_code == 404
@@ -0,0 +1,106 @@
+import time
+import zipfile
+from io import BytesIO
+
+
+def wait_for(client, response, timeout=60):
+    """Poll a created job until it finishes and return its final status."""
+    assert response.status_code == 202, response.json
+    location = response.headers["Location"]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(location).json
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"{location} did not finish")
+
+
+def result_names(client, status):
+    result = client.get(f"/jobs/{status['job_id']}/result")
+    assert result.status_code == 200
+    return sorted(zipfile.ZipFile(BytesIO(result.data)).namelist())
+
+
+def test_cohort_job_from_body(client, responses):
+    student_ids = sorted({str(item["studentId"]) for item in responses})[:2]
+    status = wait_for(client, client.post(
+        "/jobs/cohort", json={"data": responses, "student_ids": student_ids}
+    ))
+    assert status["status"] == "done", status["error"]
+    assert status["progress"] == {"done": 2, "total": 2}
+    assert result_names(client, status) == [
+        f"student_report_{student_id}.pdf" for student_id in student_ids
+    ]
+
+
+def test_cohort_job_from_dataset(client, responses, dataset_id):
+    student_id = str(responses[0]["studentId"])
+    status = wait_for(client, client.post(
+        f"/jobs/cohort?dataset={dataset_id}&student_ids={student_id}"
+    ))
+    assert status["status"] == "done", status["error"]
+    assert result_names(client, status) == [f"student_report_{student_id}.pdf"]
+
+
+def test_cohort_job_rejects_unknown_students_before_queueing(
+        client, responses, dataset_id):
+    response = client.post("/jobs/cohort", json={
+        "data": responses, "student_ids": ["999999999"]
+    })
+    assert response.status_code == 400
+    assert "999999999" in response.json["error"]
+
+    response = client.post(f"/jobs/cohort?dataset={dataset_id}",
+                           json={"student_ids": ["999999999"]})
+    assert response.status_code == 400
+
+
+def test_cohort_job_unknown_dataset(client):
+    assert client.post("/jobs/cohort?dataset=missing").status_code == 404
+
+
+def test_unknown_job(client):
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.get("/jobs/missing/result").status_code == 404
+
+
+def test_boe_job_from_body(client, body):
+    status = wait_for(client, client.post(
+        "/jobs/boe", data=body, content_type="application/json"
+    ))
+    assert status["status"] == "done", status["error"]
+    result = client.get(f"/jobs/{status['job_id']}/result")
+    assert result.status_code == 200
+    assert result.data.startswith(b"%PDF")
+
+    # The cohort is measured on the job thread, labelled with the endpoint
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'report_cohort_students_count{endpoint="/jobs/boe"}' in metrics
+
+
+def test_student_job_from_dataset(client, responses, dataset_id):
+    student_id = responses[0]["studentId"]
+    status = wait_for(client, client.post(
+        f"/jobs/student/{student_id}?dataset={dataset_id}"
+    ))
+    assert status["status"] == "done", status["error"]
+    result = client.get(f"/jobs/{status['job_id']}/result")
+    assert result.data.startswith(b"%PDF")
+
+
+def test_student_job_rejects_unknown_student_before_queueing(
+        client, body, dataset_id):
+    for student_id in ("999999999", "not-a-number"):
+        response = client.post(f"/jobs/student/{student_id}", data=body,
+                               content_type="application/json")
+        assert response.status_code == 404
+        assert student_id in response.json["error"]
+        assert client.post(
+            f"/jobs/student/{student_id}?dataset={dataset_id}"
+        ).status_code == 404
+
+        # As for the report itself
+        assert client.post(
+            f"/generate_student_report/{student_id}?dataset={dataset_id}"
+        ).status_code == 404
@@ -0,0 +1,54 @@
+import pytest
+
+from aggregation import aggregate_cohort, rank_score, summarise_student
+from dataset_registry import build_dataset
+
+
+@pytest.mark.parametrize("cohort_size", [1, 2, 3, 9, 10, 11, 100, 101])
+def test_top_student_is_in_the_first_decile(cohort_size):
+    scores = [float(score) for score in range(cohort_size)]
+    ranking = rank_score(scores, scores[-1])
+    assert ranking["rank"] == 1
+    assert ranking["decile"] == 1
+    assert ranking["percentile"] == 100
+
+    bottom = rank_score(scores, scores[0])
+    assert bottom["rank"] == cohort_size
+    assert bottom["decile"] == (10 if cohort_size >= 10
+                                else (cohort_size - 1) * 10 // cohort_size + 1)
+
+
+def test_deciles_of_a_cohort_of_nine():
+    scores = [float(score) for score in range(9)]
+    deciles = [rank_score(scores, score)["decile"] for score in reversed(scores)]
+    assert deciles == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+
+def test_deciles_of_a_hundred_are_groups_of_ten():
+    scores = [float(score) for score in range(100)]
+    deciles = [rank_score(scores, score)["decile"] for score in reversed(scores)]
+    assert deciles == [decile for decile in range(1, 11) for _ in range(10)]
+
+
+def test_tied_students_share_rank_and_decile():
+    scores = [10.0, 50.0, 50.0, 50.0, 90.0]
+    tied = rank_score(scores, 50.0)
+    assert tied["rank"] == 2
+    assert tied["percentile"] == 80
+    assert tied["decile"] == 3
+    assert rank_score([70.0] * 4, 70.0) == {
+        "rank": 1, "cohort_size": 4, "percentile": 100, "decile": 1
+    }
+
+
+def test_sample_cohort_ranking(responses):
+    aggregate = aggregate_cohort(responses)
+    dataset = build_dataset("sample", responses)
+    scores = aggregate.overall_scores
+    for row, student_id in enumerate(aggregate.student_ids):
+        ranking = summarise_student(aggregate, str(student_id))["ranking"]
+        assert dataset.summarise_student(str(student_id))["ranking"] == ranking
+        assert ranking["cohort_size"] == 9
+        assert ranking["rank"] == 1 + int((scores > scores[row]).sum())
+        if scores[row] == scores.max():
+            assert ranking["decile"] == 1
@@ -0,0 +1,68 @@
+from concurrent.futures import Future
+
+from aggregation import aggregate_cohort, summarise_student
+from render_pool import RenderPool
+
+
+class _RecordingPool(RenderPool):
+    """Pool whose reports are pending until read, counting submissions."""
+
+    def __init__(self, workers):
+        super().__init__(workers)
+        self.submitted = []
+
+    def submit_student(self, json_data, chart_backend=None):
+        future = Future()
+        future.set_result(json_data["student_id"].encode())
+        self.submitted.append(future)
+        return future
+
+
+def _students(n):
+    return ({"student_id": str(i)} for i in range(n))
+
+
+def test_map_students_keeps_a_bounded_window():
+    pool = _RecordingPool(workers=3)
+    yielded = 0
+    for pdf in pool.map_students(_students(50)):
+        assert pdf == str(yielded).encode()
+        yielded += 1
+        # At most two reports per worker are ever held
+        assert len(pool.submitted) - yielded <= 6 - 1
+    assert yielded == len(pool.submitted) == 50
+
+
+def test_map_students_cancels_queued_reports_when_closed():
+    pool = _RecordingPool(workers=2)
+    reports = pool.map_students(_students(50), window=4)
+    next(reports)
+    reports.close()
+    assert len(pool.submitted) == 4
+
+
+def test_inline_pool_renders_in_order(responses):
+    cohort = aggregate_cohort(responses)
+    students = [summarise_student(cohort, str(student_id))
+                for student_id in cohort.student_ids[:2]]
+    pdfs = list(RenderPool(workers=0).map_students(students, "vector"))
+    assert len(pdfs) == 2
+    assert all(pdf.startswith(b"%PDF") for pdf in pdfs)
+
+
+def test_process_pool_renders_reports(responses):
+    cohort = aggregate_cohort(responses)
+    students = [summarise_student(cohort, str(student_id))
+                for student_id in cohort.student_ids[:2]]
+    pool = RenderPool(workers=1)
+    try:
+        pool.start()
+        assert pool.pending == 0
+        pdf = pool.render_student(students[0], "vector")
+        assert pdf.startswith(b"%PDF")
+        pdfs = list(pool.map_students(students, "vector"))
+        assert pdfs[0] == pdf
+        assert pdfs[1].startswith(b"%PDF") and pdfs[1] != pdf
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,89 @@
+import os
+import time
+
+import pytest
+
+import report_cache
+from report_cache import ReportCache
+
+
+def _age(cache, key, seconds):
+    """Make an entry look last used the given number of seconds ago."""
+    then = time.time() - seconds
+    os.utime(cache._path(key), (then, then))
+
+
+def _keys(cache):
+    return sorted(name[:-len(".pdf")] for name in os.listdir(cache.directory)
+                  if name.endswith(".pdf"))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=250)
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    _age(cache, "a", 30)
+    _age(cache, "b", 20)
+
+    # Over budget: the oldest entry goes
+    cache.put("c", b"c" * 100)
+    assert _keys(cache) == ["b", "c"]
+    assert cache.get("a") is None
+
+    # A hit makes an entry recent, so the other one goes next
+    _age(cache, "b", 20)
+    _age(cache, "c", 10)
+    assert cache.get("b") == b"b" * 100
+    cache.put("d", b"d" * 100)
+    assert _keys(cache) == ["b", "d"]
+
+
+def test_hit_touches_the_entry(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=1000)
+    cache.put("a", b"%PDF")
+    _age(cache, "a", 3600)
+    before = os.path.getmtime(cache._path("a"))
+
+    assert cache.get("a") == b"%PDF"
+    assert os.path.getmtime(cache._path("a")) > before + 3000
+
+
+def test_entry_over_the_budget_is_not_stored(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=10)
+    assert cache.get_or_render("a", lambda: b"x" * 11) == b"x" * 11
+    assert _keys(cache) == []
+
+
+def test_failed_write_leaves_no_entry(tmp_path, monkeypatch):
+    cache = ReportCache(str(tmp_path), max_bytes=1000)
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(report_cache.os, "replace", fail)
+    with pytest.raises(OSError):
+        cache.put("a", b"%PDF")
+    assert os.listdir(tmp_path) == []
+    monkeypatch.undo()
+
+    # The next request renders and stores it
+    renders = []
+
+    def render():
+        renders.append(1)
+        return b"%PDF"
+
+    assert cache.get_or_render("a", render) == b"%PDF"
+    assert cache.get_or_render("a", render) == b"%PDF"
+    assert len(renders) == 1
+
+
+def test_partial_file_of_a_killed_writer_is_never_served(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=1000)
+    # A writer killed mid-put leaves only its temporary file
+    (tmp_path / "partial.tmp").write_bytes(b"%PDF-trunc")
+
+    assert cache.get("partial") is None
+    assert cache.get_or_render("a", lambda: b"%PDF-full") == b"%PDF-full"
+    assert cache.get("a") == b"%PDF-full"
+    assert _keys(cache) == ["a"]
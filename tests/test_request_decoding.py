@@ -0,0 +1,121 @@
+import gzip
+from io import BytesIO
+
+import pytest
+
+try:
+    import zstandard
+except ImportError:  # optional, like zstd support itself
+    zstandard = None
+
+import app as app_module
+from request_decoding import (
+    BodyTooLarge, CorruptBody, UnsupportedEncoding, decoded_stream
+)
+
+
+needs_zstd = pytest.mark.skipif(zstandard is None,
+                                reason="zstandard is not installed")
+
+
+def zstd(data):
+    return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.mark.parametrize("encoding, encode", [
+    ("gzip", gzip.compress),
+    ("x-gzip", gzip.compress),
+    pytest.param("zstd", zstd, marks=needs_zstd),
+    pytest.param("gzip, zstd", lambda data: zstd(gzip.compress(data)),
+                 marks=needs_zstd),
+    ("identity", lambda data: data),
+    (None, lambda data: data),
+])
+def test_decoded_stream(encoding, encode):
+    data = b"[1, 2, 3]" * 1000
+    stream = decoded_stream(BytesIO(encode(data)), encoding, len(data))
+    assert stream.read() == data
+
+
+def test_decompression_limit():
+    data = b" " * 10000
+    with pytest.raises(BodyTooLarge):
+        decoded_stream(BytesIO(gzip.compress(data)), "gzip", 9999).read()
+
+
+@pytest.mark.parametrize("encoding, body", [
+    ("gzip", b"\x1f\x8bgarbage"),
+    ("gzip", gzip.compress(bytes(range(256)) * 100)[:-10]),
+    pytest.param("zstd", b"garbage", marks=needs_zstd),
+])
+def test_corrupt_body(encoding, body):
+    with pytest.raises(CorruptBody):
+        decoded_stream(BytesIO(body), encoding, 1 << 20).read()
+
+
+def test_unknown_encoding():
+    with pytest.raises(UnsupportedEncoding):
+        decoded_stream(BytesIO(b""), "br", 1 << 20)
+
+
+def test_compressed_upload_matches_plain(client, body):
+    plain = client.post("/datasets", data=body, content_type="application/json")
+    encodings = [("gzip", gzip.compress)]
+    if zstandard is not None:
+        encodings.append(("zstd", zstd))
+    for encoding, encode in encodings:
+        response = client.post("/datasets", data=encode(body),
+                               content_type="application/json",
+                               headers={"Content-Encoding": encoding})
+        assert response.status_code == 200
+        assert response.json == plain.json
+
+
+def _paths(responses):
+    student_id = responses[0]["studentId"]
+    return ["/datasets", "/generate_report",
+            f"/generate_student_report/{student_id}",
+            "/generate_student_reports", "/jobs/boe",
+            f"/jobs/student/{student_id}", "/jobs/cohort"]
+
+
+def test_compressed_body_errors(client, responses, body, monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_DECOMPRESSED_BYTES", len(body) - 1)
+    cases = [
+        ({"Content-Encoding": "gzip"}, gzip.compress(body)[:1000], 400),
+        # Without zstandard the encoding is unsupported
+        ({"Content-Encoding": "zstd"}, b"garbage",
+         415 if zstandard is None else 400),
+        ({"Content-Encoding": "gzip"}, gzip.compress(body), 413),
+        ({"Content-Encoding": "br"}, body, 415),
+    ]
+    for path in _paths(responses):
+        for headers, data, status in cases:
+            response = client.post(path, data=data, headers=headers,
+                                   content_type="application/json")
+            assert response.status_code == status, (path, headers, status)
+
+
+def test_cross_origin_compressed_upload_is_allowed(client):
+    response = client.options("/datasets", headers={
+        "Origin": "https://example.org",
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "content-type, content-encoding",
+    })
+    allowed = response.headers["Access-Control-Allow-Headers"].lower()
+    assert "content-encoding" in allowed
+
+
+def test_errors_are_recorded_with_their_status(client, body):
+    response = client.post("/generate_report", data=body,
+                           content_type="application/json",
+                           headers={"Content-Encoding": "br"})
+    assert response.status_code == 415
+    assert "Server-Timing" in response.headers
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert ('report_requests_total{endpoint="/generate_report",status="415"}'
+            in metrics)
+
+    # Routing errors keep their own status
+    assert client.get("/missing").status_code == 404
+    assert client.get("/generate_report").status_code == 405
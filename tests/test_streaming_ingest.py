@@ -0,0 +1,84 @@
+import json
+from io import BytesIO
+
+import pytest
+
+from aggregation import aggregate_cohort, summarise_student
+from streaming_ingest import ingest_stream, iter_json_array
+
+
+def parse(body, **kwargs):
+    return list(iter_json_array(BytesIO(body), **kwargs))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_elements_across_chunk_boundaries(chunk_size):
+    values = [{"a": 1.5, "b": "xéy"}, 12345, -1e-3, True, None, "s"]
+    body = json.dumps(values).encode()
+    assert parse(body, chunk_size=chunk_size) == values
+
+
+def test_streamed_cohort_matches_parsed_body(responses, body):
+    columns = ingest_stream(BytesIO(body))
+    assert int(columns.response_count.sum()) == len(responses)
+
+    student_id = str(responses[0]["studentId"])
+    streamed = summarise_student(aggregate_cohort(columns), student_id)
+    parsed = summarise_student(aggregate_cohort(responses), student_id)
+    assert streamed["ranking"] == parsed["ranking"]
+    assert [row["your_score"] for row in streamed["summary_results"]] == \
+        pytest.approx([row["your_score"] for row in parsed["summary_results"]])
+
+
+@pytest.mark.parametrize("body", [
+    b'',
+    b'{"a": 1}',
+    b'[{"a": 1}',
+    b'[{"a": 1} {"a": 2}]',
+    b'[{"a": 1},]',
+    b'[{"a": 1}] trailing',
+    b'[1] [2]',
+    b'[{"a": "unterminated}]',
+])
+def test_malformed_arrays_are_rejected(body):
+    with pytest.raises(ValueError):
+        parse(body, chunk_size=4)
+
+
+def test_trailing_whitespace_is_accepted():
+    assert parse(b'[1, 2] \n\t ', chunk_size=1) == [1, 2]
+
+
+def test_error_in_complete_element_stops_reading():
+    # A bad token early on must not make the parser buffer the rest
+    element = json.dumps({"responseValue": 1, "itemName": "x" * 100})
+    body = ("[" + element.replace(":", "", 1) + ","
+            + ",".join([element] * 10000) + "]").encode()
+    stream = BytesIO(body)
+    with pytest.raises(ValueError):
+        list(iter_json_array(stream, chunk_size=1024))
+    assert stream.tell() <= 2048
+
+
+def test_oversized_element_is_rejected():
+    body = json.dumps([{"itemName": "x" * 5000}]).encode()
+    with pytest.raises(ValueError, match="longer than"):
+        parse(body, chunk_size=256, max_element_size=1024)
+    assert parse(body, chunk_size=256, max_element_size=8192)
+
+
+@pytest.mark.parametrize("body", [
+    b'[{"responseValue": 1.0, "studentId": 1} x',
+    b'[{"studentId": 1}]',
+    b'[[1, 2]]',
+    b'{"responseValue": 1.0}',
+    b'[{"responseValue": 1.0}] trailing',
+])
+def test_malformed_streamed_upload_is_a_client_error(client, responses, body):
+    student_id = responses[0]["studentId"]
+    for path in ("/generate_report",
+                 f"/generate_student_report/{student_id}", "/jobs/boe"):
+        response = client.post(f"{path}?ingest=stream", data=body,
+                               content_type="application/json")
+        assert response.status_code == 400, path
+        assert response.json["error"].startswith("Invalid JSON upload")
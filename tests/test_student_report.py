@@ -0,0 +1,47 @@
+import pytest
+
+# PyMuPDF reads the rendered PDFs back; it is not a runtime dependency
+fitz = pytest.importorskip("fitz")
+
+from aggregation import aggregate_cohort, summarise_student
+from chart_cache import get_chart_background
+from student_report import render_student_pdf
+
+
+@pytest.fixture(scope="module")
+def students(responses):
+    cohort = aggregate_cohort(responses)
+    return [summarise_student(cohort, str(student_id))
+            for student_id in cohort.student_ids[:2]]
+
+
+def _chart_pages(pdf):
+    with fitz.open(stream=pdf, filetype="pdf") as document:
+        return [(page.get_text(), page.get_images(full=True))
+                for page in document
+                if "Your mark" in page.get_text()]
+
+
+def test_cached_chart_background_embeds_in_every_report(students):
+    get_chart_background.cache_clear()
+    for student in students:
+        pdf = render_student_pdf(student, "raster")
+        pages = _chart_pages(pdf)
+        assert len(pages) == 1
+        text, images = pages[0]
+        your_score = student["summary_results"][0]["your_score"]
+        assert f"{your_score:.1f}" in text
+
+        # One bitmap, the shared background, at its rendered size
+        assert len(images) == 1
+        width, height = images[0][2:4]
+        assert (width, height) == (2400, 1800)
+
+    # Both reports used the same background
+    assert get_chart_background.cache_info().misses == 1
+
+
+def test_vector_chart_has_no_bitmap(students):
+    pages = _chart_pages(render_student_pdf(students[0], "vector"))
+    assert len(pages) == 1
+    assert pages[0][1] == []
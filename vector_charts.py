@@ -0,0 +1,218 @@
+import math
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from reportlab.graphics.shapes import Drawing, Group, Line, PolyLine, Rect, String
+from reportlab.lib import colors
+
+from aggregation import PASS_MARK
+
+CHART_BACKENDS = ('raster', 'vector')
+
+# Backend used when a request does not ask for one
+DEFAULT_CHART_BACKEND = os.environ.get('REPORT_CHART_BACKEND', 'raster')
+
+
+def resolve_chart_backend(name: Optional[str] = None) -> str:
+    """Validate a chart backend name, falling back to the global default.
+
+    Args:
+        name (Optional[str]): Requested backend, 'raster' or 'vector'
+
+    Returns:
+        str: The backend to use
+    """
+    backend = name or DEFAULT_CHART_BACKEND
+    if backend not in CHART_BACKENDS:
+        raise ValueError(
+            f"Unknown chart backend {backend!r}, expected one of {CHART_BACKENDS}"
+        )
+    return backend
+
+
+def _nice_ticks(low: float, high: float, count: int = 6) -> List[float]:
+    """Round tick positions covering [low, high], like matplotlib's locator."""
+    span = high - low
+    if span <= 0 or not math.isfinite(span):
+        return [low]
+    raw_step = span / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10)
+                if m * magnitude >= raw_step)
+    first = math.ceil(low / step) * step
+    return [first + i * step for i in range(int((high - first) / step + 1e-9) + 1)]
+
+
+def _format_tick(value: float, step: float) -> str:
+    decimals = max(0, -int(math.floor(math.log10(step)))) if step < 1 else 0
+    return f"{value:.{decimals}f}"
+
+
+class _Axes:
+    """Maps data coordinates onto a rectangle of a drawing."""
+
+    def __init__(self, x0: float, y0: float, x1: float, y1: float,
+                 xlim: Sequence[float], ylim: Sequence[float]) -> None:
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.xlim, self.ylim = xlim, ylim
+
+    def x(self, value: float) -> float:
+        return self.x0 + (value - self.xlim[0]) / (self.xlim[1] - self.xlim[0]) * (self.x1 - self.x0)
+
+    def y(self, value: float) -> float:
+        return self.y0 + (value - self.ylim[0]) / (self.ylim[1] - self.ylim[0]) * (self.y1 - self.y0)
+
+    def frame(self, group: Group, title: str, xlabel: str, ylabel: str,
+              grid_dash: Optional[Sequence[float]] = None) -> None:
+        """Draw the grid, ticks, labels, title and border."""
+        font = 'Helvetica'
+        for axis, ticks in (('x', _nice_ticks(*self.xlim)), ('y', _nice_ticks(*self.ylim))):
+            step = ticks[1] - ticks[0] if len(ticks) > 1 else 1
+            for tick in ticks:
+                label = _format_tick(tick, step)
+                if axis == 'x':
+                    pos = self.x(tick)
+                    group.add(Line(pos, self.y0, pos, self.y1, strokeColor=colors.lightgrey,
+                                   strokeWidth=0.5, strokeDashArray=grid_dash))
+                    group.add(String(pos, self.y0 - 10, label, fontName=font,
+                                     fontSize=7, textAnchor='middle'))
+                else:
+                    pos = self.y(tick)
+                    group.add(Line(self.x0, pos, self.x1, pos, strokeColor=colors.lightgrey,
+                                   strokeWidth=0.5, strokeDashArray=grid_dash))
+                    group.add(String(self.x0 - 3, pos - 2.5, label, fontName=font,
+                                     fontSize=7, textAnchor='end'))
+
+        group.add(Rect(self.x0, self.y0, self.x1 - self.x0, self.y1 - self.y0,
+                       fillColor=None, strokeColor=colors.black, strokeWidth=0.7))
+        group.add(String((self.x0 + self.x1) / 2, self.y1 + 12, title,
+                         fontName='Helvetica-Bold', fontSize=10, textAnchor='middle'))
+        group.add(String((self.x0 + self.x1) / 2, self.y0 - 24, xlabel,
+                         fontName=font, fontSize=8, textAnchor='middle'))
+        ylabel_group = Group(
+            String(0, 0, ylabel, fontName=font, fontSize=8, textAnchor='middle'),
+            transform=(0, 1, -1, 0, self.x0 - 34, (self.y0 + self.y1) / 2)
+        )
+        group.add(ylabel_group)
+
+    def curve(self, xs: np.ndarray, ys: np.ndarray, **style) -> PolyLine:
+        points = []
+        for x, y in zip(xs, ys):
+            if self.xlim[0] <= x <= self.xlim[1] and math.isfinite(y):
+                points.extend((self.x(x), self.y(y)))
+        return PolyLine(points, **style)
+
+
+def performance_chart_drawing(overall_scores: Dict[str, float],
+                              width: float = 400, height: float = 300,
+                              pass_mark: float = PASS_MARK) -> Drawing:
+    """Draw the bell curve performance chart as reportlab vector graphics.
+
+    Args:
+        overall_scores (Dict[str, float]): Dictionary containing overall score statistics
+        width (float): Width of the chart in points
+        height (float): Height of the chart in points
+        pass_mark (float): Pass-mark in percent
+
+    Returns:
+        Drawing: The chart, usable directly as a flowable
+    """
+    # Create bell curve data
+    x = np.linspace(0, 100, 100)
+    mu = overall_scores['mean']
+    sigma = overall_scores['stdev']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = ((1/(sigma * np.sqrt(2 * np.pi))) *
+             np.exp(-(x - mu)**2 / (2 * sigma**2)))
+    finite = y[np.isfinite(y)]
+    y_max = float(finite.max()) if finite.size and finite.max() > 0 else 1.0
+
+    drawing = Drawing(width, height)
+    axes = _Axes(45, 40, width - 10, height - 28,
+                 xlim=(-5, 105), ylim=(-0.05 * y_max, 1.05 * y_max))
+    group = Group()
+    axes.frame(group, 'Your Performance', 'Overall Percentage Marks',
+               'Density Function')
+    group.add(axes.curve(x, y, strokeColor=colors.black, strokeWidth=1))
+
+    # Add pass mark line
+    pass_x = axes.x(pass_mark)
+    group.add(Line(pass_x, axes.y0, pass_x, axes.y1, strokeColor=colors.grey,
+                   strokeWidth=1, strokeDashArray=[3, 2]))
+    group.add(String(pass_x + 3, axes.y1 - 9, f'Pass-mark = {pass_mark:.2f}%',
+                     fontName='Helvetica', fontSize=7))
+
+    # Add your mark line and text
+    your_mark = overall_scores['your_score']
+    mark_x = axes.x(min(max(your_mark, axes.xlim[0]), axes.xlim[1]))
+    group.add(Line(mark_x, axes.y0, mark_x, axes.y1, strokeColor=colors.black,
+                   strokeWidth=1))
+    label_y = axes.y(0.95 * axes.ylim[1])
+    group.add(String(mark_x + 3, label_y, 'Your mark',
+                     fontName='Helvetica', fontSize=7))
+    group.add(String(mark_x + 3, label_y - 8, f'{your_mark:.1f}',
+                     fontName='Helvetica', fontSize=7))
+
+    drawing.add(group)
+    return drawing
+
+
+def _gaussian_kde(values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Gaussian kernel density with Scott's bandwidth, as seaborn's kdeplot."""
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    offsets = (grid[:, None] - values[None, :]) / bandwidth
+    return np.exp(-0.5 * offsets ** 2).sum(axis=1) / (
+        len(values) * bandwidth * np.sqrt(2 * np.pi)
+    )
+
+
+def boe_histogram_drawing(percentages: Sequence[float],
+                          width: float = 500, height: float = 250) -> Drawing:
+    """Draw the BOE score histogram and density curve as vector graphics.
+
+    Args:
+        percentages (Sequence[float]): Overall percentage mark per student
+        width (float): Width of the chart in points
+        height (float): Height of the chart in points
+
+    Returns:
+        Drawing: The chart, ready to render onto a canvas
+    """
+    values = np.asarray(percentages, dtype=np.float64)
+    densities, edges = np.histogram(values, bins=20, density=True)
+
+    kde_x = kde_y = np.array([])
+    if len(values) > 1 and values.std() > 0:
+        bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+        kde_x = np.linspace(values.min() - 3 * bandwidth,
+                            values.max() + 3 * bandwidth, 200)
+        kde_y = _gaussian_kde(values, kde_x)
+
+    peaks = [float(densities.max())] if densities.size else []
+    if kde_y.size:
+        peaks.append(float(kde_y.max()))
+    y_max = max(peaks, default=0.0)
+    y_max = y_max if y_max > 0 and math.isfinite(y_max) else 1.0
+
+    drawing = Drawing(width, height)
+    axes = _Axes(50, 40, width - 10, height - 30,
+                 xlim=(0, 100), ylim=(0, 1.05 * y_max))
+    group = Group()
+    axes.frame(group, 'Overall Performance', 'Overall Percentage Marks',
+               'Density Function', grid_dash=[2, 2])
+
+    for density, left, right in zip(densities, edges[:-1], edges[1:]):
+        if not math.isfinite(density):
+            continue
+        x0 = axes.x(max(left, axes.xlim[0]))
+        x1 = axes.x(min(right, axes.xlim[1]))
+        group.add(Rect(x0, axes.y(0), max(x1 - x0, 0.5), axes.y(density) - axes.y(0),
+                       fillColor=colors.skyblue, fillOpacity=0.5,
+                       strokeColor=colors.black, strokeWidth=0.5))
+    if kde_x.size:
+        group.add(axes.curve(kde_x, kde_y, strokeColor=colors.darkblue,
+                             strokeWidth=2))
+
+    drawing.add(group)
+    return drawing
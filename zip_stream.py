@@ -0,0 +1,48 @@
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written to it.
+
+    ``zipfile`` falls back to data descriptors when the target cannot seek,
+    so the archive can be emitted piece by piece as members are added.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(members: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Stream a ZIP archive while its members are being produced.
+
+    Args:
+        members (Iterable[Tuple[str, bytes]]): (file name, content) pairs
+
+    Yields:
+        bytes: Consecutive pieces of the archive
+    """
+    sink = _ChunkSink()
+    # PDF page streams are already compressed, so store members as-is
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    # Central directory is written on close
+    chunk = sink.drain()
+    if chunk:
+        yield chunk